@@ -1,14 +1,70 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import HttpResponseBadRequest
+from django.urls import path
+from django.utils import timezone
 
-from .models import Lead
+from landings.models import LandingPage
+from landings.pagination import KeysetPaginationMixin
+
+from .export import FORMATS, LeadExportFilterForm, streaming_response
+from .models import (
+    ErasureRequest,
+    Event,
+    JobCheckpoint,
+    Lead,
+    LeadDailyRollup,
+    LeadUtmDailyRollup,
+    OutboxMessage,
+)
+from .outbox import get_outbox_worker
+from .retention import get_retention_worker
+
+
+class SourceListFilter(admin.SimpleListFilter):
+    """
+    Fuentes tomadas de los resúmenes diarios. ``AllValuesFieldListFilter``
+    haría un ``SELECT DISTINCT source`` sobre toda la tabla de leads en cada
+    carga del changelist; una fuente nueva aparece tras el siguiente rollup.
+    """
+
+    title = "Fuente"
+    parameter_name = "source__exact"
+
+    def lookups(self, request, model_admin):
+        sources = (
+            LeadDailyRollup.objects.order_by("source")
+            .values_list("source", flat=True)
+            .distinct()
+        )
+        return [(source, source) for source in sources]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(source=self.value())
+        return queryset
 
 
 @admin.register(Lead)
-class LeadAdmin(admin.ModelAdmin):
-    list_display = ("name", "email", "phone", "source", "status", "created_at")
-    list_filter = ("status", "source", "created_at")
+class LeadAdmin(KeysetPaginationMixin, admin.ModelAdmin):
+    list_display = (
+        "name",
+        "email",
+        "phone",
+        "source",
+        "status",
+        "campaign",
+        "landing_page",
+        "created_at",
+    )
+    list_filter = ("status", SourceListFilter, "created_at")
+    # Ambas FK admiten NULL, así que el select_related() automático no las sigue;
+    # LandingPage.__str__ además necesita su campaña
+    list_select_related = ("campaign", "landing_page__campaign")
     search_fields = ("name", "email", "phone")
-    date_hierarchy = "created_at"
+    autocomplete_fields = ("campaign", "landing_page")
+    change_list_template = "admin/analytics/lead/change_list.html"
 
     fieldsets = (
         ("Contact Information", {"fields": ("name", "email", "phone")}),
@@ -18,3 +74,110 @@ class LeadAdmin(admin.ModelAdmin):
     )
 
     readonly_fields = ("created_at", "updated_at")
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == "landing_page":
+            kwargs["queryset"] = LandingPage.objects.select_related("campaign")
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_urls(self):
+        return [
+            path(
+                "export/",
+                self.admin_site.admin_view(self.export_view),
+                name="analytics_lead_export",
+            ),
+            *super().get_urls(),
+        ]
+
+    def export_view(self, request):
+        """Descarga en streaming de los leads filtrados (CSV o NDJSON)."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        form = LeadExportFilterForm(request.GET)
+        fmt = request.GET.get("format", "csv")
+        if fmt not in FORMATS or not form.is_valid():
+            return HttpResponseBadRequest("Filtros de exportación inválidos")
+        return streaming_response(
+            request, form.queryset(), fmt, compress=request.GET.get("gzip") == "1"
+        )
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """Tablas que solo escriben los jobs; en el admin solo se consultan."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LeadDailyRollup)
+class LeadDailyRollupAdmin(ReadOnlyAdmin):
+    list_display = ("day", "source", "campaign", "landing_page", "status", "leads")
+    list_filter = ("status", "source", "campaign")
+    list_select_related = ("campaign", "landing_page")
+    date_hierarchy = "day"
+
+
+@admin.register(LeadUtmDailyRollup)
+class LeadUtmDailyRollupAdmin(ReadOnlyAdmin):
+    list_display = ("day", "campaign", "utm_source", "utm_medium", "utm_campaign", "leads")
+    list_filter = ("utm_source", "utm_medium", "campaign")
+    list_select_related = ("campaign",)
+    date_hierarchy = "day"
+
+
+@admin.register(JobCheckpoint)
+class JobCheckpointAdmin(ReadOnlyAdmin):
+    list_display = ("name", "high_water_mark", "updated_at")
+
+
+@admin.register(Event)
+class EventAdmin(KeysetPaginationMixin, ReadOnlyAdmin):
+    list_display = ("name", "path", "utm_source", "utm_campaign", "occurred_at")
+    list_filter = ("name",)
+    keyset_field = "occurred_at"
+
+
+@admin.register(ErasureRequest)
+class ErasureRequestAdmin(admin.ModelAdmin):
+    list_display = ("email", "status", "leads_erased", "requested_at", "processed_at")
+    list_filter = ("status",)
+    search_fields = ("email",)
+    readonly_fields = ("status", "leads_erased", "requested_at", "processed_at")
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        # El borrado lo hace el hilo de retención, no esta petición
+        super().save_model(request, obj, form, change)
+        worker = get_retention_worker()
+        if worker is not None:
+            transaction.on_commit(worker.wake)
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(ReadOnlyAdmin):
+    list_display = (
+        "lead", "destination", "status", "attempts", "next_attempt_at", "sent_at",
+    )
+    list_filter = ("status", "destination")
+    list_select_related = ("lead",)
+    search_fields = ("idempotency_key",)
+    actions = ("retry_now",)
+
+    @admin.action(description="Reintentar ahora")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status="sent").update(
+            status="pending", attempts=0, next_attempt_at=timezone.now()
+        )
+        worker = get_outbox_worker()
+        if worker is not None:
+            transaction.on_commit(worker.wake)
+        self.message_user(request, f"{updated} mensajes vuelven a la cola.")
@@ -0,0 +1,268 @@
+"""
+Archivo columnar de leads y eventos antiguos.
+
+``archive_rows`` mueve las filas con más de N días de la base de datos a
+archivos ``.npz`` comprimidos, una columna por arreglo de NumPy, particionados
+por mes y campaña::
+
+    <ROOT>/leads/2026-03/campaign-4/part-<primer id>-<último id>.npz
+    <ROOT>/events/2026-03/campaign-all/part-....npz
+
+El archivo es anónimo: de los leads solo se guardan las dimensiones de
+análisis (fuente, estado, campaña, landing, UTM y fecha), nunca nombre,
+email ni teléfono. Cada lote se escribe y sincroniza en disco antes de
+borrar sus filas; si el proceso cae entre ambos pasos el lote se archiva dos
+veces y ``load`` descarta los ids repetidos.
+
+El corte se alinea al inicio del día local, así que un día queda archivado
+completo y sus rollups diarios no se vuelven a recalcular (conservan los
+conteos históricos), salvo con ``update_lead_rollups(full=True)``.
+
+``prune_archive`` aplica al archivo los plazos de borrado de
+``DATA_RETENTION``: borra las partes de los meses vencidos y reescribe las
+del mes del corte sin sus filas vencidas. Lo llama ``run_retention``.
+
+``load`` junta las particiones pedidas y ``funnel``/``utm_breakdown``
+agregan sobre los arreglos de forma vectorizada, sin tocar la base de datos.
+NumPy es opcional: sin él solo falla el uso de este módulo.
+"""
+import os
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Event, Lead
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+UTM_FIELDS = ("utm_source", "utm_medium", "utm_campaign")
+FUNNEL_STEPS = ("page_view", "cta_click", "form_start", "form_submit")
+DTYPES = {"int": "int64", "datetime": "datetime64[s]", "str": "U"}
+
+
+class ArchiveSpec:
+    """Qué columnas archivar de un modelo y por qué campo de fecha."""
+
+    def __init__(self, model, time_field, columns, campaign_field=None):
+        self.model = model
+        self.time_field = time_field
+        self.columns = columns
+        self.campaign_field = campaign_field
+
+    @property
+    def fields(self):
+        return [name for name, _ in self.columns]
+
+
+ARCHIVES = {
+    "leads": ArchiveSpec(
+        Lead,
+        "created_at",
+        [
+            ("id", "int"),
+            ("created_at", "datetime"),
+            ("source", "str"),
+            ("status", "str"),
+            ("campaign_id", "int"),
+            ("landing_page_id", "int"),
+            *((field, "str") for field in UTM_FIELDS),
+        ],
+        campaign_field="campaign_id",
+    ),
+    "events": ArchiveSpec(
+        Event,
+        "occurred_at",
+        [
+            ("id", "int"),
+            ("occurred_at", "datetime"),
+            ("name", "str"),
+            ("path", "str"),
+            *((field, "str") for field in UTM_FIELDS),
+        ],
+    ),
+}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImproperlyConfigured(
+            "El archivo columnar necesita NumPy: instala el extra 'archive'."
+        )
+
+
+def archive_root():
+    return Path(settings.ANALYTICS_ARCHIVE["ROOT"])
+
+
+def cutoff_for(days, now=None):
+    """Inicio del día local de hace ``days`` días."""
+    today = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days)
+
+
+def _to_columns(spec, rows):
+    columns = {}
+    for index, (name, kind) in enumerate(spec.columns):
+        values = [row[index] for row in rows]
+        if kind == "int":
+            # -1 representa NULL (FK vacía)
+            columns[name] = np.array([-1 if v is None else v for v in values], dtype="int64")
+        elif kind == "datetime":
+            columns[name] = np.array(
+                [int(v.timestamp()) for v in values], dtype="int64"
+            ).astype("datetime64[s]")
+        else:
+            columns[name] = np.array([v or "" for v in values], dtype=str)
+    return columns
+
+
+def _partition(spec, row):
+    created = timezone.localtime(row[spec.fields.index(spec.time_field)])
+    campaign = "all"
+    if spec.campaign_field:
+        campaign = row[spec.fields.index(spec.campaign_field)]
+        campaign = "none" if campaign is None else str(campaign)
+    return created.strftime("%Y-%m"), campaign
+
+
+def write_part(root, kind, month, campaign, columns):
+    directory = Path(root) / kind / month / f"campaign-{campaign}"
+    directory.mkdir(parents=True, exist_ok=True)
+    ids = columns["id"]
+    path = directory / f"part-{ids.min()}-{ids.max()}.npz"
+    # Temporal por proceso: dos escritores de la misma parte no se mezclan
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as stream:
+        np.savez_compressed(stream, **columns)
+        stream.flush()
+        os.fsync(stream.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def archive_rows(kind, cutoff, root=None, batch_size=None, dry_run=False):
+    """
+    Mueve al archivo las filas de ``kind`` anteriores a ``cutoff``.
+    Devuelve cuántas filas movió (o movería, con ``dry_run``).
+    """
+    spec = ARCHIVES[kind]
+    queryset = spec.model.objects.filter(**{f"{spec.time_field}__lt": cutoff})
+    if dry_run:
+        return queryset.count()
+    _require_numpy()
+    root = root or archive_root()
+    batch_size = batch_size or settings.ANALYTICS_ARCHIVE["BATCH_SIZE"]
+
+    moved = 0
+    while True:
+        rows = list(queryset.order_by("pk").values_list(*spec.fields)[:batch_size])
+        if not rows:
+            return moved
+        partitions = defaultdict(list)
+        for row in rows:
+            partitions[_partition(spec, row)].append(row)
+        for (month, campaign), part in partitions.items():
+            write_part(root, kind, month, campaign, _to_columns(spec, part))
+        with transaction.atomic():
+            # Los ids crecen: el rango del lote contiene exactamente sus filas
+            queryset.filter(pk__gte=rows[0][0], pk__lte=rows[-1][0]).delete()
+        moved += len(rows)
+
+
+def prune_archive(kind, cutoff, root=None):
+    """
+    Borra del archivo las filas de ``kind`` anteriores a ``cutoff``.
+    Devuelve cuántas borró.
+    """
+    spec = ARCHIVES[kind]
+    base = Path(root or archive_root()) / kind
+    limit = timezone.localtime(cutoff).strftime("%Y-%m")
+    pruned = 0
+    for path in sorted(base.glob("*/campaign-*/part-*.npz")):
+        month = path.parent.parent.name
+        if month > limit:
+            continue
+        _require_numpy()
+        with np.load(path) as data:
+            columns = {name: data[name] for name in spec.fields}
+        if month < limit:
+            keep = np.zeros(len(columns["id"]), dtype=bool)
+        else:
+            keep = columns[spec.time_field] >= np.datetime64(int(cutoff.timestamp()), "s")
+        if keep.all():
+            continue
+        pruned += int((~keep).sum())
+        if keep.any():
+            # La parte nueva se escribe antes de borrar la vieja; si coinciden
+            # los ids extremos tiene el mismo nombre y la reemplaza
+            campaign = path.parent.name.removeprefix("campaign-")
+            kept = {name: values[keep] for name, values in columns.items()}
+            if write_part(base.parent, kind, month, campaign, kept) == path:
+                continue
+        path.unlink(missing_ok=True)
+    for directory in [*base.glob("*/campaign-*"), *base.glob("*")]:
+        if directory.is_dir() and not any(directory.iterdir()):
+            directory.rmdir()
+    return pruned
+
+
+def load(kind, root=None, months=None, campaigns=None):
+    """
+    Columnas de las particiones pedidas, concatenadas y sin ids repetidos.
+    ``months`` son cadenas ``"AAAA-MM"`` y ``campaigns`` ids de campaña.
+    """
+    _require_numpy()
+    spec = ARCHIVES[kind]
+    base = Path(root or archive_root()) / kind
+    wanted_campaigns = None if campaigns is None else {f"campaign-{c}" for c in campaigns}
+    parts = []
+    for path in sorted(base.glob("*/campaign-*/part-*.npz")):
+        month, campaign = path.parent.parent.name, path.parent.name
+        if months is not None and month not in months:
+            continue
+        if wanted_campaigns is not None and campaign not in wanted_campaigns:
+            continue
+        with np.load(path) as data:
+            parts.append({name: data[name] for name in spec.fields})
+
+    if not parts:
+        return {name: np.array([], dtype=DTYPES[column]) for name, column in spec.columns}
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in spec.fields}
+    _, first = np.unique(columns["id"], return_index=True)
+    if len(first) != len(columns["id"]):
+        columns = {name: values[first] for name, values in columns.items()}
+    return columns
+
+
+def utm_breakdown(columns):
+    """Conteo por ``(utm_source, utm_medium, utm_campaign)``, de mayor a menor."""
+    _require_numpy()
+    if not len(columns["id"]):
+        return []
+    keys = np.stack([columns[field] for field in UTM_FIELDS], axis=1)
+    unique, counts = np.unique(keys, axis=0, return_counts=True)
+    order = np.argsort(-counts, kind="stable")
+    return [(tuple(str(v) for v in unique[i]), int(counts[i])) for i in order]
+
+
+def funnel(events, steps=FUNNEL_STEPS, by="path"):
+    """
+    Eventos por paso del embudo agrupados por ``by``. Devuelve
+    ``(grupos, matriz)`` con una fila por grupo y una columna por paso.
+    """
+    _require_numpy()
+    groups, inverse = np.unique(events[by], return_inverse=True)
+    counts = np.zeros((len(groups), len(steps)), dtype="int64")
+    for column, step in enumerate(steps):
+        counts[:, column] = np.bincount(
+            inverse[events["name"] == step], minlength=len(groups)
+        )
+    return groups, counts
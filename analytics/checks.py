@@ -0,0 +1,37 @@
+"""
+Comprobaciones de configuración de ``analytics``.
+
+``check_archive_retention`` compara los plazos de ``ANALYTICS_ARCHIVE`` con
+los de ``DATA_RETENTION``: una fila debe archivarse antes de su plazo de
+borrado, o el archivo nunca la recibe y ``archive_analytics`` no sirve para
+ese tipo. Las filas archivadas las borra después ``run_retention``.
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# (tipo, plazo de archivo, plazo de borrado)
+ARCHIVE_RETENTION = (
+    ("leads", "LEAD_MAX_AGE_DAYS", "LEAD_DELETE_AFTER_DAYS"),
+    ("events", "EVENT_MAX_AGE_DAYS", "EVENT_DELETE_AFTER_DAYS"),
+)
+
+
+@register()
+def check_archive_retention(app_configs, **kwargs):
+    found = []
+    for kind, archive_key, delete_key in ARCHIVE_RETENTION:
+        archive_days = settings.ANALYTICS_ARCHIVE[archive_key]
+        delete_days = settings.DATA_RETENTION[delete_key]
+        if delete_days and archive_days >= delete_days:
+            found.append(
+                Warning(
+                    f"Los {kind} se borran a los {delete_days} días y se archivan "
+                    f"a los {archive_days}: nunca llegan al archivo.",
+                    hint=(
+                        f"Baja ANALYTICS_ARCHIVE['{archive_key}'] por debajo de "
+                        f"DATA_RETENTION['{delete_key}']."
+                    ),
+                    id="analytics.W001",
+                )
+            )
+    return found
@@ -0,0 +1,156 @@
+"""
+Recolección de eventos de primera parte (``/collect``).
+
+El endpoint solo valida el lote y lo deja en un buffer en memoria; un hilo
+en segundo plano lo vacía con ``bulk_create`` cada ``FLUSH_INTERVAL``
+segundos o al llegar a ``BATCH_SIZE`` eventos. Así una petición del beacon
+nunca espera a la base de datos.
+
+A diferencia de los leads, los eventos toleran pérdidas: el buffer no se
+respalda en disco y, si llega a ``MAX_PENDING``, los eventos sobrantes se
+descartan y se cuentan en ``dropped`` en lugar de frenar al navegador.
+"""
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from landings.background import PeriodicFlusher
+
+from .models import Event
+
+EVENT_NAMES = {name for name, _ in Event.NAME_CHOICES}
+UTM_FIELDS = ("utm_source", "utm_medium", "utm_campaign")
+MAX_PROPS = 10
+
+# Margen aceptado para la hora que informa el navegador
+CLOCK_SKEW = timedelta(days=1)
+
+
+def _text(value, max_length):
+    return value[:max_length] if isinstance(value, str) else ""
+
+
+def _props(value):
+    if not isinstance(value, dict):
+        return {}
+    props = {}
+    for key, item in list(value.items())[:MAX_PROPS]:
+        if isinstance(item, (bool, int, float)):
+            props[str(key)[:50]] = item
+        elif isinstance(item, str):
+            props[str(key)[:50]] = item[:200]
+    return props
+
+
+def _occurred_at(value, now):
+    try:
+        occurred_at = datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return now
+    if abs(occurred_at - now) > CLOCK_SKEW:
+        return now
+    return occurred_at
+
+
+def parse_events(payload, now=None, limit=None):
+    """
+    Convierte el JSON del beacon en instancias de ``Event`` sin guardar.
+    Los eventos desconocidos o mal formados se ignoran.
+    """
+    now = now or timezone.now()
+    items = payload.get("events") if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        return []
+    events = []
+    for item in items[:limit]:
+        if not isinstance(item, dict) or item.get("name") not in EVENT_NAMES:
+            continue
+        utm = item.get("utm") if isinstance(item.get("utm"), dict) else {}
+        events.append(
+            Event(
+                name=item["name"],
+                path=_text(item.get("path"), 200) or "/",
+                referrer=_text(item.get("referrer"), 200),
+                props=_props(item.get("props")),
+                occurred_at=_occurred_at(item.get("ts"), now),
+                received_at=now,
+                **{field: _text(utm.get(field), 100) for field in UTM_FIELDS},
+            )
+        )
+    return events
+
+
+class EventBuffer:
+    """
+    Cola acotada de eventos pendientes de insertar.
+    """
+
+    def __init__(self, batch_size=1000, max_pending=50000):
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def start(self, interval):
+        if self._flusher is None:
+            self._flusher = PeriodicFlusher(self.flush, interval, "event-buffer")
+            self._flusher.start()
+
+    def add(self, events):
+        """Encola ``events``. Devuelve cuántos se aceptaron."""
+        with self._lock:
+            room = max(self.max_pending - len(self._pending), 0)
+            accepted = events[:room]
+            self._pending.extend(accepted)
+            self.dropped += len(events) - len(accepted)
+            full = len(self._pending) >= self.batch_size
+        if full and self._flusher is not None:
+            self._flusher.wake()
+        return len(accepted)
+
+    def flush(self):
+        """Inserta los eventos pendientes. Devuelve cuántos escribió."""
+        with self._flush_lock:
+            with self._lock:
+                events = list(self._pending)
+                self._pending.clear()
+            if not events:
+                return 0
+            try:
+                Event.objects.bulk_create(events, batch_size=self.batch_size)
+            except Exception:
+                with self._lock:
+                    # Se devuelven al frente, sin pasarse del límite
+                    room = max(self.max_pending - len(self._pending), 0)
+                    self._pending.extendleft(reversed(events[:room]))
+                    self.dropped += len(events) - min(room, len(events))
+                raise
+            return len(events)
+
+
+@cache
+def get_event_buffer():
+    """Buffer compartido por el proceso, con su hilo de flush iniciado."""
+    config = settings.EVENT_COLLECTION
+    buffer = EventBuffer(config["BATCH_SIZE"], config["MAX_PENDING"])
+    if config["FLUSH_INTERVAL"]:
+        buffer.start(config["FLUSH_INTERVAL"])
+    return buffer
+
+
+@receiver(setting_changed)
+def _reset_event_buffer(setting, **kwargs):
+    if setting == "EVENT_COLLECTION":
+        get_event_buffer.cache_clear()
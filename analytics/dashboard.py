@@ -0,0 +1,251 @@
+"""
+Panel de rendimiento de campañas para la portada del admin.
+
+El panel nunca agrega leads en vivo: lee ``CampaignPerformance``, una tabla
+con una fila por landing (más una por campaña para los leads sin landing)
+que se calcula a partir de los rollups diarios. Cada refresco primero
+avanza los rollups de forma incremental (``update_lead_rollups``) y luego
+suma sus pocas filas, así que cuesta lo mismo con mil leads que con
+millones.
+
+El refresco también es incremental: solo recalcula las campañas con leads
+modificados desde la marca de agua de su ``JobCheckpoint`` o con landings
+cuyas vistas cambiaron, y escribe sus filas con un upsert sobre ``key``. El
+primer refresco de cada día local recalcula todas, porque las ventanas de
+7 días se movieron. Un lead que cambia de campaña solo deja rastro en
+``updated_at`` para la nueva, y uno borrado para ninguna: por eso también se
+recalculan las campañas cuyo total en los rollups ya no coincide con el del
+resumen, una suma sobre las mismas pocas filas. La fila del checkpoint, bloqueada con
+``SELECT ... FOR UPDATE SKIP LOCKED``, hace que solo un proceso refresque a
+la vez aunque cada worker tenga su hilo.
+
+La lectura sigue el patrón stale-while-revalidate: si el resumen tiene más
+de ``MAX_AGE`` segundos se muestra igual y se despierta el hilo de refresco
+del proceso, que además corre cada ``REFRESH_INTERVAL`` segundos.
+"""
+from datetime import timedelta
+from functools import cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.dispatch import receiver
+from django.utils import timezone
+
+from landings.background import PeriodicFlusher
+from landings.models import LandingPage
+
+from .models import CampaignPerformance, JobCheckpoint, Lead, LeadDailyRollup
+from .rollups import update_lead_rollups
+
+CHECKPOINT = "campaign_performance"
+
+
+def _touched_campaigns(since, upper):
+    """
+    Campañas cuyo resumen pudo cambiar: leads modificados entre ``since`` y
+    ``upper``, campañas cuyo total de leads en los rollups ya no coincide con
+    el del resumen y landings con otras vistas o de otra campaña que en el
+    resumen.
+    """
+    touched = set()
+    changed = Lead.objects.filter(updated_at__gt=since, updated_at__lte=upper)
+    for campaign_id, landing_campaign_id in (
+        changed.values_list("campaign_id", "landing_page__campaign_id").order_by().distinct()
+    ):
+        touched.add(campaign_id or landing_campaign_id)
+    # Un lead movido de A a B solo delata a B en ``updated_at``; A se nota
+    # porque su total bajó. Lo mismo pasa con los leads borrados
+    totals = {}
+    for campaign_id, landing_campaign_id, leads in (
+        LeadDailyRollup.objects.values("campaign_id", "landing_page__campaign_id")
+        .annotate(total=Sum("leads"))
+        .values_list("campaign_id", "landing_page__campaign_id", "total")
+        .order_by()
+    ):
+        campaign_id = campaign_id or landing_campaign_id
+        totals[campaign_id] = totals.get(campaign_id, 0) + leads
+    summarized = dict(
+        CampaignPerformance.objects.values("campaign_id")
+        .annotate(total=Sum("leads"))
+        .values_list("campaign_id", "total")
+        .order_by()
+    )
+    for campaign_id in totals.keys() | summarized.keys():
+        if totals.get(campaign_id, 0) != summarized.get(campaign_id, 0):
+            touched.add(campaign_id)
+    stored = dict(
+        (landing_id, (campaign_id, views))
+        for landing_id, campaign_id, views in CampaignPerformance.objects.filter(
+            landing_page__isnull=False
+        ).values_list("landing_page_id", "campaign_id", "views")
+    )
+    for landing_id, campaign_id, views in LandingPage.objects.values_list(
+        "pk", "campaign_id", "view_count"
+    ):
+        row = stored.get(landing_id)
+        if row != (campaign_id, views):
+            touched.add(campaign_id)
+            if row is not None:
+                touched.add(row[0])
+    touched.discard(None)
+    return touched
+
+
+def refresh_campaign_performance(now=None, full=False):
+    """
+    Actualiza ``CampaignPerformance`` con las campañas tocadas desde el
+    último refresco, o con todas con ``full=True``. Devuelve cuántas filas
+    escribió; 0 si otro proceso está refrescando.
+    """
+    now = now or timezone.now()
+    JobCheckpoint.objects.get_or_create(name=CHECKPOINT)
+    with transaction.atomic():
+        # Un solo refresco a la vez en todo el despliegue: los demás workers
+        # no esperan el lock, se saltan esta vuelta
+        checkpoint = (
+            JobCheckpoint.objects.select_for_update(skip_locked=True)
+            .filter(name=CHECKPOINT)
+            .first()
+        )
+        if checkpoint is None:
+            return 0
+        update_lead_rollups(now=now)
+        upper = now - timedelta(seconds=settings.LEAD_ROLLUPS["SAFETY_LAG"])
+        since = checkpoint.high_water_mark
+        today = timezone.localdate(now)
+        # Las ventanas de 7 días se mueven al cambiar el día: entonces todas
+        if full or since is None or timezone.localdate(since) != today:
+            touched = None
+        else:
+            touched = _touched_campaigns(since, upper)
+        written = _write_campaigns(touched, today, now) if touched != set() else 0
+        CampaignPerformance.objects.update(refreshed_at=now)
+        checkpoint.high_water_mark = upper
+        checkpoint.save()
+    return written
+
+
+def _write_campaigns(touched, today, now):
+    """Recalcula las filas de ``touched`` (``None``: todas) y hace upsert."""
+    week_ago, two_weeks_ago = today - timedelta(days=7), today - timedelta(days=14)
+    landings_in, rollups_in = LandingPage.objects.all(), LeadDailyRollup.objects.all()
+    if touched is not None:
+        landings_in = landings_in.filter(campaign_id__in=touched)
+        rollups_in = rollups_in.filter(
+            Q(campaign_id__in=touched)
+            | Q(campaign_id__isnull=True, landing_page__campaign_id__in=touched)
+        )
+    rows = {}
+    for landing_id, campaign_id, views in landings_in.values_list(
+        "pk", "campaign_id", "view_count"
+    ):
+        rows[campaign_id, landing_id] = CampaignPerformance(
+            campaign_id=campaign_id,
+            landing_page_id=landing_id,
+            views=views,
+            refreshed_at=now,
+        )
+    totals = (
+        rollups_in.values("campaign_id", "landing_page_id", "landing_page__campaign_id")
+        .annotate(
+            total=Sum("leads"),
+            recent=Sum("leads", filter=Q(day__gt=week_ago)),
+            previous=Sum("leads", filter=Q(day__gt=two_weeks_ago, day__lte=week_ago)),
+        )
+        .order_by()
+    )
+    for group in totals:
+        landing_id = group["landing_page_id"]
+        landing_campaign_id = group["landing_page__campaign_id"]
+        # Leads sin campaña propia se atribuyen a la campaña de su landing
+        campaign_id = group["campaign_id"] or landing_campaign_id
+        if campaign_id is None:
+            continue
+        if landing_id is not None and landing_campaign_id != campaign_id:
+            landing_id = None
+        row = rows.setdefault(
+            (campaign_id, landing_id),
+            CampaignPerformance(
+                campaign_id=campaign_id, landing_page_id=landing_id, refreshed_at=now
+            ),
+        )
+        row.leads += group["total"]
+        row.leads_last_7_days += group["recent"] or 0
+        row.leads_previous_7_days += group["previous"] or 0
+
+    for row in rows.values():
+        row.key = CampaignPerformance.key_for(row.campaign_id, row.landing_page_id)
+    stale = CampaignPerformance.objects.exclude(key__in=[row.key for row in rows.values()])
+    if touched is not None:
+        stale = stale.filter(campaign_id__in=touched)
+    stale.delete()
+    CampaignPerformance.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=[
+            "campaign",
+            "landing_page",
+            "views",
+            "leads",
+            "leads_last_7_days",
+            "leads_previous_7_days",
+            "refreshed_at",
+        ],
+    )
+    return len(rows)
+
+
+@cache
+def get_performance_refresher():
+    """Hilo de refresco del proceso, o ``None`` si está desactivado."""
+    interval = settings.CAMPAIGN_DASHBOARD["REFRESH_INTERVAL"]
+    if not interval:
+        return None
+    refresher = PeriodicFlusher(
+        refresh_campaign_performance, interval, "campaign-performance", flush_on_exit=False
+    )
+    refresher.start()
+    return refresher
+
+
+@receiver(setting_changed)
+def _reset_refresher(setting, **kwargs):
+    if setting == "CAMPAIGN_DASHBOARD":
+        get_performance_refresher.cache_clear()
+
+
+def campaign_performance():
+    """
+    Filas del resumen agrupadas por campaña, con su fecha de actualización.
+    Si el resumen caducó se pide un refresco en segundo plano.
+    """
+    rows = list(
+        CampaignPerformance.objects.select_related("campaign", "landing_page").order_by(
+            "campaign__name", "landing_page__title"
+        )
+    )
+    refreshed_at = min((row.refreshed_at for row in rows), default=None)
+    max_age = timedelta(seconds=settings.CAMPAIGN_DASHBOARD["MAX_AGE"])
+    if refreshed_at is None or timezone.now() - refreshed_at > max_age:
+        refresher = get_performance_refresher()
+        if refresher is not None:
+            refresher.wake()
+
+    campaigns = {}
+    for row in rows:
+        summary = campaigns.get(row.campaign_id)
+        if summary is None:
+            # Totales de la campaña, sin guardar, con sus landings debajo
+            summary = campaigns[row.campaign_id] = CampaignPerformance(
+                campaign=row.campaign, refreshed_at=row.refreshed_at
+            )
+            summary.landings = []
+        summary.views += row.views
+        summary.leads += row.leads
+        summary.leads_last_7_days += row.leads_last_7_days
+        summary.leads_previous_7_days += row.leads_previous_7_days
+        summary.landings.append(row)
+    return list(campaigns.values()), refreshed_at
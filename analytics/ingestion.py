@@ -0,0 +1,298 @@
+"""
+Ingesta de leads con buffer en disco y escritura por lotes.
+
+En modo ``buffered`` cada registro validado se anexa a un archivo de spool
+local (durable ante reinicios del worker) y se mantiene en memoria hasta que
+un hilo en segundo plano lo inserta en ``analytics.Lead`` con ``bulk_create``.
+El flush ocurre al alcanzar ``BATCH_SIZE`` o cada ``FLUSH_INTERVAL`` segundos,
+así que la base de datos recibe una transacción por lote en lugar de una por
+POST.
+
+La reinserción de un spool es idempotente gracias al upsert sobre el email
+normalizado, por lo que los archivos que quedaron a medio procesar tras una
+caída se pueden reproducir sin riesgo de duplicar leads ni sus notificaciones
+(``analytics.outbox``). Al arrancar, cada buffer reclama también el spool
+vivo (``leads-<pid>.jsonl``) de los workers cuyo PID ya no existe.
+
+Un registro que no cabe en ``Lead`` (campo demasiado largo, email inválido o
+línea JSON cortada por una caída) no debe bloquear la cola: se aparta en
+``<spool>.failed`` y se registra en el log, y el resto del lote se escribe.
+Si la recuperación falla por otro motivo (por ejemplo, la base de datos no
+responde) el spool se queda para el siguiente flush, pero el lote nuevo se
+escribe igual.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from functools import cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.signals import setting_changed
+from django.core.validators import validate_email
+from django.db import DataError
+from django.dispatch import receiver
+
+from landings.background import PeriodicFlusher
+
+from .models import Lead, normalize_email
+from .outbox import save_leads
+
+logger = logging.getLogger(__name__)
+
+LEAD_FIELDS = ("name", "email", "phone", "source")
+
+
+def invalid_lead_fields(record):
+    """Campos de ``record`` que no caben en ``Lead`` o no son válidos."""
+    invalid = []
+    for field in LEAD_FIELDS:
+        value = record.get(field) or ""
+        max_length = Lead._meta.get_field(field).max_length
+        if not isinstance(value, str) or len(value) > max_length:
+            invalid.append(field)
+    if "email" not in invalid:
+        try:
+            validate_email((record.get("email") or "").strip())
+        except ValidationError:
+            invalid.append("email")
+    return invalid
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class QueueFull(Exception):
+    """El buffer alcanzó ``MAX_PENDING`` y no se liberó espacio a tiempo."""
+
+
+class LeadBuffer:
+    """
+    Cola acotada de leads pendientes, respaldada por un archivo de spool.
+    """
+
+    def __init__(
+        self,
+        spool_dir,
+        batch_size=200,
+        max_pending=5000,
+        enqueue_timeout=0.5,
+        fsync=True,
+    ):
+        self.spool_dir = Path(spool_dir)
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._pending_emails = set()
+        self._spool_fd = None
+        self._flusher = None
+        self._needs_recovery = False
+
+    @classmethod
+    def from_settings(cls):
+        config = settings.LEAD_INGESTION
+        return cls(
+            spool_dir=config["SPOOL_DIR"],
+            batch_size=config["BATCH_SIZE"],
+            max_pending=config["MAX_PENDING"],
+            enqueue_timeout=config["ENQUEUE_TIMEOUT"],
+            fsync=config["FSYNC"],
+        )
+
+    @property
+    def spool_path(self):
+        return self.spool_dir / f"leads-{os.getpid()}.jsonl"
+
+    def __len__(self):
+        return len(self._pending)
+
+    def is_pending(self, email):
+        return normalize_email(email) in self._pending_emails
+
+    def start(self, interval):
+        """Arranca el hilo de flush y reprocesa spools pendientes de una caída."""
+        if self._flusher is None:
+            # El primer flush del hilo reprocesa los spools que quedaron en disco
+            self._claim_orphans()
+            self._needs_recovery = True
+            self._flusher = PeriodicFlusher(self.flush, interval, "lead-buffer")
+            self._flusher.start()
+
+    def submit(self, record):
+        """
+        Encola un lead. Bloquea hasta ``enqueue_timeout`` si el buffer está
+        lleno y lanza ``QueueFull`` si no se libera espacio.
+        """
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode()
+        with self._not_full:
+            if len(self._pending) >= self.max_pending:
+                self._not_full.wait_for(
+                    lambda: len(self._pending) < self.max_pending,
+                    timeout=self.enqueue_timeout,
+                )
+                if len(self._pending) >= self.max_pending:
+                    raise QueueFull()
+            self._append_to_spool(line)
+            self._pending.append(record)
+            self._pending_emails.add(normalize_email(record["email"]))
+            batch_ready = len(self._pending) >= self.batch_size
+
+        if batch_ready and self._flusher is not None:
+            self._flusher.wake()
+
+    def flush(self):
+        """Inserta todos los leads pendientes. Devuelve cuántos se enviaron."""
+        with self._flush_lock:
+            if self._needs_recovery:
+                self._recover()
+
+            with self._lock:
+                batch = self._pending
+                self._pending = []
+                self._pending_emails = set()
+                rotated = self._rotate_spool()
+                self._not_full.notify_all()
+
+            try:
+                if batch:
+                    self._write(batch, rotated)
+            except Exception:
+                # El spool rotado queda en disco y se reintenta en el próximo flush
+                self._needs_recovery = True
+                raise
+            if rotated is not None:
+                rotated.unlink(missing_ok=True)
+            return len(batch)
+
+    def recover(self):
+        """Reprocesa spools rotados que no llegaron a confirmarse."""
+        with self._flush_lock:
+            self._claim_orphans()
+            self._recover()
+
+    def _claim_orphans(self):
+        """Rota a ``.flushing`` los spools vivos de workers que ya no existen."""
+        for path in self.spool_dir.glob("leads-*.jsonl"):
+            try:
+                pid = int(path.stem.removeprefix("leads-"))
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                # Un proceso anterior con nuestro PID, si aún no escribimos
+                if self._spool_fd is not None:
+                    continue
+            elif _pid_alive(pid):
+                continue
+            try:
+                os.replace(path, path.with_name(f"leads-{pid}-{time.time_ns()}.flushing"))
+            except FileNotFoundError:
+                # Otro worker lo reclamó antes
+                continue
+            logger.warning("Reclamado el spool huérfano %s", path.name)
+
+    def _recover(self):
+        failed = False
+        for path in sorted(self.spool_dir.glob("*.flushing")):
+            records, torn = [], []
+            with path.open(encoding="utf-8") as spool:
+                for line in spool:
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        torn.append(line)
+            try:
+                self._write(records, path)
+            except Exception:
+                # Se reintenta en el próximo flush, sin frenar los lotes nuevos
+                logger.exception("No se pudo recuperar el spool %s", path.name)
+                failed = True
+                continue
+            if torn:
+                self._reject(path, torn)
+            path.unlink(missing_ok=True)
+            logger.info("Recuperados %d leads de %s", len(records), path.name)
+        self._needs_recovery = failed
+
+    def _reject(self, spool, lines):
+        """Aparta en ``<spool>.failed`` las líneas que no se pueden insertar."""
+        failed = spool.with_suffix(".failed")
+        with failed.open("a", encoding="utf-8") as stream:
+            stream.writelines(line if line.endswith("\n") else line + "\n" for line in lines)
+        logger.error("Apartados %d registros inválidos en %s", len(lines), failed.name)
+
+    def _append_to_spool(self, line):
+        if self._spool_fd is None:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            self._spool_fd = os.open(
+                self.spool_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600
+            )
+        os.write(self._spool_fd, line)
+        if self.fsync:
+            os.fsync(self._spool_fd)
+
+    def _rotate_spool(self):
+        if self._spool_fd is None:
+            return None
+        os.close(self._spool_fd)
+        self._spool_fd = None
+        rotated = self.spool_path.with_name(
+            f"leads-{os.getpid()}-{time.time_ns()}.flushing"
+        )
+        os.replace(self.spool_path, rotated)
+        return rotated
+
+    def _write(self, records, spool):
+        valid, rejected = [], []
+        for record in records:
+            (rejected if invalid_lead_fields(record) else valid).append(record)
+        leads = [
+            Lead(**{field: record.get(field) for field in LEAD_FIELDS})
+            for record in valid
+        ]
+        try:
+            save_leads(leads, batch_size=self.batch_size)
+        except DataError:
+            # Algo que la validación no cubre: se separa el registro culpable
+            for record, lead in zip(valid, leads):
+                try:
+                    save_leads([lead])
+                except DataError:
+                    rejected.append(record)
+        if rejected:
+            self._reject(
+                spool, [json.dumps(record, ensure_ascii=False) for record in rejected]
+            )
+
+
+@cache
+def get_lead_buffer():
+    """Buffer compartido por el proceso, con su hilo de flush ya iniciado."""
+    lead_buffer = LeadBuffer.from_settings()
+    interval = settings.LEAD_INGESTION["FLUSH_INTERVAL"]
+    if interval:
+        lead_buffer.start(interval)
+    return lead_buffer
+
+
+@receiver(setting_changed)
+def _reset_lead_buffer(setting, **kwargs):
+    if setting == "LEAD_INGESTION":
+        get_lead_buffer.cache_clear()
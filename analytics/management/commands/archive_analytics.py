@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from analytics.archive import archive_root, archive_rows, cutoff_for
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve los leads y eventos antiguos a archivos columnares comprimidos "
+        "y los borra de la base de datos"
+    )
+
+    def add_arguments(self, parser):
+        config = settings.ANALYTICS_ARCHIVE
+        parser.add_argument(
+            "--lead-days",
+            type=int,
+            default=config["LEAD_MAX_AGE_DAYS"],
+            help="Archiva los leads con más de N días",
+        )
+        parser.add_argument(
+            "--event-days",
+            type=int,
+            default=config["EVENT_MAX_AGE_DAYS"],
+            help="Archiva los eventos con más de N días",
+        )
+        parser.add_argument("--root", help="Directorio del archivo")
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Solo cuenta las filas a archivar"
+        )
+
+    def handle(self, *args, lead_days, event_days, root, dry_run, **options):
+        root = root or archive_root()
+        for kind, days in (("leads", lead_days), ("events", event_days)):
+            cutoff = cutoff_for(days)
+            moved = archive_rows(kind, cutoff, root=root, dry_run=dry_run)
+            verb = "a archivar" if dry_run else "archivados"
+            self.stdout.write(
+                self.style.SUCCESS(f"{kind}: {moved} {verb} (anteriores a {cutoff:%Y-%m-%d})")
+            )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from analytics.archive import FUNNEL_STEPS, archive_root, funnel, load, utm_breakdown
+
+
+class Command(BaseCommand):
+    help = "Resume el archivo columnar: embudo por ruta y leads por UTM"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--root", help="Directorio del archivo")
+        parser.add_argument(
+            "--month", action="append", dest="months", help="Mes AAAA-MM (repetible)"
+        )
+        parser.add_argument(
+            "--campaign",
+            action="append",
+            dest="campaigns",
+            help="Id de campaña de los leads (repetible)",
+        )
+        parser.add_argument("--top", type=int, default=10)
+
+    def handle(self, *args, root, months, campaigns, top, **options):
+        root = root or archive_root()
+
+        events = load("events", root=root, months=months)
+        paths, counts = funnel(events)
+        self.stdout.write(f"Embudo ({len(events['id'])} eventos)")
+        self.stdout.write("  ruta\t" + "\t".join(FUNNEL_STEPS))
+        for path, row in zip(paths, counts):
+            self.stdout.write(f"  {path}\t" + "\t".join(str(n) for n in row))
+
+        leads = load("leads", root=root, months=months, campaigns=campaigns)
+        self.stdout.write(f"Leads por UTM ({len(leads['id'])} leads)")
+        for (source, medium, campaign), total in utm_breakdown(leads)[:top]:
+            label = "/".join(value or "-" for value in (source, medium, campaign))
+            self.stdout.write(f"  {label}\t{total}")
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.export import FORMATS, LeadExportFilterForm, iter_export
+
+
+class Command(BaseCommand):
+    help = "Exporta leads en streaming como CSV o NDJSON, opcionalmente comprimidos con gzip"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument(
+            "--output", "-o", help="Archivo de salida (por defecto la salida estándar)"
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        for name in LeadExportFilterForm.base_fields:
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name)
+
+    def handle(self, *args, format, gzip, output, chunk_size, **options):
+        form = LeadExportFilterForm(
+            {name: options[name] for name in LeadExportFilterForm.base_fields if options[name]}
+        )
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        chunks = iter_export(form.queryset(), format, gzip, chunk_size)
+        if output:
+            with open(output, "wb") as stream:
+                for chunk in chunks:
+                    stream.write(chunk)
+        else:
+            # Bytes crudos: self.stdout solo acepta texto
+            stream = getattr(self.stdout, "buffer", None) or sys.stdout.buffer
+            for chunk in chunks:
+                stream.write(chunk)
+            stream.flush()
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from analytics.synthetic import DESCRIPTION, generate
+from landings.models import Campaign
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera campañas, landings y leads sintéticos con distribuciones "
+        "realistas de UTM, estado y fechas para probar a escala de producción"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--leads", type=int, default=1_000_000)
+        parser.add_argument("--campaigns", type=int, default=50)
+        parser.add_argument("--landings", type=int, default=4, help="Landings por campaña")
+        parser.add_argument("--days", type=int, default=365, help="Días de historia")
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Semilla; el mismo valor genera los mismos datos",
+        )
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Leads por transacción")
+        parser.add_argument(
+            "--method",
+            choices=("auto", "bulk", "copy"),
+            default="auto",
+            help="bulk_create o COPY (solo PostgreSQL); auto elige COPY si puede",
+        )
+
+    def handle(self, *args, leads, seed, method, **options):
+        if method == "copy" and connection.vendor != "postgresql":
+            raise CommandError("--method copy solo funciona con PostgreSQL")
+        if Campaign.objects.filter(description=DESCRIPTION.format(seed=seed)).exists():
+            raise CommandError(
+                f"Ya hay datos sintéticos con --seed {seed}; usa otra semilla"
+            )
+
+        def progress(loaded):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{loaded}/{leads} leads")
+
+        started = time.perf_counter()
+        created = generate(
+            options["campaigns"],
+            options["landings"],
+            leads,
+            seed=seed,
+            days=options["days"],
+            chunk_size=options["chunk_size"],
+            method=method,
+            progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{created['campaigns']} campañas, {created['landings']} landings y "
+                f"{created['leads']} leads en {elapsed:.1f}s "
+                f"({created['leads'] / elapsed:.0f} leads/s)"
+            )
+        )
@@ -0,0 +1,89 @@
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+
+from analytics.models import Lead
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuántos leads por segundo acepta la base de datos configurada "
+        "con varios hilos escribiendo a la vez, como lo harían los workers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writes", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1,
+            help="Leads por transacción (1 = un INSERT por registro, como el modo sync)",
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="No borrar los leads generados al terminar"
+        )
+
+    def handle(self, *args, writes, concurrency, batch_size, keep, **options):
+        run = uuid.uuid4().hex[:12]
+        batches = [
+            range(start, min(start + batch_size, writes))
+            for start in range(0, writes, batch_size)
+        ]
+        errors = []
+        errors_lock = threading.Lock()
+
+        def write(batch):
+            leads = [
+                Lead(
+                    name=f"Load test {n}",
+                    email=f"loadtest-{run}-{n}@example.invalid",
+                    source="loadtest",
+                )
+                for n in batch
+            ]
+            start = time.perf_counter()
+            try:
+                Lead.objects.upsert(leads)
+            except DatabaseError as exc:
+                with errors_lock:
+                    errors.append(exc)
+                return None
+            return time.perf_counter() - start
+
+        def worker(chunk):
+            try:
+                return [write(batch) for batch in chunk]
+            finally:
+                connection.close()
+
+        chunks = [batches[i::concurrency] for i in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = [latency for chunk in pool.map(worker, chunks) for latency in chunk]
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency in results if latency is not None)
+        written = Lead.objects.filter(email_normalized__startswith=f"loadtest-{run}-").count()
+        self.stdout.write(
+            f"{connection.vendor}: {written} leads en {elapsed:.2f}s "
+            f"({written / elapsed:.1f} escrituras/s) con {concurrency} hilos, "
+            f"{batch_size} por transacción"
+        )
+        if len(latencies) >= 2:
+            quantiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f"latencia por transacción: p50 {quantiles[49] * 1000:.2f} ms, "
+                f"p95 {quantiles[94] * 1000:.2f} ms"
+            )
+        if errors:
+            self.stdout.write(
+                self.style.WARNING(f"{len(errors)} transacciones fallidas: {errors[0]}")
+            )
+        if not keep:
+            Lead.objects.filter(email_normalized__startswith=f"loadtest-{run}-").delete()
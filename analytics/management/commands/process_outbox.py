@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.outbox import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = (
+        "Entrega las notificaciones de leads pendientes (email, WhatsApp, CRM); "
+        "con --loop queda corriendo como worker dedicado"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            type=float,
+            metavar="SECONDS",
+            help="Repite la entrega cada SECONDS segundos en lugar de salir",
+        )
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker.from_settings()
+        while True:
+            sent, failed = worker.drain()
+            if sent or failed or not options["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Enviados: {sent}, fallidos: {failed}")
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["loop"])
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from analytics.dashboard import refresh_campaign_performance
+
+
+class Command(BaseCommand):
+    help = "Recalcula el resumen de rendimiento de campañas del panel del admin"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recalcula todas las campañas, no solo las que cambiaron",
+        )
+
+    def handle(self, *args, full, **options):
+        rows = refresh_campaign_performance(full=full)
+        self.stdout.write(self.style.SUCCESS(f"{rows} filas de rendimiento actualizadas"))
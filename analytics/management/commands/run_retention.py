@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from analytics.retention import run_retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Aplica los plazos de retención: solicitudes de supresión, "
+        "anonimización y borrado de leads y eventos antiguos"
+    )
+
+    def handle(self, *args, **options):
+        results = run_retention()
+        if results is None:
+            self.stdout.write("Otro proceso está aplicando la retención; nada que hacer")
+            return
+        summary = ", ".join(f"{name}: {count}" for name, count in results.items())
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import update_lead_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Actualiza los resúmenes diarios de leads con los cambios posteriores "
+        "a la última ejecución"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Reconstruye todos los resúmenes desde cero (p. ej. tras borrar leads)",
+        )
+
+    def handle(self, *args, full, **options):
+        days, rows = update_lead_rollups(full=full)
+        self.stdout.write(
+            self.style.SUCCESS(f"{days} días recalculados, {rows} filas de resumen")
+        )
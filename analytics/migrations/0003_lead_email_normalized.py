@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:52
+
+from django.db import migrations, models
+
+
+def populate_email_normalized(apps, schema_editor):
+    Lead = apps.get_model("analytics", "Lead")
+    seen = set()
+    for lead in Lead.objects.order_by("created_at", "pk").iterator():
+        normalized = (lead.email or "").strip().lower()
+        if normalized in seen:
+            # Duplicado que antes solo difería en mayúsculas o espacios: se
+            # conserva el registro más antiguo como dueño del email normalizado
+            normalized = f"{normalized}#{lead.pk}"
+        seen.add(normalized)
+        Lead.objects.filter(pk=lead.pk).update(email_normalized=normalized)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_lead_delete_webinarlead'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='email_normalized',
+            field=models.CharField(editable=False, max_length=254, null=True, verbose_name='Email Normalizado'),
+        ),
+        migrations.RunPython(populate_email_normalized, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='lead',
+            name='email_normalized',
+            field=models.CharField(editable=False, max_length=254, unique=True, verbose_name='Email Normalizado'),
+        ),
+        migrations.AlterField(
+            model_name='lead',
+            name='email',
+            field=models.EmailField(max_length=254, verbose_name='Correo Electrónico'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_lead_email_normalized'),
+        ('landings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Job')),
+                ('high_water_mark', models.DateTimeField(blank=True, null=True, verbose_name='Procesado Hasta')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Última Ejecución')),
+            ],
+            options={
+                'verbose_name': 'Checkpoint de Job',
+                'verbose_name_plural': 'Checkpoints de Jobs',
+            },
+        ),
+        migrations.CreateModel(
+            name='LeadDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('source', models.CharField(max_length=50, verbose_name='Fuente')),
+                ('status', models.CharField(choices=[('new', 'Nuevo'), ('contacted', 'Contactado'), ('qualified', 'Calificado'), ('converted', 'Convertido'), ('lost', 'Perdido')], max_length=20, verbose_name='Estado')),
+                ('leads', models.PositiveIntegerField(verbose_name='Leads')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Leads',
+                'verbose_name_plural': 'Resúmenes Diarios de Leads',
+                'ordering': ['-day', 'source', 'status'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeadUtmDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('utm_source', models.CharField(blank=True, max_length=100, verbose_name='UTM Source')),
+                ('utm_medium', models.CharField(blank=True, max_length=100, verbose_name='UTM Medium')),
+                ('utm_campaign', models.CharField(blank=True, max_length=100, verbose_name='UTM Campaign')),
+                ('leads', models.PositiveIntegerField(verbose_name='Leads')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario UTM',
+                'verbose_name_plural': 'Resúmenes Diarios UTM',
+                'ordering': ['-day', 'utm_source', 'utm_medium'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['updated_at'], name='lead_updated_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='leaddailyrollup',
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='landings.campaign', verbose_name='Campaña'),
+        ),
+        migrations.AddField(
+            model_name='leaddailyrollup',
+            name='landing_page',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='landings.landingpage', verbose_name='Página de Landing'),
+        ),
+        migrations.AddField(
+            model_name='leadutmdailyrollup',
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='landings.campaign', verbose_name='Campaña'),
+        ),
+        migrations.AddIndex(
+            model_name='leaddailyrollup',
+            index=models.Index(fields=['day', 'campaign'], name='lead_rollup_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leadutmdailyrollup',
+            index=models.Index(fields=['day', 'campaign'], name='lead_utm_rollup_day_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Columnas de search_fields del admin. En PostgreSQL el admin busca con
+# UPPER("col"::text) LIKE UPPER('%q%'), así que el índice trigram se crea
+# sobre esa misma expresión.
+TRIGRAM_FIELDS = ("name", "email", "phone")
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for field in TRIGRAM_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "lead_{field}_trgm_idx" ON "analytics_lead" '
+            f'USING gin ((UPPER("{field}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in TRIGRAM_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "lead_{field}_trgm_idx"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_lead_rollups'),
+        ('landings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['-created_at'], name='lead_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['status', '-created_at'], name='lead_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['source', '-created_at'], name='lead_source_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['campaign', 'created_at'], name='lead_campaign_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(condition=models.Q(('status__in', ('new', 'contacted', 'qualified'))), fields=['-created_at'], name='lead_open_created_idx'),
+        ),
+        # El índice propio de la FK sobra una vez creado (campaign, created_at)
+        migrations.AlterField(
+            model_name='lead',
+            name='campaign',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='landings.campaign', verbose_name='Campaña'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_lead_indexes'),
+        ('landings', '0002_created_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Vistas')),
+                ('leads', models.PositiveIntegerField(default=0, verbose_name='Leads')),
+                ('leads_last_7_days', models.PositiveIntegerField(default=0, verbose_name='Leads (últimos 7 días)')),
+                ('leads_previous_7_days', models.PositiveIntegerField(default=0, verbose_name='Leads (7 días anteriores)')),
+                ('refreshed_at', models.DateTimeField(verbose_name='Actualizado')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='landings.campaign', verbose_name='Campaña')),
+                ('landing_page', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='landings.landingpage', verbose_name='Página de Landing')),
+            ],
+            options={
+                'verbose_name': 'Rendimiento de Campaña',
+                'verbose_name_plural': 'Rendimiento de Campañas',
+                'ordering': ['campaign', 'landing_page'],
+            },
+        ),
+    ]
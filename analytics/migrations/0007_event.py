@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_campaign_performance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(choices=[('page_view', 'Vista de página'), ('cta_click', 'Clic en CTA'), ('form_start', 'Inicio de formulario'), ('form_submit', 'Envío de formulario')], max_length=20, verbose_name='Evento')),
+                ('path', models.CharField(max_length=200, verbose_name='Ruta')),
+                ('referrer', models.CharField(blank=True, max_length=200, verbose_name='Referente')),
+                ('utm_source', models.CharField(blank=True, max_length=100, verbose_name='UTM Source')),
+                ('utm_medium', models.CharField(blank=True, max_length=100, verbose_name='UTM Medium')),
+                ('utm_campaign', models.CharField(blank=True, max_length=100, verbose_name='UTM Campaign')),
+                ('props', models.JSONField(blank=True, default=dict, verbose_name='Propiedades')),
+                ('occurred_at', models.DateTimeField(verbose_name='Ocurrido')),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Recibido')),
+            ],
+            options={
+                'verbose_name': 'Evento',
+                'verbose_name_plural': 'Eventos',
+                'ordering': ['-occurred_at'],
+                'indexes': [models.Index(fields=['-occurred_at'], name='event_occurred_at_idx'), models.Index(fields=['name', '-occurred_at'], name='event_name_occurred_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErasureRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, verbose_name='Correo Electrónico')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('done', 'Completada')], default='pending', max_length=10, verbose_name='Estado')),
+                ('leads_erased', models.PositiveIntegerField(default=0, verbose_name='Leads Borrados')),
+                ('requested_at', models.DateTimeField(auto_now_add=True, verbose_name='Solicitada')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Procesada')),
+            ],
+            options={
+                'verbose_name': 'Solicitud de Supresión',
+                'verbose_name_plural': 'Solicitudes de Supresión',
+                'ordering': ['-requested_at'],
+                'indexes': [models.Index(fields=['status', 'requested_at'], name='erasure_status_idx')],
+            },
+        ),
+    ]
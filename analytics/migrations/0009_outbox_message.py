@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0008_erasure_request'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destination', models.CharField(max_length=30, verbose_name='Destino')),
+                ('idempotency_key', models.CharField(editable=False, max_length=100, unique=True, verbose_name='Clave de Idempotencia')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('sent', 'Enviado'), ('failed', 'Fallido')], default='pending', max_length=10, verbose_name='Estado')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próximo Intento')),
+                ('claimed_by', models.UUIDField(blank=True, editable=False, null=True)),
+                ('last_error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creado')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviado')),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_messages', to='analytics.lead', verbose_name='Lead')),
+            ],
+            options={
+                'verbose_name': 'Mensaje de Salida',
+                'verbose_name_plural': 'Mensajes de Salida',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['destination', 'next_attempt_at'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0009_outbox_message'),
+        ('landings', '0003_experiment_daily_stats'),
+    ]
+
+    # El índice nuevo se crea antes de quitar el viejo: el changelist nunca
+    # se queda sin índice sobre created_at
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['-created_at', '-id'], name='lead_created_id_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='lead',
+            name='lead_created_at_idx',
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+def clear_summary(apps, schema_editor):
+    # Es un resumen materializado: el siguiente refresco lo vuelve a llenar
+    apps.get_model('analytics', 'CampaignPerformance').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0010_lead_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_summary, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='campaignperformance',
+            name='key',
+            field=models.CharField(default='', editable=False, max_length=50, unique=True),
+            preserve_default=False,
+        ),
+    ]
@@ -1,10 +1,59 @@
 from django.db import models
+from django.utils import timezone
+
+
+def normalize_email(email):
+    """Forma canónica usada para detectar duplicados: sin espacios y en minúsculas."""
+    return (email or "").strip().lower()
+
+
+class LeadQuerySet(models.QuerySet):
+    def registered(self, email):
+        """Leads cuyo email coincide con ``email`` una vez normalizado."""
+        return self.filter(email_normalized=normalize_email(email))
+
+    def _prepare_upsert(self, leads):
+        unique = {}
+        for lead in leads:
+            lead.email_normalized = normalize_email(lead.email)
+            unique.setdefault(lead.email_normalized, lead)
+        return list(unique.values())
+
+    def upsert(self, leads, batch_size=None):
+        """
+        Inserta ``leads`` con ``INSERT ... ON CONFLICT (email_normalized)``.
+        Si el email ya existe solo se actualiza ``updated_at``, sin lanzar
+        ``IntegrityError`` ni revertir la transacción.
+        """
+        return self.bulk_create(
+            self._prepare_upsert(leads),
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["email_normalized"],
+            update_fields=["updated_at"],
+        )
+
+    async def aupsert(self, leads, batch_size=None):
+        return await self.abulk_create(
+            self._prepare_upsert(leads),
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["email_normalized"],
+            update_fields=["updated_at"],
+        )
+
+
+# Estados que todavía requieren seguimiento
+OPEN_STATUSES = ("new", "contacted", "qualified")
 
 
 class Lead(models.Model):
     # Datos básicos
     name = models.CharField(max_length=100, verbose_name="Nombre")
-    email = models.EmailField(unique=True, verbose_name="Correo Electrónico")
+    email = models.EmailField(verbose_name="Correo Electrónico")
+    email_normalized = models.CharField(
+        max_length=254, unique=True, editable=False, verbose_name="Email Normalizado"
+    )
     phone = models.CharField(
         max_length=20, blank=True, null=True, verbose_name="Teléfono"
     )
@@ -16,6 +65,8 @@ class Lead(models.Model):
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
+        # Cubierto por el índice compuesto (campaign, created_at)
+        db_index=False,
         verbose_name="Campaña",
     )
     landing_page = models.ForeignKey(
@@ -53,6 +104,12 @@ class Lead(models.Model):
         max_length=100, blank=True, verbose_name="UTM Campaign"
     )
 
+    objects = LeadQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.email_normalized = normalize_email(self.email)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} - {self.email}"
 
@@ -60,3 +117,285 @@ class Lead(models.Model):
         verbose_name = "Lead"
         verbose_name_plural = "Leads"
         ordering = ["-created_at"]
+        indexes = [
+            # Orden del admin (-created_at, -id) y cursor del keyset, sin ordenar
+            models.Index(fields=["-created_at", "-id"], name="lead_created_id_idx"),
+            # Filtros del admin combinados con el orden por defecto
+            models.Index(fields=["status", "-created_at"], name="lead_status_created_idx"),
+            models.Index(fields=["source", "-created_at"], name="lead_source_created_idx"),
+            models.Index(fields=["campaign", "created_at"], name="lead_campaign_created_idx"),
+            # Bandeja de trabajo: solo los leads que siguen abiertos
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(status__in=OPEN_STATUSES),
+                name="lead_open_created_idx",
+            ),
+            # Marca de agua de los rollups incrementales
+            models.Index(fields=["updated_at"], name="lead_updated_at_idx"),
+        ]
+
+
+class JobCheckpoint(models.Model):
+    """Marca de agua de un job incremental: hasta dónde ya procesó."""
+
+    name = models.CharField(max_length=100, unique=True, verbose_name="Job")
+    high_water_mark = models.DateTimeField(
+        null=True, blank=True, verbose_name="Procesado Hasta"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Última Ejecución")
+
+    def __str__(self):
+        return f"{self.name} @ {self.high_water_mark}"
+
+    class Meta:
+        verbose_name = "Checkpoint de Job"
+        verbose_name_plural = "Checkpoints de Jobs"
+
+
+class LeadDailyRollup(models.Model):
+    """Leads por día × fuente × campaña × landing × estado."""
+
+    day = models.DateField(verbose_name="Día")
+    source = models.CharField(max_length=50, verbose_name="Fuente")
+    campaign = models.ForeignKey(
+        "landings.Campaign",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Campaña",
+    )
+    landing_page = models.ForeignKey(
+        "landings.LandingPage",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Página de Landing",
+    )
+    status = models.CharField(
+        max_length=20, choices=Lead.STATUS_CHOICES, verbose_name="Estado"
+    )
+    leads = models.PositiveIntegerField(verbose_name="Leads")
+
+    def __str__(self):
+        return f"{self.day} {self.source} {self.status}: {self.leads}"
+
+    class Meta:
+        verbose_name = "Resumen Diario de Leads"
+        verbose_name_plural = "Resúmenes Diarios de Leads"
+        ordering = ["-day", "source", "status"]
+        indexes = [
+            models.Index(fields=["day", "campaign"], name="lead_rollup_day_idx"),
+        ]
+
+
+class LeadUtmDailyRollup(models.Model):
+    """Leads por día × campaña × utm_source × utm_medium × utm_campaign."""
+
+    day = models.DateField(verbose_name="Día")
+    campaign = models.ForeignKey(
+        "landings.Campaign",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Campaña",
+    )
+    utm_source = models.CharField(max_length=100, blank=True, verbose_name="UTM Source")
+    utm_medium = models.CharField(max_length=100, blank=True, verbose_name="UTM Medium")
+    utm_campaign = models.CharField(
+        max_length=100, blank=True, verbose_name="UTM Campaign"
+    )
+    leads = models.PositiveIntegerField(verbose_name="Leads")
+
+    def __str__(self):
+        return f"{self.day} {self.utm_source}/{self.utm_medium}: {self.leads}"
+
+    class Meta:
+        verbose_name = "Resumen Diario UTM"
+        verbose_name_plural = "Resúmenes Diarios UTM"
+        ordering = ["-day", "utm_source", "utm_medium"]
+        indexes = [
+            models.Index(fields=["day", "campaign"], name="lead_utm_rollup_day_idx"),
+        ]
+
+
+class CampaignPerformance(models.Model):
+    """
+    Resumen materializado por campaña y landing para el panel del admin.
+    Lo actualiza ``analytics.dashboard.refresh_campaign_performance``.
+    """
+
+    # "<campaña>:<landing>" (landing vacía para los leads sin landing): clave
+    # única del upsert, sin depender de cómo trata cada base los NULL
+    key = models.CharField(max_length=50, unique=True, editable=False)
+
+    campaign = models.ForeignKey(
+        "landings.Campaign",
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Campaña",
+    )
+    landing_page = models.ForeignKey(
+        "landings.LandingPage",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Página de Landing",
+    )
+    views = models.PositiveIntegerField(default=0, verbose_name="Vistas")
+    leads = models.PositiveIntegerField(default=0, verbose_name="Leads")
+    leads_last_7_days = models.PositiveIntegerField(
+        default=0, verbose_name="Leads (últimos 7 días)"
+    )
+    leads_previous_7_days = models.PositiveIntegerField(
+        default=0, verbose_name="Leads (7 días anteriores)"
+    )
+    refreshed_at = models.DateTimeField(verbose_name="Actualizado")
+
+    @property
+    def conversion_rate(self):
+        """Leads por cada 100 vistas, o ``None`` sin vistas."""
+        return 100 * self.leads / self.views if self.views else None
+
+    @property
+    def trend(self):
+        """Variación porcentual de leads semana contra semana."""
+        if not self.leads_previous_7_days:
+            return None
+        return 100 * (self.leads_last_7_days / self.leads_previous_7_days - 1)
+
+    def __str__(self):
+        return f"{self.campaign_id}/{self.landing_page_id}: {self.leads} leads"
+
+    @staticmethod
+    def key_for(campaign_id, landing_page_id):
+        return f"{campaign_id}:{landing_page_id or ''}"
+
+    class Meta:
+        verbose_name = "Rendimiento de Campaña"
+        verbose_name_plural = "Rendimiento de Campañas"
+        ordering = ["campaign", "landing_page"]
+
+
+class Event(models.Model):
+    """
+    Evento de comportamiento recibido por ``/collect``. La tabla es solo de
+    inserción: las filas se escriben por lotes y nunca se actualizan.
+    """
+
+    NAME_CHOICES = [
+        ("page_view", "Vista de página"),
+        ("cta_click", "Clic en CTA"),
+        ("form_start", "Inicio de formulario"),
+        ("form_submit", "Envío de formulario"),
+    ]
+    name = models.CharField(max_length=20, choices=NAME_CHOICES, verbose_name="Evento")
+    path = models.CharField(max_length=200, verbose_name="Ruta")
+    referrer = models.CharField(max_length=200, blank=True, verbose_name="Referente")
+    utm_source = models.CharField(max_length=100, blank=True, verbose_name="UTM Source")
+    utm_medium = models.CharField(max_length=100, blank=True, verbose_name="UTM Medium")
+    utm_campaign = models.CharField(
+        max_length=100, blank=True, verbose_name="UTM Campaign"
+    )
+    props = models.JSONField(default=dict, blank=True, verbose_name="Propiedades")
+    occurred_at = models.DateTimeField(verbose_name="Ocurrido")
+    received_at = models.DateTimeField(default=timezone.now, verbose_name="Recibido")
+
+    def __str__(self):
+        return f"{self.name} {self.path}"
+
+    class Meta:
+        verbose_name = "Evento"
+        verbose_name_plural = "Eventos"
+        ordering = ["-occurred_at"]
+        indexes = [
+            models.Index(fields=["-occurred_at"], name="event_occurred_at_idx"),
+            models.Index(fields=["name", "-occurred_at"], name="event_name_occurred_idx"),
+        ]
+
+
+class ErasureRequest(models.Model):
+    """
+    Solicitud de supresión de datos ("derecho al olvido"). Se guarda al
+    instante y el motor de retención borra los leads en segundo plano.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pendiente"),
+        ("done", "Completada"),
+    ]
+
+    email = models.EmailField(verbose_name="Correo Electrónico")
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="pending", verbose_name="Estado"
+    )
+    leads_erased = models.PositiveIntegerField(default=0, verbose_name="Leads Borrados")
+    requested_at = models.DateTimeField(auto_now_add=True, verbose_name="Solicitada")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Procesada")
+
+    def __str__(self):
+        return f"{self.email} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Solicitud de Supresión"
+        verbose_name_plural = "Solicitudes de Supresión"
+        ordering = ["-requested_at"]
+        indexes = [
+            models.Index(fields=["status", "requested_at"], name="erasure_status_idx"),
+        ]
+
+
+class OutboxMessage(models.Model):
+    """
+    Notificación de un lead hacia un destino externo (email, WhatsApp, CRM).
+    Se escribe en la misma transacción que el lead y la entrega
+    ``analytics.outbox`` fuera de la petición.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pendiente"),
+        ("sent", "Enviado"),
+        ("failed", "Fallido"),
+    ]
+
+    lead = models.ForeignKey(
+        Lead,
+        on_delete=models.CASCADE,
+        related_name="outbox_messages",
+        verbose_name="Lead",
+    )
+    destination = models.CharField(max_length=30, verbose_name="Destino")
+    idempotency_key = models.CharField(
+        max_length=100, unique=True, editable=False, verbose_name="Clave de Idempotencia"
+    )
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="pending", verbose_name="Estado"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Próximo Intento"
+    )
+    # Lote del worker que tiene reclamado el mensaje
+    claimed_by = models.UUIDField(null=True, blank=True, editable=False)
+    last_error = models.TextField(blank=True, verbose_name="Último Error")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creado")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Enviado")
+
+    def __str__(self):
+        return f"{self.idempotency_key} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Mensaje de Salida"
+        verbose_name_plural = "Mensajes de Salida"
+        ordering = ["-created_at"]
+        indexes = [
+            # Cola de cada destino: solo los mensajes que quedan por entregar
+            models.Index(
+                fields=["destination", "next_attempt_at"],
+                condition=models.Q(status="pending"),
+                name="outbox_pending_idx",
+            ),
+        ]
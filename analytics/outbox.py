@@ -0,0 +1,371 @@
+"""
+Bandeja de salida transaccional para notificar leads.
+
+``save_leads`` guarda los leads y, en la misma transacción, un
+``OutboxMessage`` por cada destino activo de ``LEAD_OUTBOX["DESTINATIONS"]``.
+Si la transacción se revierte no queda ninguna notificación huérfana, y el
+registro no espera a ningún servicio externo.
+
+``OutboxWorker`` vacía la bandeja fuera de la petición (un hilo por proceso
+cada ``POLL_INTERVAL`` segundos, o el comando ``process_outbox``):
+
+- Reclama lotes de ``BATCH_SIZE`` mensajes por destino marcándolos con un
+  UUID y un plazo (``LEASE``); si el worker muere, otro los retoma al vencer.
+- Entrega cada destino en su propio pool de ``CONCURRENCY`` hilos, así que un
+  CRM lento no frena el email ni supera su límite de conexiones.
+- Solo un proceso vacía la bandeja a la vez: ``drain`` toma un turno con
+  plazo en ``JobCheckpoint`` (un UPDATE condicional, sin transacciones
+  largas) y los demás se saltan la pasada. Así ``CONCURRENCY`` es el límite
+  de todo el despliegue y no de cada worker.
+- Cada envío lleva ``Idempotency-Key`` (``lead:<pk>:<destino>``): un mensaje
+  reintentado tras un corte no se duplica en destinos que la respetan.
+- Los fallos temporales (red, 408, 429, 5xx) se reintentan con backoff
+  exponencial con jitter, respetando ``Retry-After``; los demás 4xx y los
+  mensajes que agotan ``MAX_ATTEMPTS`` quedan como ``failed`` para revisarlos
+  en el admin.
+
+Tipos de destino (``KIND``): ``webhook`` hace POST del lead en JSON a
+``URL``; ``email`` lo envía con el backend de correo de Django a ``TO``.
+"""
+import json
+import logging
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils import timezone
+
+from landings.background import PeriodicFlusher
+
+from .models import JobCheckpoint, Lead, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# Respuestas HTTP que vale la pena reintentar además de los 5xx
+RETRY_STATUSES = {408, 425, 429}
+
+# Fila cuyo high_water_mark es el fin del turno del proceso que entrega
+DRAINER_CHECKPOINT = "outbox:drainer"
+
+
+class DeliveryError(Exception):
+    """Un envío falló; ``retry=False`` si reintentarlo no va a servir."""
+
+    def __init__(self, message, retry=True, retry_after=None):
+        super().__init__(message)
+        self.retry = retry
+        self.retry_after = retry_after
+
+
+def active_destinations():
+    """Destinos configurados con ``URL`` o ``TO``."""
+    return {
+        name: config
+        for name, config in settings.LEAD_OUTBOX["DESTINATIONS"].items()
+        if config.get("URL") or config.get("TO")
+    }
+
+
+def idempotency_key(lead_pk, destination):
+    return f"lead:{lead_pk}:{destination}"
+
+
+def enqueue_lead_notifications(leads):
+    """
+    Crea los mensajes de ``leads`` (ya guardados). Un lead que vuelve a
+    registrarse no genera mensajes nuevos. Debe correr en la transacción
+    que guardó los leads.
+    """
+    destinations = active_destinations()
+    messages = [
+        OutboxMessage(
+            lead_id=lead.pk,
+            destination=name,
+            idempotency_key=idempotency_key(lead.pk, name),
+        )
+        for lead in leads
+        for name in destinations
+    ]
+    if messages:
+        OutboxMessage.objects.bulk_create(messages, ignore_conflicts=True)
+        worker = get_outbox_worker()
+        if worker is not None:
+            transaction.on_commit(worker.wake)
+    return len(messages)
+
+
+def save_leads(leads, batch_size=None):
+    """Upsert de ``leads`` y sus notificaciones en una sola transacción."""
+    with transaction.atomic():
+        saved = Lead.objects.upsert(leads, batch_size=batch_size)
+        # Los backends sin RETURNING en el upsert no asignan pk
+        missing = [lead for lead in saved if lead.pk is None]
+        if missing:
+            pks = dict(
+                Lead.objects.filter(
+                    email_normalized__in=[lead.email_normalized for lead in missing]
+                ).values_list("email_normalized", "pk")
+            )
+            for lead in missing:
+                lead.pk = pks[lead.email_normalized]
+        enqueue_lead_notifications(saved)
+    return saved
+
+
+async def asave_leads(leads, batch_size=None):
+    return await sync_to_async(save_leads)(leads, batch_size)
+
+
+def lead_payload(lead):
+    return {
+        "id": lead.pk,
+        "name": lead.name,
+        "email": lead.email,
+        "phone": lead.phone or "",
+        "source": lead.source,
+        "campaign": lead.campaign_id,
+        "utm_source": lead.utm_source,
+        "utm_medium": lead.utm_medium,
+        "utm_campaign": lead.utm_campaign,
+        "created_at": lead.created_at.isoformat(),
+    }
+
+
+def _retry_after(headers):
+    try:
+        return max(0, int(headers.get("Retry-After", "")))
+    except (TypeError, ValueError):
+        return None
+
+
+def deliver_webhook(config, key, payload):
+    # Import diferido: los workers web no pagan urllib.request (~30 ms)
+    import urllib.error
+    import urllib.request
+
+    request = urllib.request.Request(
+        config["URL"],
+        data=json.dumps(payload).encode(),
+        method="POST",
+        headers={
+            "Content-Type": "application/json",
+            "Idempotency-Key": key,
+            **config.get("HEADERS", {}),
+        },
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=config.get("TIMEOUT", 10)) as response:
+            response.read()
+    except urllib.error.HTTPError as exc:
+        raise DeliveryError(
+            f"HTTP {exc.code}",
+            retry=exc.code >= 500 or exc.code in RETRY_STATUSES,
+            retry_after=_retry_after(exc.headers),
+        ) from exc
+    except OSError as exc:
+        raise DeliveryError(str(exc)) from exc
+
+
+def deliver_email(config, key, payload):
+    body = "\n".join(f"{field}: {value}" for field, value in payload.items())
+    EmailMessage(
+        subject=f"Nuevo lead: {payload['name']}",
+        body=body,
+        to=config["TO"],
+        headers={"X-Idempotency-Key": key},
+    ).send()
+
+
+DELIVERY = {
+    "webhook": deliver_webhook,
+    "email": deliver_email,
+}
+
+
+class OutboxWorker:
+    """
+    Reclama y entrega mensajes pendientes, con un pool de hilos por destino.
+    """
+
+    def __init__(
+        self,
+        destinations,
+        batch_size=50,
+        max_attempts=8,
+        backoff_base=30,
+        backoff_max=6 * 3600,
+        lease=600,
+    ):
+        self.destinations = destinations
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = timedelta(seconds=lease)
+        self._pools = {
+            name: ThreadPoolExecutor(
+                max_workers=config.get("CONCURRENCY", 1),
+                thread_name_prefix=f"outbox-{name}",
+            )
+            for name, config in destinations.items()
+        }
+        self._flusher = None
+        self._turn_until = None
+
+    @classmethod
+    def from_settings(cls):
+        config = settings.LEAD_OUTBOX
+        return cls(
+            active_destinations(),
+            batch_size=config["BATCH_SIZE"],
+            max_attempts=config["MAX_ATTEMPTS"],
+            backoff_base=config["BACKOFF_BASE"],
+            backoff_max=config["BACKOFF_MAX"],
+            lease=config["LEASE"],
+        )
+
+    def start(self, interval):
+        if self._flusher is None:
+            self._flusher = PeriodicFlusher(
+                self.drain, interval, "lead-outbox", flush_on_exit=False
+            )
+            self._flusher.start()
+
+    def wake(self):
+        if self._flusher is not None:
+            self._flusher.wake()
+
+    def backoff(self, attempts, retry_after=None):
+        """Espera antes del intento ``attempts + 1``."""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        delay = random.uniform(delay / 2, delay)
+        return timedelta(seconds=max(delay, retry_after or 0))
+
+    def claim(self, destination, now):
+        """Reserva hasta ``batch_size`` mensajes vencidos de ``destination``."""
+        due = OutboxMessage.objects.filter(
+            status="pending", destination=destination, next_attempt_at__lte=now
+        )
+        pks = list(due.order_by("next_attempt_at").values_list("pk", flat=True)[: self.batch_size])
+        if not pks:
+            return []
+        # Si otro worker reclamó alguno entre la lectura y el UPDATE, ya no está vencido
+        token = uuid.uuid4()
+        due.filter(pk__in=pks).update(claimed_by=token, next_attempt_at=now + self.lease)
+        return list(
+            OutboxMessage.objects.filter(pk__in=pks, claimed_by=token).select_related("lead")
+        )
+
+    def _deliver(self, destination, message):
+        config = self.destinations[destination]
+        try:
+            DELIVERY[config.get("KIND", "webhook")](
+                config, message.idempotency_key, lead_payload(message.lead)
+            )
+        except DeliveryError as exc:
+            return exc
+        except Exception as exc:
+            logger.exception("Error entregando %s", message.idempotency_key)
+            return DeliveryError(repr(exc))
+        return None
+
+    def run_once(self, now=None):
+        """Una pasada: un lote por destino. Devuelve ``(enviados, fallidos)``."""
+        now = now or timezone.now()
+        futures = [
+            (message, self._pools[name].submit(self._deliver, name, message))
+            for name in self.destinations
+            for message in self.claim(name, now)
+        ]
+        sent, failed = [], []
+        for message, future in futures:
+            error = future.result()
+            if error is None:
+                sent.append(message.pk)
+                continue
+            message.attempts += 1
+            message.last_error = str(error)[:1000]
+            if not error.retry or message.attempts >= self.max_attempts:
+                message.status = "failed"
+                logger.warning("Mensaje %s descartado: %s", message.idempotency_key, error)
+            else:
+                message.next_attempt_at = now + self.backoff(message.attempts, error.retry_after)
+            failed.append(message)
+
+        if sent:
+            OutboxMessage.objects.filter(pk__in=sent).update(
+                status="sent", sent_at=timezone.now(), last_error=""
+            )
+        if failed:
+            OutboxMessage.objects.bulk_update(
+                failed, ["status", "attempts", "next_attempt_at", "last_error"]
+            )
+        return len(sent), len(failed)
+
+    def hold_turn(self):
+        """
+        Toma o renueva el turno de entregar por ``lease`` segundos. Falla si
+        otro proceso lo tiene y no ha vencido.
+        """
+        now = timezone.now()
+        if self._turn_until is None:
+            JobCheckpoint.objects.get_or_create(name=DRAINER_CHECKPOINT)
+        free = Q(high_water_mark__isnull=True) | Q(high_water_mark__lte=now)
+        if self._turn_until is not None:
+            free |= Q(high_water_mark=self._turn_until)
+        until = now + self.lease
+        taken = JobCheckpoint.objects.filter(free, name=DRAINER_CHECKPOINT).update(
+            high_water_mark=until
+        )
+        self._turn_until = until if taken else None
+        return bool(taken)
+
+    def release_turn(self):
+        if self._turn_until is not None:
+            JobCheckpoint.objects.filter(
+                name=DRAINER_CHECKPOINT, high_water_mark=self._turn_until
+            ).update(high_water_mark=None)
+            self._turn_until = None
+
+    def drain(self, now=None):
+        """
+        Pasadas hasta que no quede nada vencido, si este proceso tiene el
+        turno. Devuelve ``(enviados, fallidos)``.
+        """
+        total_sent = total_failed = 0
+        try:
+            while self.hold_turn():
+                sent, failed = self.run_once(now)
+                total_sent += sent
+                total_failed += failed
+                if not sent and not failed:
+                    break
+        finally:
+            self.release_turn()
+        return total_sent, total_failed
+
+
+@cache
+def get_outbox_worker():
+    """Worker del proceso, o ``None`` si no hay destinos o está desactivado."""
+    interval = settings.LEAD_OUTBOX["POLL_INTERVAL"]
+    if not interval or not active_destinations():
+        return None
+    worker = OutboxWorker.from_settings()
+    worker.start(interval)
+    return worker
+
+
+@receiver(setting_changed)
+def _reset_worker(setting, **kwargs):
+    if setting == "LEAD_OUTBOX":
+        get_outbox_worker.cache_clear()
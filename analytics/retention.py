@@ -0,0 +1,226 @@
+"""
+Motor de retención de datos.
+
+Aplica los plazos de ``DATA_RETENTION`` fuera del ciclo de la petición: un
+hilo por proceso corre ``run_retention`` cada ``INTERVAL`` segundos (o el
+comando ``run_retention`` desde cron) y en cada pasada:
+
+1. Atiende las ``ErasureRequest`` pendientes borrando los leads del email.
+2. Anonimiza los leads con más de ``LEAD_ANONYMIZE_AFTER_DAYS`` días
+   (nombre, email y teléfono; las dimensiones de análisis se conservan).
+3. Borra los leads y eventos con más de ``*_DELETE_AFTER_DAYS`` días, en
+   la base de datos y en el archivo columnar (``prune_archive``).
+
+Cada worker tiene su hilo, pero solo uno aplica la retención a la vez: la
+pasada toma un turno en ``JobCheckpoint`` (un UPDATE condicional, como el
+del outbox) que vence a los ``LEASE`` segundos y se renueva entre pasos; si
+otro proceso lo tiene, la pasada se salta.
+
+Todo avanza en lotes de ``BATCH_SIZE`` filas, cada uno en su propia
+transacción y recorriendo rangos del índice de ``created_at``/``occurred_at``,
+así que nunca bloquea las tablas por mucho tiempo. La anonimización guarda
+hasta dónde llegó en un ``JobCheckpoint`` para no volver a recorrer los
+leads ya tratados.
+
+Los resúmenes diarios no se recalculan al borrar: son conteos anónimos y
+conservan el histórico. El archivo ya es anónimo, así que la anonimización
+no lo toca, pero los plazos de borrado sí valen para él: archivar antes
+solo adelanta la salida de la base de datos, no alarga la retención.
+"""
+import logging
+from datetime import timedelta
+from functools import cache, partial
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Cast, Concat
+from django.dispatch import receiver
+from django.utils import timezone
+
+from landings.background import PeriodicFlusher
+
+from .archive import prune_archive
+from .models import ErasureRequest, Event, JobCheckpoint, Lead
+
+logger = logging.getLogger(__name__)
+
+ANONYMIZE_CHECKPOINT = "retention:lead-anonymize"
+RUNNER_CHECKPOINT = "retention:runner"
+ANONYMOUS_DOMAIN = "@anonimizado.invalid"
+
+
+def _anonymous_email():
+    return Concat(
+        Value("lead-"), Cast("pk", CharField()), Value(ANONYMOUS_DOMAIN),
+        output_field=CharField(),
+    )
+
+
+def process_erasure_requests(batch_size):
+    """Atiende solicitudes pendientes. Devuelve cuántos leads borró."""
+    erased = 0
+    while True:
+        with transaction.atomic():
+            requests = list(
+                ErasureRequest.objects.select_for_update()
+                .filter(status="pending")
+                .order_by("requested_at")[:batch_size]
+            )
+            if not requests:
+                return erased
+            now = timezone.now()
+            for erasure in requests:
+                # delete() cuenta también los mensajes del outbox borrados en cascada
+                _, deleted = Lead.objects.registered(erasure.email).delete()
+                erasure.leads_erased = deleted.get(Lead._meta.label, 0)
+                erasure.status, erasure.processed_at = "done", now
+                erased += erasure.leads_erased
+            ErasureRequest.objects.bulk_update(
+                requests, ["leads_erased", "status", "processed_at"]
+            )
+
+
+def anonymize_leads(cutoff, batch_size):
+    """Anonimiza los leads creados antes de ``cutoff``. Devuelve cuántos."""
+    anonymized = 0
+    while True:
+        with transaction.atomic():
+            checkpoint, _ = JobCheckpoint.objects.select_for_update().get_or_create(
+                name=ANONYMIZE_CHECKPOINT
+            )
+            pending = Lead.objects.filter(created_at__lt=cutoff).exclude(
+                email_normalized__endswith=ANONYMOUS_DOMAIN
+            )
+            if checkpoint.high_water_mark is not None:
+                pending = pending.filter(created_at__gte=checkpoint.high_water_mark)
+            batch = list(
+                pending.order_by("created_at", "pk").values_list("pk", "created_at")[
+                    :batch_size
+                ]
+            )
+            if batch:
+                email = _anonymous_email()
+                Lead.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                    name="Anónimo", email=email, email_normalized=email, phone=None
+                )
+                anonymized += len(batch)
+            done = len(batch) < batch_size
+            # Se reanuda desde el último created_at: los empates ya tratados
+            # quedan fuera por el email anónimo
+            checkpoint.high_water_mark = cutoff if done else batch[-1][1]
+            checkpoint.save()
+        if done:
+            return anonymized
+
+
+def delete_older_than(queryset, field, cutoff, batch_size):
+    """Borra por lotes las filas de ``queryset`` con ``field < cutoff``."""
+    deleted = 0
+    expired = queryset.filter(**{f"{field}__lt": cutoff}).order_by(field, "pk")
+    while True:
+        with transaction.atomic():
+            pks = list(expired.values_list("pk", flat=True)[:batch_size])
+            if pks:
+                deleted += queryset.filter(pk__in=pks).delete()[0]
+        if len(pks) < batch_size:
+            return deleted
+
+
+def hold_turn(until=None):
+    """
+    Toma el turno de retención, o lo renueva si ``until`` es el vencimiento
+    que devolvió la llamada anterior. Devuelve el nuevo vencimiento, o
+    ``None`` si otro proceso tiene el turno.
+    """
+    now = timezone.now()
+    if until is None:
+        JobCheckpoint.objects.get_or_create(name=RUNNER_CHECKPOINT)
+    free = Q(high_water_mark__isnull=True) | Q(high_water_mark__lte=now)
+    if until is not None:
+        free |= Q(high_water_mark=until)
+    renewed = now + timedelta(seconds=settings.DATA_RETENTION["LEASE"])
+    taken = JobCheckpoint.objects.filter(free, name=RUNNER_CHECKPOINT).update(
+        high_water_mark=renewed
+    )
+    return renewed if taken else None
+
+
+def release_turn(until):
+    JobCheckpoint.objects.filter(name=RUNNER_CHECKPOINT, high_water_mark=until).update(
+        high_water_mark=None
+    )
+
+
+def run_retention(now=None):
+    """
+    Una pasada completa del motor. Devuelve las filas tratadas por tipo, o
+    ``None`` si otro proceso está aplicando la retención.
+    """
+    config = settings.DATA_RETENTION
+    now = now or timezone.now()
+    batch_size = config["BATCH_SIZE"]
+    steps = [("erased", partial(process_erasure_requests, batch_size))]
+    if days := config["LEAD_ANONYMIZE_AFTER_DAYS"]:
+        cutoff = now - timedelta(days=days)
+        steps.append(("anonymized", partial(anonymize_leads, cutoff, batch_size)))
+    for kind, model, field, key in (
+        ("leads", Lead, "created_at", "LEAD_DELETE_AFTER_DAYS"),
+        ("events", Event, "occurred_at", "EVENT_DELETE_AFTER_DAYS"),
+    ):
+        if days := config[key]:
+            cutoff = now - timedelta(days=days)
+            steps.append(
+                (
+                    f"{kind}_deleted",
+                    partial(delete_older_than, model.objects.all(), field, cutoff, batch_size),
+                )
+            )
+            steps.append((f"{kind}_pruned", partial(prune_archive, kind, cutoff)))
+
+    until = hold_turn()
+    if until is None:
+        return None
+    results = {}
+    try:
+        for name, step in steps:
+            results[name] = step()
+            # Un paso largo no debe dejar vencer el turno a mitad de la pasada
+            until = hold_turn(until)
+            if until is None:
+                logger.warning("Se perdió el turno de retención tras %s", name)
+                break
+    finally:
+        if until is not None:
+            release_turn(until)
+    return results
+
+
+@cache
+def get_retention_worker():
+    """Hilo de retención del proceso, o ``None`` si está desactivado."""
+    interval = settings.DATA_RETENTION["INTERVAL"]
+    if not interval:
+        return None
+    worker = PeriodicFlusher(run_retention, interval, "data-retention", flush_on_exit=False)
+    worker.start()
+    return worker
+
+
+@receiver(setting_changed)
+def _reset_worker(setting, **kwargs):
+    if setting == "DATA_RETENTION":
+        get_retention_worker.cache_clear()
+
+
+def request_erasure(email):
+    """
+    Registra una solicitud de supresión y despierta al hilo de retención
+    cuando la transacción se confirme; no borra nada en la petición.
+    """
+    erasure = ErasureRequest.objects.create(email=email)
+    worker = get_retention_worker()
+    if worker is not None:
+        transaction.on_commit(worker.wake)
+    return erasure
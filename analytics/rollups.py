@@ -0,0 +1,154 @@
+"""
+Tablas de resumen (rollups) de leads, actualizadas de forma incremental.
+
+Cada ejecución busca los leads con ``updated_at`` posterior a la marca de
+agua guardada en ``JobCheckpoint``, calcula qué días (según ``created_at``)
+tocaron y recalcula esos días completos: borra sus filas de resumen y las
+vuelve a insertar agregadas con un ``GROUP BY``. Recalcular días enteros en
+vez de sumar deltas hace que el job sea idempotente y que los cambios de
+estado de un lead se reflejen sin llevar la cuenta de su estado anterior.
+
+La marca de agua se queda ``SAFETY_LAG`` segundos por detrás del reloj para
+no saltarse escrituras de transacciones que todavía no confirmaron. Los
+leads borrados no dejan rastro en ``updated_at``: quien los borre debe
+llamar a ``refresh_days`` con sus días, o hay que reconstruir con
+``full=True``.
+
+Los días se filtran por rangos ``created_at >= inicio`` y ``< fin`` en hora
+local, que usan el índice de ``created_at``; ``created_at__date`` aplicaría
+una función a la columna y obligaría a recorrer la tabla. La reconstrucción
+completa avanza por bloques de ``DAYS_PER_QUERY`` días, cada uno en su propia
+transacción, en lugar de reescribirlo todo en una sola.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import JobCheckpoint, Lead, LeadDailyRollup, LeadUtmDailyRollup
+
+CHECKPOINT = "lead_rollups"
+
+# Días recalculados por consulta de agregación
+DAYS_PER_QUERY = 31
+
+DAILY_DIMENSIONS = ("source", "campaign_id", "landing_page_id", "status")
+UTM_DIMENSIONS = ("campaign_id", "utm_source", "utm_medium", "utm_campaign")
+
+
+def local_day_start(day):
+    """Medianoche local de ``day`` como datetime con zona horaria."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_ranges(days):
+    """``Q`` con un rango de ``created_at`` por cada tramo de días seguidos."""
+    ranges = Q()
+    days = sorted(days)
+    first = previous = days[0]
+    for day in days[1:] + [None]:
+        if day is not None and day == previous + timedelta(days=1):
+            previous = day
+            continue
+        ranges |= Q(
+            created_at__gte=local_day_start(first),
+            created_at__lt=local_day_start(previous + timedelta(days=1)),
+        )
+        first = previous = day
+    return ranges
+
+
+def _aggregate(days, dimensions):
+    return (
+        Lead.objects.filter(day_ranges(days))
+        .annotate(day=TruncDate("created_at"))
+        .values("day", *dimensions)
+        .annotate(leads=Count("pk"))
+        .order_by()
+    )
+
+
+def refresh_days(days):
+    """Recalcula los resúmenes de ``days``. Devuelve cuántas filas escribió."""
+    days = sorted(set(days))
+    written = 0
+    for start in range(0, len(days), DAYS_PER_QUERY):
+        chunk = days[start : start + DAYS_PER_QUERY]
+        LeadDailyRollup.objects.filter(day__in=chunk).delete()
+        LeadUtmDailyRollup.objects.filter(day__in=chunk).delete()
+        daily = LeadDailyRollup.objects.bulk_create(
+            [LeadDailyRollup(**row) for row in _aggregate(chunk, DAILY_DIMENSIONS)],
+            batch_size=500,
+        )
+        utm = LeadUtmDailyRollup.objects.bulk_create(
+            [LeadUtmDailyRollup(**row) for row in _aggregate(chunk, UTM_DIMENSIONS)],
+            batch_size=500,
+        )
+        written += len(daily) + len(utm)
+    return written
+
+
+def rebuild_lead_rollups(upper):
+    """
+    Reconstruye todos los resúmenes, ``DAYS_PER_QUERY`` días por transacción,
+    y borra los de días sin leads fuera del rango actual. Devuelve
+    ``(días, filas)``.
+    """
+    bounds = Lead.objects.aggregate(first=Min("created_at"), last=Max("created_at"))
+    if bounds["first"] is None:
+        first = last = None
+        days = []
+    else:
+        first = timezone.localdate(bounds["first"])
+        last = timezone.localdate(bounds["last"])
+        days = [first + timedelta(days=n) for n in range((last - first).days + 1)]
+    written = 0
+    for start in range(0, len(days), DAYS_PER_QUERY):
+        with transaction.atomic():
+            written += refresh_days(days[start : start + DAYS_PER_QUERY])
+    with transaction.atomic():
+        for model in (LeadDailyRollup, LeadUtmDailyRollup):
+            stale = model.objects.all()
+            if first is not None:
+                stale = stale.filter(Q(day__lt=first) | Q(day__gt=last))
+            stale.delete()
+        checkpoint, _ = JobCheckpoint.objects.select_for_update().get_or_create(
+            name=CHECKPOINT
+        )
+        checkpoint.high_water_mark = upper
+        checkpoint.save()
+    return len(days), written
+
+
+def update_lead_rollups(full=False, now=None):
+    """
+    Recalcula los días afectados desde la última ejecución (o todos con
+    ``full=True``). Devuelve ``(días, filas)``.
+    """
+    now = now or timezone.now()
+    upper = now - timedelta(seconds=settings.LEAD_ROLLUPS["SAFETY_LAG"])
+    if full:
+        return rebuild_lead_rollups(upper)
+    with transaction.atomic():
+        checkpoint, _ = JobCheckpoint.objects.select_for_update().get_or_create(
+            name=CHECKPOINT
+        )
+        changed = Lead.objects.filter(updated_at__lte=upper)
+        if checkpoint.high_water_mark is not None:
+            changed = changed.filter(updated_at__gt=checkpoint.high_water_mark)
+
+        days = (
+            changed.annotate(day=TruncDate("created_at"))
+            .values_list("day", flat=True)
+            .order_by()
+            .distinct()
+        )
+        days = list(days)
+        written = refresh_days(days)
+
+        checkpoint.high_water_mark = upper
+        checkpoint.save()
+    return len(days), written
@@ -0,0 +1,317 @@
+"""
+Datos sintéticos a escala de producción: campañas, landings y leads.
+
+Las distribuciones (canal y UTM, popularidad de las campañas, día y hora de
+alta, estado según la antigüedad) son las constantes de este módulo. Con el
+mismo ``seed`` y ``chunk_size`` se generan siempre los mismos datos, así que
+``generate_synthetic_data``, el benchmark del embudo y las pruebas de planes
+de consulta trabajan sobre la misma forma de datos.
+
+Los leads se muestrean por columnas, un bloque de ``chunk_size`` filas cada
+vez, con NumPy; sin NumPy se usa ``random`` (mismas distribuciones, otros
+valores). Cada bloque se carga en su propia transacción con ``bulk_create``
+o, en PostgreSQL, con ``COPY``. Los leads no pasan por el outbox: no se
+notifica a nadie.
+"""
+import random
+import unicodedata
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from landings.models import Campaign, LandingPage
+
+from .models import Lead
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# (source, utm_source, utm_medium, peso). Los "direct" no tienen campaña
+CHANNELS = [
+    ("webinar", "facebook", "cpc", 0.30),
+    ("webinar", "google", "cpc", 0.18),
+    ("webinar", "instagram", "paid_social", 0.12),
+    ("webinar", "newsletter", "email", 0.08),
+    ("webinar", "whatsapp", "referral", 0.05),
+    ("webinar", "", "", 0.12),
+    ("referral", "partner", "referral", 0.05),
+    ("direct", "", "", 0.10),
+]
+STATUS_WEIGHTS = {
+    "new": 0.35,
+    "contacted": 0.25,
+    "qualified": 0.12,
+    "converted": 0.10,
+    "lost": 0.18,
+}
+# Los leads de los últimos RECENT_DAYS días casi no se han trabajado
+RECENT_DAYS = 3
+RECENT_STATUS_WEIGHTS = {
+    "new": 0.80,
+    "contacted": 0.15,
+    "qualified": 0.03,
+    "converted": 0.01,
+    "lost": 0.01,
+}
+# Peso de cada hora local de alta, de 0 a 23
+HOUR_WEIGHTS = (1, 1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 8, 7, 7, 8, 8, 8, 7, 7, 8, 8, 6, 4, 2)
+WEEKEND_WEIGHT = 0.6
+# El volumen diario crece hasta GROWTH veces del primer al último día
+GROWTH = 3.0
+# Pocas campañas concentran la mayoría de los leads (Zipf)
+CAMPAIGN_ZIPF = 1.1
+LANDING_SHARE = 0.85
+PHONE_SHARE = 0.7
+# Días entre el alta y el último cambio de estado, como máximo
+FOLLOW_UP_DAYS = 14
+EMAIL_DOMAINS = {
+    "example.com": 0.5,
+    "example.net": 0.2,
+    "example.org": 0.15,
+    "correo.example": 0.15,
+}
+FIRST_NAMES = (
+    "María", "José", "Ana", "Juan", "Lucía", "Carlos", "Sofía", "Luis",
+    "Valeria", "Miguel", "Fernanda", "Jorge", "Camila", "Diego", "Paola",
+    "Andrés", "Daniela", "Ricardo", "Gabriela", "Alejandro",
+)
+LAST_NAMES = (
+    "García", "Hernández", "López", "Martínez", "González", "Pérez",
+    "Rodríguez", "Sánchez", "Ramírez", "Cruz", "Flores", "Gómez", "Morales",
+    "Vázquez", "Reyes", "Jiménez", "Torres", "Díaz", "Gutiérrez", "Ruiz",
+)
+
+COPY_COLUMNS = (
+    "name", "email", "email_normalized", "phone", "source", "campaign_id",
+    "landing_page_id", "status", "created_at", "updated_at", "utm_source",
+    "utm_medium", "utm_campaign",
+)
+DESCRIPTION = "Datos sintéticos (seed {seed})"
+
+
+class Sampler:
+    """Muestreo por columnas con NumPy o, si no está instalado, con ``random``."""
+
+    def __init__(self, seed):
+        self.numpy = np is not None
+        self.rng = np.random.default_rng(seed) if self.numpy else random.Random(seed)
+
+    def choice(self, weights, size):
+        """``size`` índices de ``weights`` con esas probabilidades relativas."""
+        if self.numpy:
+            p = np.asarray(weights, dtype=float)
+            return self.rng.choice(len(p), size=size, p=p / p.sum()).tolist()
+        return self.rng.choices(range(len(weights)), weights=weights, k=size)
+
+    def uniform(self, size):
+        """``size`` valores en ``[0, 1)``."""
+        if self.numpy:
+            return self.rng.random(size).tolist()
+        return [self.rng.random() for _ in range(size)]
+
+
+def _ascii(text):
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+
+
+def day_weights(first_day, days):
+    weights = []
+    for d in range(days):
+        weight = 1 + (GROWTH - 1) * d / max(days - 1, 1)
+        if (first_day + timedelta(days=d)).weekday() >= 5:
+            weight *= WEEKEND_WEIGHT
+        weights.append(weight)
+    return weights
+
+
+def create_campaigns(campaigns, landings_per_campaign, seed=0):
+    """
+    Campañas con sus landings. Devuelve ``[(id, utm_campaign, [ids de
+    landing])]``, de la más popular a la menos.
+    """
+    created = Campaign.objects.bulk_create(
+        [
+            Campaign(name=f"Campaña {n + 1}", description=DESCRIPTION.format(seed=seed))
+            for n in range(campaigns)
+        ]
+    )
+    landings = LandingPage.objects.bulk_create(
+        [
+            LandingPage(
+                campaign=campaign,
+                title=f"{campaign.name} · Landing {n + 1}",
+                slug=f"sintetica-{seed}-{c}-{n}",
+            )
+            for c, campaign in enumerate(created)
+            for n in range(landings_per_campaign)
+        ]
+    )
+    by_campaign = {campaign.pk: [] for campaign in created}
+    for landing in landings:
+        by_campaign[landing.campaign_id].append(landing.pk)
+    return [
+        (campaign.pk, f"campana-{seed}-{c + 1}", by_campaign[campaign.pk])
+        for c, campaign in enumerate(created)
+    ]
+
+
+def lead_rows(count, campaigns, seed=0, days=365, chunk_size=10000, now=None):
+    """
+    Bloques de filas de ``Lead`` en el orden de ``COPY_COLUMNS``.
+    ``campaigns`` es lo que devuelve ``create_campaigns``.
+    """
+    sampler = Sampler(seed)
+    now = now or timezone.now()
+    first_day = timezone.localtime(now).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) - timedelta(days=days - 1)
+    days_weights = day_weights(first_day.date(), days)
+    campaign_weights = [1 / (rank + 1) ** CAMPAIGN_ZIPF for rank in range(len(campaigns))]
+    statuses = list(STATUS_WEIGHTS)
+    recent_statuses = list(RECENT_STATUS_WEIGHTS)
+    domains = list(EMAIL_DOMAINS)
+    ascii_first = [_ascii(name) for name in FIRST_NAMES]
+    ascii_last = [_ascii(name) for name in LAST_NAMES]
+
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        channel = sampler.choice([weight for *_, weight in CHANNELS], size)
+        campaign = (
+            sampler.choice(campaign_weights, size) if campaigns else [None] * size
+        )
+        landing, has_landing = sampler.uniform(size), sampler.uniform(size)
+        status = sampler.choice(list(STATUS_WEIGHTS.values()), size)
+        recent_status = sampler.choice(list(RECENT_STATUS_WEIGHTS.values()), size)
+        day = sampler.choice(days_weights, size)
+        hour = sampler.choice(HOUR_WEIGHTS, size)
+        second, follow_up = sampler.uniform(size), sampler.uniform(size)
+        first = sampler.choice([1] * len(FIRST_NAMES), size)
+        last = sampler.choice([1] * len(LAST_NAMES), size)
+        domain = sampler.choice(list(EMAIL_DOMAINS.values()), size)
+        phone = sampler.uniform(size)
+
+        rows = []
+        for i in range(size):
+            n = start + i
+            source, utm_source, utm_medium, _ = CHANNELS[channel[i]]
+            campaign_id = landing_id = None
+            utm_campaign = ""
+            if source != "direct" and campaign[i] is not None:
+                campaign_id, slug, landing_ids = campaigns[campaign[i]]
+                if landing_ids and has_landing[i] < LANDING_SHARE:
+                    landing_id = landing_ids[int(landing[i] * len(landing_ids))]
+                if utm_source:
+                    utm_campaign = slug
+            created_at = min(
+                first_day + timedelta(days=day[i], hours=hour[i], seconds=second[i] * 3600),
+                now,
+            )
+            if day[i] >= days - RECENT_DAYS:
+                lead_status = recent_statuses[recent_status[i]]
+            else:
+                lead_status = statuses[status[i]]
+            updated_at = created_at
+            if lead_status != "new":
+                updated_at = min(
+                    created_at + timedelta(days=follow_up[i] * FOLLOW_UP_DAYS), now
+                )
+            email = (
+                f"{ascii_first[first[i]]}.{ascii_last[last[i]]}.{seed}.{n}"
+                f"@{domains[domain[i]]}"
+            )
+            digits = int(phone[i] / PHONE_SHARE * 10**8)
+            rows.append(
+                (
+                    f"{FIRST_NAMES[first[i]]} {LAST_NAMES[last[i]]}",
+                    email,
+                    email,
+                    f"+52 55 {digits // 10**4:04d} {digits % 10**4:04d}"
+                    if phone[i] < PHONE_SHARE
+                    else None,
+                    source,
+                    campaign_id,
+                    landing_id,
+                    lead_status,
+                    created_at,
+                    updated_at,
+                    utm_source,
+                    utm_medium,
+                    utm_campaign,
+                )
+            )
+        yield rows
+
+
+@contextmanager
+def explicit_timestamps():
+    """
+    Hace que ``bulk_create`` guarde ``created_at``/``updated_at`` tal cual
+    en lugar de la hora actual. Cambia los campos del modelo para todo el
+    proceso: solo para cargas masivas sin otras escrituras a la vez.
+    """
+    fields = [Lead._meta.get_field("created_at"), Lead._meta.get_field("updated_at")]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def copy_rows(rows):
+    """Carga ``rows`` con ``COPY ... FROM STDIN`` (PostgreSQL con psycopg 3)."""
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(column) for column in COPY_COLUMNS)
+    with connection.cursor() as cursor:
+        sql = f"COPY {quote(Lead._meta.db_table)} ({columns}) FROM STDIN"
+        with cursor.cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def load_rows(rows, method):
+    if method == "copy":
+        copy_rows(rows)
+    else:
+        Lead.objects.bulk_create([Lead(**dict(zip(COPY_COLUMNS, row))) for row in rows])
+
+
+def generate(
+    campaigns,
+    landings_per_campaign,
+    leads,
+    seed=0,
+    days=365,
+    chunk_size=10000,
+    method="auto",
+    progress=None,
+):
+    """
+    Crea ``campaigns`` campañas con ``landings_per_campaign`` landings cada
+    una y ``leads`` leads repartidos entre ellas a lo largo de ``days``
+    días. ``method`` es ``bulk``, ``copy`` o ``auto`` (``copy`` en
+    PostgreSQL). ``progress`` recibe los leads cargados tras cada bloque.
+    """
+    if method == "auto":
+        method = "copy" if connection.vendor == "postgresql" else "bulk"
+    with transaction.atomic():
+        created = create_campaigns(campaigns, landings_per_campaign, seed)
+    loaded = 0
+    with explicit_timestamps():
+        for rows in lead_rows(leads, created, seed, days, chunk_size):
+            with transaction.atomic():
+                load_rows(rows, method)
+            loaded += len(rows)
+            if progress is not None:
+                progress(loaded)
+    return {
+        "campaigns": campaigns,
+        "landings": campaigns * landings_per_campaign,
+        "leads": loaded,
+    }
@@ -0,0 +1,24 @@
+from django import template
+
+from analytics.dashboard import campaign_performance
+
+register = template.Library()
+
+
+@register.inclusion_tag("admin/analytics/campaign_performance.html", takes_context=True)
+def campaign_performance_panel(context):
+    """Panel de rendimiento por campaña para la portada del admin."""
+    if not context["request"].user.has_perm("analytics.view_lead"):
+        return {"visible": False}
+    campaigns, refreshed_at = campaign_performance()
+    return {"visible": True, "campaigns": campaigns, "refreshed_at": refreshed_at}
+
+
+@register.filter
+def percent(value):
+    return "—" if value is None else f"{value:.1f}%"
+
+
+@register.filter
+def signed_percent(value):
+    return "—" if value is None else f"{value:+.0f}%"
@@ -1,6 +1,51 @@
+import csv
+import gzip
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, OperationalError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from .models import Lead
+from django.utils import timezone
+from landings.consent import sign_consent
+from landings.models import Campaign, LandingPage
+from .admin import LeadAdmin
+from .archive import archive_rows, cutoff_for, funnel, load, np, utm_breakdown
+from .checks import check_archive_retention
+from .collection import EventBuffer, get_event_buffer, parse_events
+from .dashboard import campaign_performance, refresh_campaign_performance
+from .export import LeadExportFilterForm, iter_export
+from .ingestion import LeadBuffer, QueueFull
+from .models import (
+    CampaignPerformance,
+    ErasureRequest,
+    Event,
+    JobCheckpoint,
+    Lead,
+    LeadDailyRollup,
+    LeadUtmDailyRollup,
+    OutboxMessage,
+)
+from .outbox import OutboxWorker, get_outbox_worker, idempotency_key, save_leads
+from .retention import ANONYMIZE_CHECKPOINT, RUNNER_CHECKPOINT, run_retention
+from .rollups import _aggregate, local_day_start, refresh_days, update_lead_rollups
+from .synthetic import COPY_COLUMNS, STATUS_WEIGHTS, generate, lead_rows
 
 
 class LeadModelTest(TestCase):
@@ -23,3 +68,1152 @@ class LeadModelTest(TestCase):
         Lead.objects.create(name="User 1", email="test@example.com")
         with self.assertRaises(Exception):
             Lead.objects.create(name="User 2", email="test@example.com")
+
+
+class LeadUpsertTest(TestCase):
+    def test_email_is_normalized_on_save(self):
+        """Test that the normalized email is lowercased and trimmed"""
+        lead = Lead.objects.create(name="Test User", email="  Test@Example.COM ")
+        self.assertEqual(lead.email_normalized, "test@example.com")
+        self.assertTrue(Lead.objects.registered("TEST@example.com").exists())
+
+    def test_normalized_email_is_unique(self):
+        """Test that emails differing only in case are duplicates"""
+        Lead.objects.create(name="User 1", email="test@example.com")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Lead.objects.create(name="User 2", email="TEST@example.com")
+
+    def test_upsert_existing_email_does_not_raise(self):
+        """Test that upserting a registered email only touches updated_at"""
+        existing = Lead.objects.create(name="Existing", email="test@example.com")
+        Lead.objects.upsert([Lead(name="Again", email=" Test@Example.com")])
+
+        self.assertEqual(Lead.objects.count(), 1)
+        existing.refresh_from_db()
+        self.assertEqual(existing.name, "Existing")
+        self.assertGreaterEqual(existing.updated_at, existing.created_at)
+
+    def test_upsert_deduplicates_within_batch(self):
+        """Test that one batch may contain the same email twice"""
+        Lead.objects.upsert([
+            Lead(name="First", email="a@example.com"),
+            Lead(name="Second", email="A@example.com"),
+            Lead(name="Other", email="b@example.com"),
+        ])
+        self.assertEqual(Lead.objects.count(), 2)
+        self.assertEqual(Lead.objects.get(email_normalized="a@example.com").name, "First")
+
+
+class LeadBufferTest(TestCase):
+    def setUp(self):
+        self.spool_dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.buffer = LeadBuffer(self.spool_dir, batch_size=2, max_pending=3,
+                                 enqueue_timeout=0.01, fsync=False)
+
+    def lead(self, email):
+        return {"name": "Test User", "email": email, "phone": "", "source": "webinar"}
+
+    def test_flush_writes_pending_leads_in_batch(self):
+        """Test that queued leads are only written on flush"""
+        self.buffer.submit(self.lead("a@example.com"))
+        self.buffer.submit(self.lead("b@example.com"))
+        self.assertEqual(Lead.objects.count(), 0)
+        self.assertTrue(self.buffer.is_pending("a@example.com"))
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(Lead.objects.count(), 2)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(list(self.spool_dir.iterdir()), [])
+
+    def test_submit_is_durable_before_flush(self):
+        """Test that queued leads are appended to the spool file"""
+        self.buffer.submit(self.lead("a@example.com"))
+        self.assertIn("a@example.com", self.buffer.spool_path.read_text())
+
+    def test_backpressure_when_full(self):
+        """Test that a full buffer rejects new leads"""
+        for i in range(3):
+            self.buffer.submit(self.lead(f"user{i}@example.com"))
+        with self.assertRaises(QueueFull):
+            self.buffer.submit(self.lead("overflow@example.com"))
+
+        self.buffer.flush()
+        self.buffer.submit(self.lead("overflow@example.com"))
+        self.assertEqual(len(self.buffer), 1)
+
+    def test_flush_ignores_existing_emails(self):
+        """Test that replaying a lead that already exists does not fail"""
+        Lead.objects.create(name="Existing", email="a@example.com")
+        self.buffer.submit(self.lead("a@example.com"))
+        self.buffer.flush()
+        self.assertEqual(Lead.objects.count(), 1)
+
+    def test_recover_replays_rotated_spools(self):
+        """Test that spools left behind by a crashed flush are replayed"""
+        self.buffer.submit(self.lead("a@example.com"))
+        self.buffer.spool_path.rename(self.spool_dir / "leads-1-1.flushing")
+
+        LeadBuffer(self.spool_dir).recover()
+        self.assertTrue(Lead.objects.filter(email="a@example.com").exists())
+        self.assertEqual(list(self.spool_dir.glob("*.flushing")), [])
+
+    def test_bad_records_are_set_aside_without_blocking_the_queue(self):
+        """Test that an oversized field or a torn line does not block later flushes"""
+        spool = self.spool_dir / "leads-1-1.flushing"
+        spool.write_text(
+            json.dumps({**self.lead("long@example.com"), "name": "x" * 101}) + "\n"
+            + json.dumps(self.lead("ok@example.com")) + "\n"
+            + '{"name": "Cort'
+        )
+        self.buffer._needs_recovery = True
+        self.buffer.submit(self.lead("new@example.com"))
+        with self.assertLogs("analytics.ingestion", "ERROR"):
+            self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(
+            set(Lead.objects.values_list("email", flat=True)),
+            {"ok@example.com", "new@example.com"},
+        )
+        failed = (self.spool_dir / "leads-1-1.failed").read_text().splitlines()
+        self.assertEqual(len(failed), 2)
+        self.assertIn("long@example.com", failed[0])
+        self.assertEqual(list(self.spool_dir.glob("*.flushing")), [])
+
+    def test_failed_recovery_does_not_hold_back_new_batches(self):
+        """Test that a spool that cannot be replayed yet stays while new leads are written"""
+        (self.spool_dir / "leads-1-1.flushing").write_text(
+            json.dumps(self.lead("old@example.com")) + "\n"
+        )
+        self.buffer._needs_recovery = True
+        self.buffer.submit(self.lead("new@example.com"))
+        real_save = save_leads
+
+        def save(leads, batch_size=None):
+            if any(lead.email == "old@example.com" for lead in leads):
+                raise OperationalError("database is down")
+            return real_save(leads, batch_size)
+
+        with mock.patch("analytics.ingestion.save_leads", side_effect=save):
+            with self.assertLogs("analytics.ingestion", "ERROR"):
+                self.assertEqual(self.buffer.flush(), 1)
+        self.assertTrue(Lead.objects.filter(email="new@example.com").exists())
+        self.assertTrue((self.spool_dir / "leads-1-1.flushing").exists())
+
+        self.buffer.flush()
+        self.assertTrue(Lead.objects.filter(email="old@example.com").exists())
+
+    @skipUnless(hasattr(os, "fork"), "Needs os.fork")
+    def test_spool_of_crashed_worker_is_replayed(self):
+        """Test that a worker dying before its flush does not lose its leads"""
+        pid = os.fork()
+        if pid == 0:
+            # Child: queue a lead and die without flushing
+            LeadBuffer(self.spool_dir, fsync=True).submit(self.lead("crash@example.com"))
+            os._exit(1)
+        os.waitpid(pid, 0)
+        self.assertTrue((self.spool_dir / f"leads-{pid}.jsonl").exists())
+        # The spool of a live worker is left alone
+        live = self.spool_dir / f"leads-{os.getppid()}.jsonl"
+        live.write_text(json.dumps(self.lead("live@example.com")) + "\n")
+
+        with self.assertLogs("analytics.ingestion", "WARNING") as logs:
+            LeadBuffer(self.spool_dir).recover()
+        self.assertIn(f"leads-{pid}.jsonl", logs.output[0])
+        self.assertTrue(Lead.objects.filter(email="crash@example.com").exists())
+        self.assertFalse(Lead.objects.filter(email="live@example.com").exists())
+        self.assertEqual(sorted(self.spool_dir.iterdir()), [live])
+
+
+class LeadRollupTest(TestCase):
+    def setUp(self):
+        self.campaign = Campaign.objects.create(name="Webinar")
+        self.later = timezone.now() + timedelta(minutes=5)
+
+    def lead(self, email, **fields):
+        return Lead.objects.create(
+            name="Test User", email=email, campaign=self.campaign, **fields
+        )
+
+    def test_rollup_groups_by_dimensions(self):
+        """Test that the daily rollup counts leads per source and status"""
+        self.lead("a@example.com", source="webinar", utm_source="facebook")
+        self.lead("b@example.com", source="webinar", utm_source="facebook")
+        self.lead("c@example.com", source="direct")
+
+        self.assertEqual(update_lead_rollups(now=self.later), (1, 4))
+        webinar = LeadDailyRollup.objects.get(source="webinar")
+        self.assertEqual(webinar.leads, 2)
+        self.assertEqual(webinar.campaign, self.campaign)
+        self.assertEqual(webinar.day, timezone.localdate())
+        self.assertEqual(LeadUtmDailyRollup.objects.get(utm_source="facebook").leads, 2)
+
+    def test_incremental_run_only_recomputes_changed_days(self):
+        """Test that the high-water mark skips unchanged leads"""
+        lead = self.lead("a@example.com")
+        self.lead("b@example.com")
+        update_lead_rollups(now=self.later)
+        self.assertEqual(update_lead_rollups(now=self.later), (0, 0))
+
+        Lead.objects.filter(pk=lead.pk).update(
+            status="contacted", updated_at=self.later - timedelta(seconds=1)
+        )
+        update_lead_rollups(now=self.later + timedelta(minutes=1))
+        counts = dict(LeadDailyRollup.objects.values_list("status", "leads"))
+        self.assertEqual(counts, {"new": 1, "contacted": 1})
+
+    def test_mark_trails_the_clock(self):
+        """Test that leads newer than the safety lag wait for the next run"""
+        self.lead("a@example.com")
+        self.assertEqual(update_lead_rollups(), (0, 0))
+        checkpoint = JobCheckpoint.objects.get(name="lead_rollups")
+        self.assertLess(checkpoint.high_water_mark, timezone.now())
+
+    def test_full_rebuild_drops_deleted_leads(self):
+        """Test that a full rebuild forgets leads that no longer exist"""
+        lead = self.lead("a@example.com")
+        self.lead("b@example.com")
+        update_lead_rollups(now=self.later)
+        lead.delete()
+
+        update_lead_rollups(full=True, now=self.later)
+        self.assertEqual(LeadDailyRollup.objects.get().leads, 1)
+
+    def test_days_are_filtered_by_local_datetime_ranges(self):
+        """Test that rollups use index-friendly created_at bounds per local day"""
+        today = timezone.localdate()
+        days = [today - timedelta(days=n) for n in (0, 1, 2, 5)]
+        for n, day in enumerate(days):
+            # Justo antes de la medianoche local: un filtro en UTC lo cambiaría de día
+            at = local_day_start(day + timedelta(days=1)) - timedelta(seconds=1)
+            lead = self.lead(f"{n}@example.com")
+            Lead.objects.filter(pk=lead.pk).update(created_at=at, updated_at=at)
+
+        sql = str(_aggregate(days, ("status",)).query)
+        where = sql.split(" WHERE ")[1].split(" GROUP BY ")[0]
+        self.assertNotIn("date", where.lower())
+        self.assertEqual(where.count("created_at\" >="), 2)
+
+        with mock.patch("analytics.rollups.DAYS_PER_QUERY", 2):
+            self.assertEqual(update_lead_rollups(full=True, now=self.later)[0], 6)
+        self.assertEqual(
+            sorted(LeadDailyRollup.objects.values_list("day", "leads")),
+            sorted((day, 1) for day in days),
+        )
+
+    def test_rollup_admin_is_read_only(self):
+        """Test that the rollup changelist renders without add permission"""
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        self.lead("a@example.com")
+        update_lead_rollups(now=self.later)
+
+        response = self.client.get(reverse("admin:analytics_leaddailyrollup_changelist"))
+        self.assertContains(response, "Webinar")
+        response = self.client.get(reverse("admin:analytics_leaddailyrollup_add"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_command(self):
+        """Test that the management command reports its work"""
+        out = StringIO()
+        call_command("update_lead_rollups", stdout=out)
+        self.assertIn("días recalculados", out.getvalue())
+
+
+class LeadAdminQueryPlanTest(TestCase):
+    """
+    Regression test for the Lead index set: every query the admin changelist
+    issues against analytics_lead must be answered from an index.
+    """
+
+    changelist_params = [
+        "",
+        "?status__exact=new",
+        "?source__exact=webinar",
+        "?created_at__gte=2026-10-11+00%3A00%3A00-06%3A00"
+        "&created_at__lt=2026-10-19+00%3A00%3A00-06%3A00",
+    ]
+
+    def setUp(self):
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        # Same data shape as generate_synthetic_data, at test scale
+        generate(campaigns=5, landings_per_campaign=2, leads=500, seed=1)
+        Lead.objects.create(name="Test User", email="test@example.com", source="webinar")
+
+    def capture_changelist_queries(self, params):
+        queries = []
+
+        def capture(execute, sql, sql_params, many, context):
+            if '"analytics_lead"' in sql:
+                queries.append((sql, sql_params))
+            return execute(sql, sql_params, many, context)
+
+        url = reverse("admin:analytics_lead_changelist")
+        with connection.execute_wrapper(capture):
+            for query_string in params:
+                self.assertEqual(self.client.get(url + query_string).status_code, 200)
+        return queries
+
+    def unbounded_scans(self, sql, params):
+        """
+        Plan steps that may read analytics_lead end to end. Index searches
+        pass; a full index walk passes only when LIMIT stops it, that is,
+        when the index already delivers the ORDER BY.
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+                return self.unbounded_postgresql_nodes(json.loads(cursor.fetchone()[0])[0]["Plan"])
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        sorted_in_full = "USE TEMP B-TREE FOR ORDER BY" in plan
+        bounded = " LIMIT " in sql and not sorted_in_full
+        return [
+            line for line in plan
+            if line.startswith("SCAN analytics_lead") and not (bounded and " INDEX " in line)
+        ] + (["USE TEMP B-TREE FOR ORDER BY"] if sorted_in_full else [])
+
+    def unbounded_postgresql_nodes(self, node, limited=False):
+        found = []
+        if node.get("Relation Name") == "analytics_lead":
+            if node["Node Type"] == "Seq Scan":
+                found.append(node["Node Type"])
+            elif "Index" in node["Node Type"] and "Index Cond" not in node and not limited:
+                found.append(f"{node['Node Type']} using {node['Index Name']}")
+        limited = limited or node["Node Type"] == "Limit"
+        if node["Node Type"] == "Sort":
+            limited = False
+        for child in node.get("Plans", ()):
+            found += self.unbounded_postgresql_nodes(child, limited)
+        return found
+
+    def test_changelist_queries_use_indexes(self):
+        """Test that no admin list query scans the whole lead table"""
+        params = list(self.changelist_params)
+        if connection.vendor == "postgresql":
+            # LIKE '%q%' searches are only indexed (trigram) on PostgreSQL
+            params.append("?q=test")
+        # Second page, reached through a keyset cursor
+        with mock.patch.object(LeadAdmin, "list_per_page", 1):
+            response = self.client.get(reverse("admin:analytics_lead_changelist"))
+            params.append(response.context["cl"].next_page_url)
+            # At test scale the changelist counts exactly on purpose; estimate
+            # as it would with a production-sized table
+            with mock.patch("landings.pagination.EXACT_COUNT_BELOW", 0):
+                queries = self.capture_changelist_queries(params)
+        self.assertTrue(queries)
+        for sql, sql_params in queries:
+            with self.subTest(sql=sql):
+                self.assertEqual(self.unbounded_scans(sql, sql_params), [])
+
+    def test_plan_check_flags_index_walks(self):
+        """Test that a full covering-index scan is not mistaken for a search"""
+        sql = 'SELECT COUNT(*) FROM "analytics_lead"'
+        self.assertNotEqual(self.unbounded_scans(sql, ()), [])
+        sql = 'SELECT DISTINCT "source" FROM "analytics_lead"'
+        self.assertNotEqual(self.unbounded_scans(sql, ()), [])
+
+
+class LeadExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(self.user)
+        self.campaign = Campaign.objects.create(name="Webinar")
+        Lead.objects.create(
+            name="Ana", email="ana@example.com", campaign=self.campaign,
+            utm_source="facebook",
+        )
+        Lead.objects.create(name="Luis", email="luis@example.com", status="contacted")
+        self.url = reverse("admin:analytics_lead_export")
+
+    def test_csv_export_with_filters(self):
+        """Test that the admin export streams the filtered leads as CSV"""
+        response = self.client.get(self.url, {"campaign": self.campaign.pk})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.DictReader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row["email"] for row in rows], ["ana@example.com"])
+        self.assertEqual(rows[0]["utm_source"], "facebook")
+
+    def test_csv_export_neutralizes_formulas(self):
+        """Test that cells a spreadsheet would evaluate are prefixed with a quote"""
+        Lead.objects.create(
+            name="=HYPERLINK(\"http://evil.example\")", email="eve@example.com",
+            phone="+57 300 000 0000", utm_source="@source", utm_campaign="\tcampaign",
+        )
+        response = self.client.get(self.url)
+        rows = list(csv.DictReader(b"".join(response.streaming_content).decode().splitlines()))
+        row = rows[-1]
+        self.assertEqual(row["name"], "'=HYPERLINK(\"http://evil.example\")")
+        self.assertEqual(row["phone"], "'+57 300 000 0000")
+        self.assertEqual(row["utm_source"], "'@source")
+        self.assertEqual(row["utm_campaign"], "'\tcampaign")
+        self.assertEqual(row["email"], "eve@example.com")
+        self.assertEqual(rows[0]["name"], "Ana")
+
+    def test_date_filters_use_local_day_bounds(self):
+        """Test that date filters become created_at ranges in local time"""
+        day = timezone.localdate() - timedelta(days=3)
+        ana, luis = Lead.objects.order_by("pk")
+        # Último segundo del día local y primer instante del siguiente
+        Lead.objects.filter(pk=ana.pk).update(
+            created_at=local_day_start(day + timedelta(days=1)) - timedelta(seconds=1)
+        )
+        Lead.objects.filter(pk=luis.pk).update(
+            created_at=local_day_start(day + timedelta(days=1))
+        )
+        form = LeadExportFilterForm({"created_after": day, "created_before": day})
+        self.assertTrue(form.is_valid())
+        queryset = form.queryset()
+        self.assertEqual([lead.email for lead in queryset], ["ana@example.com"])
+        self.assertNotIn("date", str(queryset.query).split(" WHERE ")[1].lower())
+
+    def test_gzip_ndjson_export(self):
+        """Test that the NDJSON export can be gzipped on the fly"""
+        response = self.client.get(
+            self.url, {"format": "ndjson", "gzip": "1", "status": "contacted"}
+        )
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn('filename="leads.ndjson.gz"', response["Content-Disposition"])
+        lines = gzip.decompress(b"".join(response.streaming_content)).splitlines()
+        self.assertEqual([json.loads(line)["name"] for line in lines], ["Luis"])
+
+    def test_invalid_filters(self):
+        """Test that malformed filters are rejected"""
+        response = self.client.get(self.url, {"created_after": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_requires_admin_login(self):
+        """Test that anonymous users are sent to the admin login"""
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    async def test_export_streams_under_asgi(self):
+        """Test that the export is served as an async stream under ASGI"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.url)
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.decode().splitlines()), 3)
+
+    def test_rows_are_flushed_in_blocks(self):
+        """Test that the export yields many bounded blocks instead of one"""
+        with mock.patch("analytics.export.FLUSH_BYTES", 64):
+            chunks = list(iter_export(Lead.objects.order_by("pk"), chunk_size=1))
+        self.assertGreater(len(chunks), 1)
+
+    def test_command(self):
+        """Test that the management command writes a gzipped file"""
+        output = Path(self.enterContext(tempfile.TemporaryDirectory())) / "leads.csv.gz"
+        call_command("export_leads", "--gzip", "--status", "new", "-o", str(output))
+        rows = list(csv.reader(gzip.decompress(output.read_bytes()).decode().splitlines()))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][2], "ana@example.com")
+
+
+class AdminQueryCountTest(TestCase):
+    """
+    Each changelist must run a fixed number of queries however many rows it
+    shows: related objects are joined, never loaded row by row.
+    """
+
+    def setUp(self):
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        self.rows = 0
+
+    def add_rows(self, count):
+        # Every row gets its own campaign and landing so lazy loads would show up
+        for _ in range(count):
+            self.rows += 1
+            campaign = Campaign.objects.create(name=f"Campaign {self.rows}")
+            landing = LandingPage.objects.create(
+                campaign=campaign, title=f"Landing {self.rows}", slug=f"landing-{self.rows}"
+            )
+            Lead.objects.create(
+                name="Test User",
+                email=f"user{self.rows}@example.com",
+                campaign=campaign,
+                landing_page=landing,
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        self.add_rows(1)
+        # Warm process-level caches (content types, campaign names) first
+        self.client.get(url)
+        few = self.count_queries(url)
+        self.add_rows(10)
+        self.assertEqual(self.count_queries(url), few)
+
+    def test_lead_changelist(self):
+        self.assertConstantQueries(reverse("admin:analytics_lead_changelist"))
+
+    def test_landing_page_changelist(self):
+        self.assertConstantQueries(reverse("admin:landings_landingpage_changelist"))
+
+    def test_campaign_changelist(self):
+        self.assertConstantQueries(reverse("admin:landings_campaign_changelist"))
+
+    def test_landing_page_autocomplete(self):
+        self.assertConstantQueries(
+            reverse("admin:autocomplete")
+            + "?app_label=analytics&model_name=lead&field_name=landing_page"
+        )
+
+    def test_lead_change_form(self):
+        """Test that the lead form does not list every landing page"""
+        self.add_rows(1)
+        lead = Lead.objects.get()
+        self.assertConstantQueries(reverse("admin:analytics_lead_change", args=[lead.pk]))
+
+
+class CampaignPerformanceTest(TestCase):
+    def setUp(self):
+        self.campaign = Campaign.objects.create(name="Webinar SIG")
+        self.landing = LandingPage.objects.create(
+            campaign=self.campaign, title="Master Class", slug="master-class", view_count=200
+        )
+        self.later = timezone.now() + timedelta(minutes=5)
+
+    def lead(self, email, days_ago=0):
+        lead = Lead.objects.create(
+            name="Test User", email=email, campaign=self.campaign, landing_page=self.landing
+        )
+        Lead.objects.filter(pk=lead.pk).update(
+            created_at=timezone.now() - timedelta(days=days_ago)
+        )
+
+    def test_refresh_summarizes_rollups(self):
+        """Test that the summary holds views, leads, conversion rate and trend"""
+        self.lead("a@example.com")
+        self.lead("b@example.com", days_ago=1)
+        self.lead("c@example.com", days_ago=10)
+
+        refresh_campaign_performance(now=self.later)
+        row = CampaignPerformance.objects.get(landing_page=self.landing)
+        self.assertEqual((row.views, row.leads), (200, 3))
+        self.assertEqual(row.conversion_rate, 1.5)
+        self.assertEqual((row.leads_last_7_days, row.leads_previous_7_days), (2, 1))
+        self.assertEqual(row.trend, 100)
+
+    def test_landings_without_leads_are_listed(self):
+        """Test that every landing page gets a row, even with no leads"""
+        refresh_campaign_performance(now=self.later)
+        campaigns, refreshed_at = campaign_performance()
+        self.assertEqual(campaigns[0].views, 200)
+        self.assertEqual(campaigns[0].leads, 0)
+        self.assertEqual(len(campaigns[0].landings), 1)
+        self.assertIsNotNone(refreshed_at)
+
+    @mock.patch("analytics.dashboard.get_performance_refresher")
+    def test_stale_summary_wakes_refresher(self, get_refresher):
+        """Test that reading a missing or stale summary requests a refresh"""
+        campaign_performance()
+        get_refresher.return_value.wake.assert_called_once()
+
+        refresh_campaign_performance()
+        get_refresher.reset_mock()
+        campaign_performance()
+        get_refresher.return_value.wake.assert_not_called()
+
+    def test_admin_index_reads_the_summary_only(self):
+        """Test that the admin home renders the panel without touching leads"""
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        self.lead("a@example.com")
+        refresh_campaign_performance(now=self.later)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:index"))
+        self.assertContains(response, "Rendimiento de campañas")
+        self.assertContains(response, "Webinar SIG")
+        self.assertContains(response, "0.5%")
+        for query in queries:
+            self.assertNotIn('"analytics_lead"', query["sql"])
+
+    def test_refresh_only_rewrites_touched_campaigns(self):
+        """Test that later refreshes upsert the campaigns that changed"""
+        other = Campaign.objects.create(name="Otra")
+        LandingPage.objects.create(campaign=other, title="Otra", slug="otra", view_count=5)
+        self.lead("a@example.com")
+        refresh_campaign_performance(now=self.later)
+        row = CampaignPerformance.objects.get(landing_page=self.landing)
+        self.assertEqual(row.key, f"{self.campaign.pk}:{self.landing.pk}")
+
+        # Nada cambió: solo se marca la hora del refresco
+        self.assertEqual(refresh_campaign_performance(now=self.later), 0)
+
+        self.lead("b@example.com")
+        Lead.objects.filter(email="b@example.com").update(updated_at=self.later)
+        later = self.later + timedelta(minutes=5)
+        self.assertEqual(refresh_campaign_performance(now=later), 1)
+        self.assertEqual(CampaignPerformance.objects.get(pk=row.pk).leads, 2)
+        self.assertEqual(
+            set(CampaignPerformance.objects.values_list("refreshed_at", flat=True)), {later}
+        )
+
+        LandingPage.objects.filter(campaign=other).update(view_count=6)
+        self.assertEqual(refresh_campaign_performance(now=later), 1)
+        self.assertEqual(CampaignPerformance.objects.get(campaign=other).views, 6)
+
+    def test_moved_and_deleted_leads_refresh_their_old_campaign(self):
+        """Test that a lead leaving a campaign refreshes that campaign too"""
+        other = Campaign.objects.create(name="Otra")
+        self.lead("a@example.com")
+        self.lead("b@example.com")
+        refresh_campaign_performance(now=self.later)
+
+        Lead.objects.filter(email="a@example.com").update(
+            campaign=other, landing_page=None, updated_at=self.later
+        )
+        later = self.later + timedelta(minutes=5)
+        refresh_campaign_performance(now=later)
+        self.assertEqual(CampaignPerformance.objects.get(landing_page=self.landing).leads, 1)
+        self.assertEqual(CampaignPerformance.objects.get(campaign=other).leads, 1)
+
+        # Los leads borrados no dejan rastro en updated_at
+        Lead.objects.filter(email="b@example.com").delete()
+        refresh_days([timezone.localdate()])
+        refresh_campaign_performance(now=later)
+        self.assertEqual(CampaignPerformance.objects.get(landing_page=self.landing).leads, 0)
+
+    def test_refresh_is_skipped_while_another_process_holds_it(self):
+        """Test that the checkpoint row serializes refreshes"""
+        refresh_campaign_performance(now=self.later)
+        locked = mock.patch.object(
+            JobCheckpoint.objects, "select_for_update", return_value=JobCheckpoint.objects.none()
+        )
+        with locked:
+            self.assertEqual(refresh_campaign_performance(full=True), 0)
+        self.assertEqual(refresh_campaign_performance(full=True), 1)
+
+    def test_command(self):
+        """Test that the management command refreshes the summary"""
+        out = StringIO()
+        call_command("refresh_campaign_performance", stdout=out)
+        self.assertIn("1 filas", out.getvalue())
+        call_command("refresh_campaign_performance", "--full", stdout=out)
+        self.assertIn("1 filas", out.getvalue().splitlines()[-1])
+
+
+class EventCollectionTest(TestCase):
+    def setUp(self):
+        get_event_buffer.cache_clear()
+        self.url = reverse("analytics:collect")
+        self.client.cookies["consent"] = sign_consent(has_consent=True, analytics=True)
+
+    def tearDown(self):
+        get_event_buffer.cache_clear()
+
+    def post(self, payload, client=None):
+        return (client or self.client).post(
+            self.url, json.dumps(payload), content_type="text/plain"
+        )
+
+    def test_events_are_buffered_then_bulk_inserted(self):
+        """Test that a batch is accepted without touching the database"""
+        payload = {"events": [
+            {"name": "page_view", "path": "/webinar/", "utm": {"utm_source": "facebook"}},
+            {"name": "cta_click", "path": "/webinar/", "props": {"label": "WhatsApp"}},
+        ]}
+        with self.assertNumQueries(0):
+            response = self.post(payload)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(len(get_event_buffer()), 2)
+
+        self.assertEqual(get_event_buffer().flush(), 2)
+        event = Event.objects.get(name="page_view")
+        self.assertEqual(event.utm_source, "facebook")
+        self.assertEqual(Event.objects.get(name="cta_click").props, {"label": "WhatsApp"})
+
+    def test_without_analytics_consent_nothing_is_stored(self):
+        """Test that the analytics consent flag is honored"""
+        self.client.cookies["consent"] = sign_consent(has_consent=True)
+        response = self.post({"events": [{"name": "page_view", "path": "/"}]})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(len(get_event_buffer()), 0)
+
+    def test_invalid_events_are_ignored(self):
+        """Test that unknown names and malformed items are skipped"""
+        now = timezone.now()
+        events = parse_events(
+            {"events": [
+                {"name": "purchase"},
+                "page_view",
+                {"name": "form_start", "path": 42, "ts": "yesterday", "props": [1]},
+            ]},
+            now=now,
+        )
+        self.assertEqual(len(events), 1)
+        self.assertEqual((events[0].path, events[0].occurred_at, events[0].props), ("/", now, {}))
+
+    def test_request_limits(self):
+        """Test malformed bodies, oversized bodies and non-POST methods"""
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        response = self.client.post(self.url, "{not json", content_type="text/plain")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, "x" * (65 * 1024), content_type="text/plain")
+        self.assertEqual(response.status_code, 413)
+
+        self.post({"events": [{"name": "page_view", "path": "/"}] * 80})
+        self.assertEqual(len(get_event_buffer()), 50)
+
+    def test_full_buffer_drops_events(self):
+        """Test that a full buffer drops events instead of blocking"""
+        buffer = EventBuffer(batch_size=10, max_pending=3)
+        events = parse_events({"events": [{"name": "page_view"}] * 5})
+        self.assertEqual(buffer.add(events), 3)
+        self.assertEqual(buffer.dropped, 2)
+
+    async def test_collect_under_asgi(self):
+        """Test that the endpoint runs on the async request path"""
+        self.async_client.cookies["consent"] = sign_consent(has_consent=True, analytics=True)
+        response = await self.async_client.post(
+            self.url, json.dumps({"events": [{"name": "form_submit"}]}),
+            content_type="text/plain",
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(len(get_event_buffer()), 1)
+
+    def test_beacon_script_requires_consent(self):
+        """Test that pages only include the beacon with analytics consent"""
+        response = self.client.get(reverse("landings:webinar_landing"))
+        self.assertContains(response, self.url)
+        self.client.cookies["consent"] = sign_consent(has_consent=True)
+        response = self.client.get(reverse("landings:webinar_landing"))
+        self.assertNotContains(response, self.url)
+
+
+class SyntheticDataTest(TestCase):
+    def test_same_seed_generates_same_rows(self):
+        """Test that the generator is deterministic per seed and spreads the data"""
+        now = timezone.now()
+        campaigns = [(1, "campana-1", [10, 11]), (2, "campana-2", [])]
+        [rows] = lead_rows(2000, campaigns, seed=7, days=90, chunk_size=2000, now=now)
+        [again] = lead_rows(2000, campaigns, seed=7, days=90, chunk_size=2000, now=now)
+        self.assertEqual(rows, again)
+        self.assertNotEqual(next(lead_rows(10, campaigns, seed=8, now=now)), rows[:10])
+
+        leads = [dict(zip(COPY_COLUMNS, row)) for row in rows]
+        self.assertEqual(len({lead["email_normalized"] for lead in leads}), 2000)
+        self.assertEqual({lead["status"] for lead in leads}, set(STATUS_WEIGHTS))
+        for lead in leads:
+            self.assertEqual(lead["campaign_id"] is None, lead["source"] == "direct")
+            self.assertEqual(
+                bool(lead["utm_campaign"]), bool(lead["utm_source"] and lead["campaign_id"])
+            )
+            self.assertIn(lead["landing_page_id"], {None, 10, 11})
+            self.assertLessEqual(lead["created_at"], lead["updated_at"])
+            self.assertLessEqual(lead["updated_at"], now)
+        # Zipf: the first campaign gets more leads than the second
+        per_campaign = Counter(lead["campaign_id"] for lead in leads)
+        self.assertGreater(per_campaign[1], per_campaign[2])
+        self.assertGreater(now - min(lead["created_at"] for lead in leads), timedelta(days=60))
+
+    def test_command_loads_leads_with_their_timestamps(self):
+        """Test the management command and that created_at is not reset to now"""
+        out = StringIO()
+        call_command(
+            "generate_synthetic_data", leads=300, campaigns=4, landings=2,
+            days=30, chunk_size=100, stdout=out,
+        )
+        self.assertIn("300 leads", out.getvalue())
+        self.assertEqual(Lead.objects.count(), 300)
+        self.assertEqual(LandingPage.objects.filter(slug__startswith="sintetica-0-").count(), 8)
+        self.assertTrue(
+            Lead.objects.filter(created_at__lt=timezone.now() - timedelta(days=7)).exists()
+        )
+        self.assertTrue(Lead._meta.get_field("created_at").auto_now_add)
+        with self.assertRaises(CommandError):
+            call_command("generate_synthetic_data", leads=1, stdout=out)
+
+
+@skipUnless(np, "NumPy no está instalado")
+class AnalyticsArchiveTest(TestCase):
+    def setUp(self):
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.campaign = Campaign.objects.create(name="Archivo")
+        self.old = timezone.now() - timedelta(days=400)
+
+    def create_lead(self, email, created_at, **kwargs):
+        lead = Lead.objects.create(name="Ana", email=email, phone="600", **kwargs)
+        Lead.objects.filter(pk=lead.pk).update(created_at=created_at)
+        return lead
+
+    def test_old_leads_are_moved_to_anonymous_partitions(self):
+        """Test that aged leads leave the database and land in month/campaign files"""
+        self.create_lead("a@example.com", self.old, campaign=self.campaign, utm_source="facebook")
+        self.create_lead("b@example.com", self.old, utm_source="google")
+        recent = self.create_lead("c@example.com", timezone.now())
+
+        moved = archive_rows("leads", cutoff_for(365), root=self.root, batch_size=1)
+        self.assertEqual(moved, 2)
+        self.assertEqual(list(Lead.objects.values_list("pk", flat=True)), [recent.pk])
+
+        month = timezone.localtime(self.old).strftime("%Y-%m")
+        partitions = self.root / "leads" / month
+        self.assertTrue(list((partitions / f"campaign-{self.campaign.pk}").glob("*.npz")))
+        self.assertTrue(list((partitions / "campaign-none").glob("*.npz")))
+
+        leads = load("leads", root=self.root)
+        self.assertEqual(len(leads["id"]), 2)
+        self.assertNotIn("email", leads)
+        self.assertNotIn("name", leads)
+        self.assertEqual(set(leads["utm_source"]), {"facebook", "google"})
+        only_campaign = load("leads", root=self.root, campaigns=[self.campaign.pk])
+        self.assertEqual(list(only_campaign["campaign_id"]), [self.campaign.pk])
+
+    def test_dry_run_counts_without_writing(self):
+        """Test that a dry run leaves rows and disk untouched"""
+        self.create_lead("a@example.com", self.old)
+        self.assertEqual(archive_rows("leads", cutoff_for(365), root=self.root, dry_run=True), 1)
+        self.assertEqual(Lead.objects.count(), 1)
+        self.assertFalse(any(self.root.iterdir()))
+
+    def test_rearchived_batches_are_deduplicated(self):
+        """Test that a batch written twice is loaded once"""
+        self.create_lead("a@example.com", self.old)
+        archive_rows("leads", cutoff_for(365), root=self.root)
+        # Simula un fallo tras escribir y antes de borrar: misma fila en otra parte
+        for path in self.root.rglob("*.npz"):
+            path.with_name("part-copy.npz").write_bytes(path.read_bytes())
+        self.assertEqual(len(load("leads", root=self.root)["id"]), 1)
+
+    def test_funnel_and_utm_breakdown(self):
+        """Test the vectorized aggregates over archived events and leads"""
+        occurred = timezone.now() - timedelta(days=100)
+        steps = ["page_view", "page_view", "cta_click", "form_submit"]
+        Event.objects.bulk_create(
+            Event(name=name, path=path, occurred_at=occurred, received_at=occurred)
+            for name, path in [(step, "/webinar/") for step in steps] + [("page_view", "/")]
+        )
+        self.create_lead("a@example.com", self.old, utm_source="facebook", utm_medium="cpc")
+        self.create_lead("b@example.com", self.old, utm_source="facebook", utm_medium="cpc")
+        self.create_lead("c@example.com", self.old, utm_source="google")
+
+        self.assertEqual(archive_rows("events", cutoff_for(90), root=self.root), 5)
+        self.assertFalse(Event.objects.exists())
+        paths, counts = funnel(load("events", root=self.root))
+        self.assertEqual(list(paths), ["/", "/webinar/"])
+        self.assertEqual(counts.tolist(), [[1, 0, 0, 0], [2, 1, 0, 1]])
+
+        archive_rows("leads", cutoff_for(365), root=self.root)
+        self.assertEqual(
+            utm_breakdown(load("leads", root=self.root)),
+            [(("facebook", "cpc", ""), 2), (("google", "", ""), 1)],
+        )
+
+    def test_archive_commands(self):
+        """Test the archive and report management commands"""
+        self.create_lead("a@example.com", self.old, utm_source="facebook")
+        out = StringIO()
+        call_command("archive_analytics", root=str(self.root), stdout=out)
+        self.assertIn("leads: 1 archivados", out.getvalue())
+        self.assertFalse(Lead.objects.exists())
+
+        out = StringIO()
+        call_command("archive_report", root=str(self.root), stdout=out)
+        self.assertIn("facebook/-/-\t1", out.getvalue())
+
+    def test_retention_prunes_the_archive(self):
+        """Test that archived rows are deleted at their retention age"""
+        now = timezone.now()
+        # Dos vencidas (una en el mes del corte) y dos vigentes
+        ages = [timedelta(days=days) for days in (500, 425.01, 424.99, 100)]
+        for age in ages:
+            Event.objects.create(name="page_view", path="/", occurred_at=now - age)
+        archive_rows("events", cutoff_for(90), root=self.root)
+
+        config = {**settings.ANALYTICS_ARCHIVE, "ROOT": self.root}
+        with self.settings(ANALYTICS_ARCHIVE=config):
+            self.assertEqual(run_retention(now=now)["events_pruned"], 2)
+            self.assertEqual(run_retention(now=now)["events_pruned"], 0)
+        occurred = load("events", root=self.root)["occurred_at"]
+        self.assertEqual(len(occurred), 2)
+        cutoff = np.datetime64(int((now - timedelta(days=425)).timestamp()), "s")
+        self.assertTrue((occurred >= cutoff).all())
+        month = timezone.localtime(now - timedelta(days=500)).strftime("%Y-%m")
+        self.assertFalse((self.root / "events" / month).exists())
+
+    def test_archive_ages_must_precede_retention(self):
+        """Test the system check for archive ages past their delete age"""
+        self.assertEqual(check_archive_retention(None), [])
+        config = {**settings.DATA_RETENTION, "EVENT_DELETE_AFTER_DAYS": 60}
+        with self.settings(DATA_RETENTION=config):
+            self.assertEqual(
+                [error.id for error in check_archive_retention(None)], ["analytics.W001"]
+            )
+
+
+class DataRetentionTest(TestCase):
+    def create_lead(self, email, days_ago, **kwargs):
+        lead = Lead.objects.create(name="Ana", email=email, phone="600", **kwargs)
+        created_at = timezone.now() - timedelta(days=days_ago)
+        Lead.objects.filter(pk=lead.pk).update(created_at=created_at)
+        return lead
+
+    def test_old_leads_are_anonymized_in_batches(self):
+        """Test that aged leads lose their personal data but keep tracking fields"""
+        old = [
+            self.create_lead(f"old{i}@example.com", 800, utm_source="facebook")
+            for i in range(5)
+        ]
+        recent = self.create_lead("recent@example.com", 10)
+
+        with self.settings(DATA_RETENTION={**settings.DATA_RETENTION, "BATCH_SIZE": 2}):
+            self.assertEqual(run_retention()["anonymized"], 5)
+        for lead in old:
+            lead.refresh_from_db()
+            self.assertEqual(lead.name, "Anónimo")
+            self.assertEqual(lead.email, f"lead-{lead.pk}@anonimizado.invalid")
+            self.assertIsNone(lead.phone)
+            self.assertEqual(lead.utm_source, "facebook")
+        recent.refresh_from_db()
+        self.assertEqual(recent.email, "recent@example.com")
+        self.assertIsNotNone(JobCheckpoint.objects.get(name=ANONYMIZE_CHECKPOINT).high_water_mark)
+
+        # La segunda pasada parte del checkpoint y no repite trabajo
+        self.assertEqual(run_retention()["anonymized"], 0)
+
+    def test_expired_events_and_leads_are_deleted(self):
+        """Test the delete TTLs for events and, when configured, leads"""
+        now = timezone.now()
+        for days in (500, 10):
+            occurred = now - timedelta(days=days)
+            Event.objects.create(name="page_view", path="/", occurred_at=occurred)
+        self.create_lead("old@example.com", 2000)
+        self.create_lead("recent@example.com", 10)
+
+        config = {**settings.DATA_RETENTION, "LEAD_DELETE_AFTER_DAYS": 1825, "BATCH_SIZE": 1}
+        with self.settings(DATA_RETENTION=config):
+            results = run_retention()
+        self.assertEqual(results["events_deleted"], 1)
+        self.assertEqual(results["leads_deleted"], 1)
+        self.assertEqual(Event.objects.count(), 1)
+        self.assertEqual(list(Lead.objects.values_list("email", flat=True)), ["recent@example.com"])
+
+    def test_one_process_runs_retention_at_a_time(self):
+        """Test that a pass is skipped while another process holds the turn"""
+        self.create_lead("old@example.com", 800)
+        JobCheckpoint.objects.create(
+            name=RUNNER_CHECKPOINT, high_water_mark=timezone.now() + timedelta(minutes=5)
+        )
+        self.assertIsNone(run_retention())
+        out = StringIO()
+        call_command("run_retention", stdout=out)
+        self.assertIn("Otro proceso", out.getvalue())
+        self.assertEqual(Lead.objects.get().name, "Ana")
+
+        # Un turno vencido se puede tomar, y se libera al terminar
+        JobCheckpoint.objects.filter(name=RUNNER_CHECKPOINT).update(
+            high_water_mark=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(run_retention()["anonymized"], 1)
+        self.assertIsNone(JobCheckpoint.objects.get(name=RUNNER_CHECKPOINT).high_water_mark)
+
+    def test_erasure_request_is_processed_in_background(self):
+        """Test that the admin only records the request and the engine erases"""
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        lead = self.create_lead("Borrar@Example.com", 1)
+        self.create_lead("keep@example.com", 1)
+        # Las notificaciones se borran en cascada pero no cuentan como leads
+        for destination in ("crm", "email"):
+            OutboxMessage.objects.create(
+                lead=lead, destination=destination,
+                idempotency_key=idempotency_key(lead.pk, destination),
+            )
+
+        response = self.client.post(
+            reverse("admin:analytics_erasurerequest_add"), {"email": "borrar@example.com"}
+        )
+        self.assertEqual(response.status_code, 302)
+        erasure = ErasureRequest.objects.get()
+        self.assertEqual(erasure.status, "pending")
+        self.assertEqual(Lead.objects.count(), 2)
+
+        out = StringIO()
+        call_command("run_retention", stdout=out)
+        self.assertIn("erased: 1", out.getvalue())
+        erasure.refresh_from_db()
+        self.assertEqual((erasure.status, erasure.leads_erased), ("done", 1))
+        self.assertIsNotNone(erasure.processed_at)
+        self.assertEqual(list(Lead.objects.values_list("email", flat=True)), ["keep@example.com"])
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Webhook de prueba: responde según ``server.script`` y guarda lo recibido"""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.received.append((self.headers["Idempotency-Key"], body))
+            status = server.script.pop(0) if server.script else 200
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "120")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class LeadOutboxTest(TestCase):
+    def setUp(self):
+        get_outbox_worker.cache_clear()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.received, self.server.script = [], []
+        self.server.delay, self.server.active, self.server.max_active = 0, 0, 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        destinations = {
+            "crm": {"KIND": "webhook", "URL": url, "CONCURRENCY": 2, "TIMEOUT": 5},
+            "email": {"KIND": "email", "TO": ["ventas@example.com"]},
+            "whatsapp": {"KIND": "webhook", "URL": None},
+        }
+        override = self.settings(
+            LEAD_OUTBOX={**settings.LEAD_OUTBOX, "DESTINATIONS": destinations}
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def register(self, count=1):
+        return save_leads(
+            [Lead(name=f"Lead {i}", email=f"lead{i}@example.com") for i in range(count)]
+        )
+
+    def test_messages_are_written_with_the_lead(self):
+        """Test that each active destination gets one message per new lead"""
+        response = self.client.post(
+            reverse("landings:register_webinar_lead"),
+            {"name": "Ana", "email": "ana@example.com"},
+        )
+        self.assertEqual(response.status_code, 302)
+        lead = Lead.objects.get()
+        self.assertEqual(
+            sorted(lead.outbox_messages.values_list("idempotency_key", flat=True)),
+            [f"lead:{lead.pk}:crm", f"lead:{lead.pk}:email"],
+        )
+        # Repetir el upsert no duplica notificaciones
+        save_leads([Lead(name="Ana", email="ANA@example.com")])
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+        with mock.patch("analytics.outbox.enqueue_lead_notifications", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                save_leads([Lead(name="Eva", email="eva@example.com")])
+        self.assertFalse(Lead.objects.filter(email="eva@example.com").exists())
+
+    def test_worker_delivers_to_webhook_and_email(self):
+        """Test delivery with idempotency keys and the lead payload"""
+        [lead] = self.register()
+        self.assertEqual(OutboxWorker.from_settings().drain(), (2, 0))
+
+        [(key, body)] = self.server.received
+        self.assertEqual(key, f"lead:{lead.pk}:crm")
+        self.assertEqual((body["id"], body["email"]), (lead.pk, "lead0@example.com"))
+        [email] = mail.outbox
+        self.assertEqual(email.to, ["ventas@example.com"])
+        self.assertEqual(email.extra_headers["X-Idempotency-Key"], f"lead:{lead.pk}:email")
+        self.assertEqual(
+            set(OutboxMessage.objects.values_list("status", flat=True)), {"sent"}
+        )
+
+    def test_failures_are_retried_with_backoff(self):
+        """Test temporary errors, Retry-After and permanent failures"""
+        self.register(3)
+        self.server.script = [500, 429, 400]
+        worker = OutboxWorker.from_settings()
+        now = timezone.now()
+        with self.assertLogs("analytics.outbox", "WARNING"):
+            self.assertEqual(worker.run_once(now), (3, 3))
+
+        crm = OutboxMessage.objects.filter(destination="crm")
+        failed = crm.get(status="failed")
+        self.assertEqual((failed.attempts, failed.last_error), (1, "HTTP 400"))
+        delays = sorted(
+            (message.next_attempt_at - now).total_seconds()
+            for message in crm.filter(status="pending")
+        )
+        self.assertTrue(15 <= delays[0] <= 30)
+        self.assertEqual(delays[1], 120)
+
+        # Nada vence antes del backoff; después se entregan
+        self.assertEqual(worker.run_once(now), (0, 0))
+        self.assertEqual(worker.run_once(now + timedelta(minutes=5)), (2, 0))
+        self.assertEqual(crm.filter(status="sent").count(), 2)
+
+    def test_gives_up_after_max_attempts(self):
+        """Test that a message stops retrying after MAX_ATTEMPTS"""
+        self.register()
+        self.server.script = [503, 503]
+        config = {**settings.LEAD_OUTBOX, "MAX_ATTEMPTS": 2}
+        with self.settings(LEAD_OUTBOX=config):
+            worker = OutboxWorker.from_settings()
+        now = timezone.now()
+        worker.run_once(now)
+        with self.assertLogs("analytics.outbox", "WARNING"):
+            worker.run_once(now + timedelta(hours=1))
+        message = OutboxMessage.objects.get(destination="crm")
+        self.assertEqual((message.status, message.attempts), ("failed", 2))
+
+    def test_destination_concurrency_limit(self):
+        """Test that a destination never gets more than CONCURRENCY requests"""
+        self.register(6)
+        self.server.delay = 0.05
+        self.assertEqual(OutboxWorker.from_settings().drain(), (12, 0))
+        self.assertEqual(len(self.server.received), 6)
+        self.assertEqual(self.server.max_active, 2)
+
+    def test_one_process_drains_at_a_time(self):
+        """Test that the drain turn keeps CONCURRENCY global across processes"""
+        self.register()
+        first, second = OutboxWorker.from_settings(), OutboxWorker.from_settings()
+        self.assertTrue(first.hold_turn())
+        self.assertEqual(second.drain(), (0, 0))
+        self.assertTrue(first.hold_turn())
+        first.release_turn()
+        self.assertEqual(second.drain(), (2, 0))
+        self.assertEqual(JobCheckpoint.objects.get(name="outbox:drainer").high_water_mark, None)
+
+        # Un turno vencido (proceso muerto) se puede tomar
+        self.register(2)
+        JobCheckpoint.objects.filter(name="outbox:drainer").update(
+            high_water_mark=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(first.drain(), (2, 0))
+
+    def test_claimed_messages_are_not_claimed_twice(self):
+        """Test the lease that keeps two workers from sending the same batch"""
+        self.register(2)
+        now = timezone.now()
+        first, second = OutboxWorker.from_settings(), OutboxWorker.from_settings()
+        self.assertEqual(len(first.claim("crm", now)), 2)
+        self.assertEqual(second.claim("crm", now), [])
+        # Si el primer worker muere, el plazo vence y otro los retoma
+        self.assertEqual(len(second.claim("crm", now + timedelta(hours=1))), 2)
+
+    def test_command(self):
+        """Test the process_outbox command"""
+        self.register()
+        out = StringIO()
+        call_command("process_outbox", stdout=out)
+        self.assertIn("Enviados: 2, fallidos: 0", out.getvalue())
@@ -0,0 +1,34 @@
+import json
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .collection import get_event_buffer, parse_events
+
+
+@csrf_exempt
+@require_POST
+async def collect(request):
+    """Recibe lotes de eventos del beacon; siempre responde sin cuerpo."""
+    config = settings.EVENT_COLLECTION
+    try:
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > config["MAX_BODY"]:
+        return HttpResponse(status=413)
+
+    consent = getattr(request, "cookie_consent", {})
+    if not consent.get("analytics"):
+        # Sin consentimiento de analítica no se guarda nada
+        return HttpResponse(status=204)
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest()
+    events = parse_events(payload, limit=config["MAX_EVENTS_PER_REQUEST"])
+    get_event_buffer().add(events)
+    return HttpResponse(status=204)
@@ -1,19 +1,35 @@
 from django.contrib import admin
-from .models import Campaign, LandingPage
+from analytics.admin import ReadOnlyAdmin
+from .models import Campaign, ExperimentDailyStats, LandingPage
+from .pagination import KeysetPaginationMixin
 
 
 @admin.register(Campaign)
-class CampaignAdmin(admin.ModelAdmin):
+class CampaignAdmin(KeysetPaginationMixin, admin.ModelAdmin):
     list_display = ("name", "description", "is_active", "created_at")
     list_filter = ("is_active", "created_at")
     search_fields = ("name", "description")
-    date_hierarchy = "created_at"
 
 
 @admin.register(LandingPage)
-class LandingPageAdmin(admin.ModelAdmin):
+class LandingPageAdmin(KeysetPaginationMixin, admin.ModelAdmin):
     list_display = ("title", "campaign", "view_count", "conversion_count", "created_at")
     list_filter = ("campaign", "template", "created_at")
+    list_select_related = ("campaign",)
     search_fields = ("title", "slug")
-    date_hierarchy = "created_at"
     prepopulated_fields = {"slug": ("title",)}
+
+    def get_search_results(self, request, queryset, search_term):
+        # El autocompletado no aplica list_select_related y muestra __str__,
+        # que incluye el nombre de la campaña
+        queryset, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        return queryset.select_related("campaign"), may_have_duplicates
+
+
+@admin.register(ExperimentDailyStats)
+class ExperimentDailyStatsAdmin(ReadOnlyAdmin):
+    list_display = ("day", "experiment", "variant", "views", "conversions")
+    list_filter = ("experiment", "variant")
+    date_hierarchy = "day"
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LandingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'landings'
+
+    def ready(self):
+        # Registra los receivers de invalidación de caché e índice de slugs
+        from . import cache, routing  # noqa: F401
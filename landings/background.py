@@ -0,0 +1,105 @@
+"""
+Utilidades para trabajos en segundo plano dentro del proceso del worker
+
+Los hilos no sobreviven a ``fork()``: con ``gunicorn --preload`` la
+aplicación se importa en el master y cada worker nace sin los hilos que
+arrancó el master. Cada ``PeriodicFlusher`` arrancado se vuelve a arrancar
+en el proceso hijo, y el ``fork()`` espera a que ninguno esté a mitad de un
+``flush`` para que el hijo no herede un lock tomado.
+"""
+import atexit
+import logging
+import os
+import threading
+import weakref
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_started = weakref.WeakSet()
+
+
+class PeriodicFlusher:
+    """
+    Hilo daemon que ejecuta ``flush`` cada ``interval`` segundos, o antes si
+    alguien llama a ``wake()`` (por ejemplo cuando un buffer alcanza su tamaño
+    de lote). Al terminar el proceso ejecuta un último ``flush`` para no perder
+    datos acumulados en memoria, salvo con ``flush_on_exit=False``.
+    """
+
+    def __init__(self, flush, interval, name, flush_on_exit=True):
+        self._flush = flush
+        self.interval = interval
+        self.name = name
+        self.flush_on_exit = flush_on_exit
+        self._reset()
+
+    def _reset(self):
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        # Tomado durante cada flush y mientras el proceso hace fork()
+        self._running = threading.Lock()
+        self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        _started.add(self)
+        atexit.register(self.stop)
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=5.0):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._stopped.is_set():
+                self.run_once()
+        if self.flush_on_exit:
+            self.run_once()
+
+    def run_once(self):
+        with self._running:
+            try:
+                self._flush()
+            except Exception:
+                logger.exception("Error en el flush periódico de %s", self.name)
+            finally:
+                # El hilo tiene su propia conexión; se cierra si caducó o falló
+                close_old_connections()
+
+
+def _before_fork():
+    for flusher in list(_started):
+        flusher._running.acquire()
+
+
+def _after_fork_in_parent():
+    for flusher in list(_started):
+        flusher._running.release()
+
+
+def _after_fork_in_child():
+    for flusher in list(_started):
+        if flusher._stopped.is_set():
+            continue
+        flusher._reset()
+        flusher._thread.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(
+        before=_before_fork,
+        after_in_parent=_after_fork_in_parent,
+        after_in_child=_after_fork_in_child,
+    )
@@ -0,0 +1,315 @@
+"""
+Benchmark del embudo de la landing: GET /webinar/ → POST de registro →
+página de gracias.
+
+Cada usuario virtual recorre el embudo ``iterations`` veces con su propio
+cliente (y sus cookies) y un email nuevo en cada vuelta. Se mide la latencia
+de cada paso y cuántos embudos completos por segundo se atienden. La base
+se siembra antes con ``analytics.synthetic``. Drivers:
+
+- ``client-wsgi`` / ``client-asgi``: ``Client`` (un hilo por usuario) o
+  ``AsyncClient`` (una tarea por usuario) dentro del proceso; mide Django y
+  la base de datos sin red.
+- ``wsgi-server``: servidor WSGI real (``wsgiref`` con hilos) en este
+  proceso, por HTTP.
+- ``asgi-server``: uvicorn en este proceso, por HTTP (si está instalado).
+- ``url``: un servidor ya arrancado (gunicorn, uvicorn...), por HTTP.
+
+Los resultados se comparan con una línea base guardada en JSON: hay
+regresión si el p50 o el p95 de algún paso crecen, o los req/s bajan, más
+de ``threshold``.
+"""
+import asyncio
+import http.client
+import json
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from pathlib import Path
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode, urlsplit
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import setup_databases, teardown_databases
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from .counters import get_counters
+from .experiments import get_experiment_stats
+
+MODES = ("client-wsgi", "client-asgi", "wsgi-server", "asgi-server", "url")
+STEPS = ("landing", "register", "thank_you")
+EXPECTED_STATUS = {"landing": 200, "register": 302, "thank_you": 200}
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Base de datos desechable para la corrida, con el motor configurado.
+    Con SQLite va a un archivo temporal (no en memoria) para medir WAL y
+    bloqueos como en producción.
+    """
+    test_settings = connections["default"].settings_dict["TEST"]
+    previous_name = test_settings.get("NAME")
+    with tempfile.TemporaryDirectory() as tmp:
+        if connections["default"].vendor == "sqlite":
+            test_settings["NAME"] = str(Path(tmp) / "benchmark.sqlite3")
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={"default"}, serialized_aliases=set()
+        )
+        try:
+            yield
+        finally:
+            # Lo acumulado en memoria va a esta base, no a la real al salir
+            get_counters().flush()
+            get_experiment_stats().flush()
+            teardown_databases(old_config, verbosity=0)
+            test_settings["NAME"] = previous_name
+
+
+def funnel_paths():
+    return {
+        "landing": reverse("landings:webinar_landing"),
+        "register": reverse("landings:register_webinar_lead"),
+        "thank_you": reverse("landings:webinar_thank_you"),
+    }
+
+
+def registration(run, user, iteration):
+    return {
+        "name": f"Benchmark {user}",
+        "email": f"bench-{run}-{user}-{iteration}@example.invalid",
+    }
+
+
+class HttpUser:
+    """Usuario virtual por HTTP con sus cookies y un token CSRF propio."""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        # Django acepta cualquier secreto válido que coincida en cookie y formulario
+        self.csrf = get_random_string(32)
+        self.cookies = {"csrftoken": self.csrf}
+
+    def request(self, method, path, data=None):
+        headers = {"Cookie": "; ".join(f"{k}={v}" for k, v in self.cookies.items())}
+        body = None
+        if data is not None:
+            body = urlencode({**data, "csrfmiddlewaretoken": self.csrf})
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request(method, self.prefix + path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        finally:
+            conn.close()
+        for header in response.headers.get_all("Set-Cookie") or ():
+            for name, morsel in SimpleCookie(header).items():
+                if morsel["max-age"] == "0" or not morsel.value or morsel.value == '""':
+                    self.cookies.pop(name, None)
+                else:
+                    self.cookies[name] = morsel.value
+        return response.status
+
+    def get(self, path):
+        return self.request("GET", path)
+
+    def post(self, path, data):
+        return self.request("POST", path, data)
+
+
+class ClientUser:
+    def __init__(self):
+        self.client = Client()
+
+    def get(self, path):
+        return self.client.get(path).status_code
+
+    def post(self, path, data):
+        return self.client.post(path, data).status_code
+
+
+def _timed(samples, step, call, *args):
+    start = time.perf_counter()
+    try:
+        status = call(*args)
+    except Exception:
+        status = None
+    samples.append((step, time.perf_counter() - start, status == EXPECTED_STATUS[step]))
+
+
+def run_threads(make_user, users, iterations, run):
+    """Un hilo por usuario virtual. Devuelve ``(muestras, segundos)``."""
+    paths = funnel_paths()
+
+    def worker(n):
+        user, samples = make_user(), []
+        try:
+            for i in range(iterations):
+                _timed(samples, "landing", user.get, paths["landing"])
+                data = registration(run, n, i)
+                _timed(samples, "register", user.post, paths["register"], data)
+                _timed(samples, "thank_you", user.get, paths["thank_you"])
+        finally:
+            connections.close_all()
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        samples = [sample for chunk in pool.map(worker, range(users)) for sample in chunk]
+    return samples, time.perf_counter() - started
+
+
+def run_async_clients(users, iterations, run):
+    """Una tarea de ``AsyncClient`` por usuario virtual en un event loop."""
+    paths = funnel_paths()
+
+    async def timed(samples, step, request):
+        start = time.perf_counter()
+        try:
+            status = (await request).status_code
+        except Exception:
+            status = None
+        samples.append((step, time.perf_counter() - start, status == EXPECTED_STATUS[step]))
+
+    async def user(n):
+        client, samples = AsyncClient(), []
+        for i in range(iterations):
+            await timed(samples, "landing", client.get(paths["landing"]))
+            data = registration(run, n, i)
+            await timed(samples, "register", client.post(paths["register"], data))
+            await timed(samples, "thank_you", client.get(paths["thank_you"]))
+        return samples
+
+    async def main():
+        started = time.perf_counter()
+        chunks = await asyncio.gather(*(user(n) for n in range(users)))
+        return [sample for chunk in chunks for sample in chunk], time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def wsgi_server():
+    """Servidor WSGI con hilos en un puerto libre de localhost; da su URL."""
+    server = make_server(
+        "127.0.0.1", 0, get_wsgi_application(),
+        server_class=_ThreadingWSGIServer, handler_class=_QuietHandler,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def asgi_server():
+    """uvicorn en un hilo de este proceso; da su URL."""
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    config = uvicorn.Config(get_asgi_application(), lifespan="off", log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started and thread.is_alive():
+        time.sleep(0.01)
+    if not server.started:
+        raise RuntimeError("uvicorn no pudo arrancar")
+    try:
+        yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def percentiles(values):
+    """``(p50, p95, p99)`` en milisegundos."""
+    if not values:
+        return None, None, None
+    if len(values) == 1:
+        return (values[0] * 1000,) * 3
+    quantiles = statistics.quantiles(values, n=100, method="inclusive")
+    return quantiles[49] * 1000, quantiles[94] * 1000, quantiles[98] * 1000
+
+
+def summarize(samples, elapsed):
+    steps = {}
+    for step in STEPS:
+        latencies = [latency for name, latency, ok in samples if name == step and ok]
+        errors = sum(1 for name, _, ok in samples if name == step and not ok)
+        p50, p95, p99 = percentiles(latencies)
+        steps[step] = {
+            "requests": len(latencies) + errors,
+            "errors": errors,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+        }
+    return {
+        "requests": len(samples),
+        "errors": sum(step["errors"] for step in steps.values()),
+        "seconds": elapsed,
+        "rps": len(samples) / elapsed if elapsed else 0.0,
+        "funnels_per_second": len(samples) / len(STEPS) / elapsed if elapsed else 0.0,
+        "steps": steps,
+    }
+
+
+def load_baselines(path):
+    try:
+        return json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, scenario, result):
+    path = Path(path)
+    baselines = load_baselines(path)
+    baselines[scenario] = {**result, "recorded_at": timezone.now().isoformat()}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+
+
+def regressions(result, baseline, threshold):
+    """Mensajes con lo que empeoró más de ``threshold`` respecto a ``baseline``."""
+    found = []
+    if result["rps"] < baseline["rps"] * (1 - threshold):
+        found.append(f"req/s: {result['rps']:.1f} < {baseline['rps']:.1f}")
+    for step, base in baseline["steps"].items():
+        current = result["steps"].get(step)
+        if current is None:
+            continue
+        for stat in ("p50", "p95"):
+            if base[stat] and current[stat] and current[stat] > base[stat] * (1 + threshold):
+                found.append(f"{step} {stat}: {current[stat]:.2f} ms > {base[stat]:.2f} ms")
+    if result["errors"] > baseline.get("errors", 0):
+        found.append(f"errores: {result['errors']} > {baseline.get('errors', 0)}")
+    return found
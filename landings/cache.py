@@ -0,0 +1,189 @@
+"""
+Caché de página completa para las landings y páginas legales.
+
+La clave combina la ruta con el estado de consentimiento que calcula
+``CookieConsentMiddleware`` y las variantes de experimento del visitante,
+de modo que cada combinación tiene su propia copia. Las respuestas cacheadas llevan ``ETag`` y
+``Last-Modified`` para que el navegador pueda revalidar con un 304.
+
+Las peticiones con mensajes flash pendientes (por ejemplo, la página de
+gracias tras registrarse) siempre se renderizan en vivo. Guardar o borrar
+una ``Campaign`` o ``LandingPage`` invalida todas las entradas incrementando
+un número de generación que forma parte de la clave.
+
+La generación vive en ``LANDING_PAGE_CACHE["GENERATION_CACHE"]``, la caché
+compartida cuando hay ``REDIS_URL``: el admin la incrementa y todos los
+workers la leen. Con ``LocMemCache`` cada proceso tiene su propia generación
+y ``invalidate`` solo afecta al proceso que la llama; los demás sirven la
+copia vieja hasta que caduca (``TIMEOUT``).
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from monitoring.metrics import CACHE_REQUESTS
+
+from .consent import CONSENT_STATES, encode_consent
+from .experiments import variant_key
+from .models import Campaign, LandingPage
+
+GENERATION_KEY = "landings:page-cache:generation"
+
+
+def _cache():
+    return caches[settings.LANDING_PAGE_CACHE["CACHE"]]
+
+
+def _generation_cache():
+    return caches[settings.LANDING_PAGE_CACHE["GENERATION_CACHE"]]
+
+
+def consent_key(request):
+    return encode_consent(getattr(request, "cookie_consent", None) or {})
+
+
+def page_variant(request):
+    """Consentimiento más variantes de experimento, p. ej. ``"000.b2"``."""
+    key = consent_key(request)
+    if suffix := variant_key(request):
+        return f"{key}.{suffix}"
+    return key
+
+
+def consent_variants():
+    """Todas las combinaciones posibles de ``request.cookie_consent``."""
+    return CONSENT_STATES.values()
+
+
+def generation():
+    return _generation_cache().get_or_set(GENERATION_KEY, 1, timeout=None)
+
+
+def invalidate():
+    """Descarta todas las páginas cacheadas."""
+    generations = _generation_cache()
+    try:
+        generations.incr(GENERATION_KEY)
+    except ValueError:
+        generations.set(GENERATION_KEY, 2, timeout=None)
+
+
+def page_cache_key(request):
+    return f"landings:page:{generation()}:{page_variant(request)}:{request.path}"
+
+
+async def aload_session(request):
+    """
+    Carga la sesión con el ORM asíncrono. Después de esto las lecturas
+    síncronas de la sesión (mensajes, plantillas) usan la copia en memoria y
+    no consultan la base de datos desde el event loop.
+    """
+    session = getattr(request, "session", None)
+    if session is not None:
+        await session.aitems()
+
+
+def is_dynamic(request):
+    """Peticiones que no pueden servirse desde la caché."""
+    if request.method not in ("GET", "HEAD"):
+        return True
+    return len(get_messages(request)) > 0
+
+
+def _is_cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+    )
+
+
+def _conditional_or_full(request, entry):
+    response = get_conditional_response(
+        request, etag=entry["etag"], last_modified=entry["last_modified"]
+    )
+    if response is None:
+        response = HttpResponse(entry["content"], content_type=entry["content_type"])
+    _set_validators(response, entry)
+    return response
+
+
+def _set_validators(response, entry):
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    patch_vary_headers(response, ("Cookie",))
+
+
+def _cached_response(request):
+    """Respuesta desde la caché, o ``None`` si hay que ejecutar la vista."""
+    if not settings.LANDING_PAGE_CACHE["ENABLED"] or is_dynamic(request):
+        return None
+    entry = _cache().get(page_cache_key(request))
+    if entry is None:
+        CACHE_REQUESTS.inc("landing_page", "miss")
+        return None
+    CACHE_REQUESTS.inc("landing_page", "hit")
+    return _conditional_or_full(request, entry)
+
+
+def _store_response(request, response):
+    config = settings.LANDING_PAGE_CACHE
+    if not config["ENABLED"] or is_dynamic(request) or not _is_cacheable(request, response):
+        return response
+
+    content = response.content
+    entry = {
+        "content": content,
+        "content_type": response["Content-Type"],
+        "etag": f'"{hashlib.md5(content, usedforsecurity=False).hexdigest()}"',
+        "last_modified": int(time.time()),
+    }
+    _cache().set(page_cache_key(request), entry, config["TIMEOUT"])
+    _set_validators(response, entry)
+    return response
+
+
+def cache_landing_page(view_func):
+    """
+    Decorador de vista que guarda la respuesta completa en la caché de
+    ``LANDING_PAGE_CACHE`` y atiende revalidaciones con 304.
+    """
+    if iscoroutinefunction(view_func):
+
+        async def _view_wrapper(request, *args, **kwargs):
+            await aload_session(request)
+            response = _cached_response(request)
+            if response is None:
+                response = _store_response(
+                    request, await view_func(request, *args, **kwargs)
+                )
+            return response
+
+    else:
+
+        def _view_wrapper(request, *args, **kwargs):
+            response = _cached_response(request)
+            if response is None:
+                response = _store_response(request, view_func(request, *args, **kwargs))
+            return response
+
+    return wraps(view_func)(_view_wrapper)
+
+
+@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=Campaign)
+@receiver(post_save, sender=LandingPage)
+@receiver(post_delete, sender=LandingPage)
+def _invalidate_on_change(**kwargs):
+    invalidate()
@@ -0,0 +1,147 @@
+"""
+Estado de consentimiento de cookies y anonimización de la petición.
+
+El consentimiento viaja en una sola cookie firmada (``CONSENT_COOKIE``) con
+tres dígitos, uno por bandera de ``CONSENT_FLAGS``: ``"101:<firma>"``. Leerla
+no toca la sesión, así que un visitante nuevo no provoca ninguna consulta.
+``has_consent`` significa que el visitante ya eligió en el banner (también
+si solo aceptó las esenciales); la IP y el user agent se anonimizan mientras
+no acepte analítica ni marketing (``allows_tracking``).
+
+Las cookies sin firmar de antes (``LEGACY_COOKIES``) se leen una sola vez:
+el middleware las convierte en la cookie firmada y las borra.
+
+Las funciones de esta ruta rápida no reservan memoria por petición en el
+caso habitual: los ocho estados posibles son mapas inmutables compartidos y
+la verificación de la firma, la anonimización de IP y la del user agent se
+memorizan con ``lru_cache`` por valor de entrada.
+
+``client_key`` es una huella con clave (``SECRET_KEY``) de la IP completa:
+sirve para los límites de frecuencia en memoria sin conservar la dirección.
+"""
+import hashlib
+import ipaddress
+import itertools
+from functools import lru_cache
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core import signing
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+CONSENT_FLAGS = ("has_consent", "analytics", "marketing")
+CONSENT_SALT = "landings.consent"
+
+# Un mapa de solo lectura por combinación, indexado por su código ("101")
+CONSENT_STATES = {
+    "".join(digits): MappingProxyType(
+        {flag: digit == "1" for flag, digit in zip(CONSENT_FLAGS, digits)}
+    )
+    for digits in itertools.product("01", repeat=len(CONSENT_FLAGS))
+}
+NO_CONSENT = CONSENT_STATES["000"]
+
+# Cookies sin firmar del banner anterior: elección general, analítica, marketing
+LEGACY_COOKIES = ("cookie-consent", "analytics-consent", "marketing-consent")
+
+# Prefijos que se conservan al anonimizar sin consentimiento
+IPV4_PREFIX = 16
+IPV6_PREFIX = 48
+
+
+def encode_consent(consent):
+    """Codifica un estado de consentimiento como ``"101"``, ``"000"``, etc."""
+    return "".join("1" if consent.get(flag) else "0" for flag in CONSENT_FLAGS)
+
+
+def _signer():
+    return signing.Signer(salt=CONSENT_SALT)
+
+
+def sign_consent(**flags):
+    """Valor de la cookie para las banderas dadas (las omitidas van a ``False``)."""
+    return _signer().sign(encode_consent(flags))
+
+
+@lru_cache(maxsize=256)
+def decode_consent(value):
+    """Estado de una cookie de consentimiento; ``NO_CONSENT`` si no es válida."""
+    if not value:
+        return NO_CONSENT
+    try:
+        return CONSENT_STATES.get(_signer().unsign(value), NO_CONSENT)
+    except signing.BadSignature:
+        return NO_CONSENT
+
+
+def allows_tracking(consent):
+    """Si el visitante aceptó analítica o marketing: sin eso se anonimiza."""
+    return consent["analytics"] or consent["marketing"]
+
+
+def legacy_consent(cookies):
+    """
+    Estado de las cookies sin firmar del banner anterior, o ``None`` si el
+    visitante no llegó a aceptarlo.
+    """
+    if cookies.get(LEGACY_COOKIES[0]) != "accepted":
+        return None
+    return CONSENT_STATES[
+        "1" + "".join("1" if cookies.get(name) == "true" else "0" for name in LEGACY_COOKIES[1:])
+    ]
+
+
+@receiver(setting_changed)
+def _reset_decoded_consent(setting, **kwargs):
+    if setting in ("SECRET_KEY", "SECRET_KEY_FALLBACKS"):
+        decode_consent.cache_clear()
+        client_key.cache_clear()
+
+
+def set_consent_cookie(response, **flags):
+    config = settings.CONSENT_COOKIE
+    response.set_cookie(
+        config["NAME"],
+        sign_consent(**flags),
+        max_age=config["MAX_AGE"],
+        secure=config["SECURE"],
+        httponly=True,
+        samesite="Lax",
+    )
+    return response
+
+
+@lru_cache(maxsize=4096)
+def anonymize_ip(address):
+    """
+    Trunca una IPv4 a /16 y una IPv6 a /48. Las IPv4 mapeadas en IPv6 se
+    tratan como IPv4 y lo que no es una IP se descarta.
+    """
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return ""
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    host_bits = ip.max_prefixlen - (IPV4_PREFIX if ip.version == 4 else IPV6_PREFIX)
+    return str(type(ip)(int(ip) >> host_bits << host_bits))
+
+
+@lru_cache(maxsize=4096)
+def client_key(address):
+    """Huella de 16 caracteres de ``address``; no se puede revertir sin la clave."""
+    key = hashlib.sha256(settings.SECRET_KEY.encode()).digest()
+    return hashlib.blake2b(address.encode(), key=key, digest_size=8).hexdigest()
+
+
+@lru_cache(maxsize=512)
+def anonymize_user_agent(user_agent):
+    """Solo la familia del navegador (el orden importa: Chrome anuncia Safari)."""
+    if "Chrome" in user_agent:
+        return "Chrome (Anonimizado)"
+    if "Firefox" in user_agent:
+        return "Firefox (Anonimizado)"
+    if "Safari" in user_agent:
+        return "Safari (Anonimizado)"
+    return "Browser (Anonimizado)"
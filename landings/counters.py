@@ -0,0 +1,154 @@
+"""
+Contadores de vistas y conversiones de ``LandingPage`` sin escrituras en el
+camino caliente.
+
+Cada hilo acumula incrementos en su propio shard en memoria; un hilo de
+fondo suma los shards periódicamente y aplica los deltas con una sola
+sentencia ``UPDATE ... SET view_count = view_count + n`` por slug. Como el
+incremento lo resuelve la base de datos con ``F()``, varios procesos pueden
+vaciar sus deltas sobre la misma fila sin perder conteos.
+"""
+import logging
+import threading
+from collections import Counter
+from functools import cache, wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import receiver
+
+from .background import PeriodicFlusher
+from .models import LandingPage
+
+logger = logging.getLogger(__name__)
+
+
+class _Shard:
+    __slots__ = ("lock", "views", "conversions")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = Counter()
+        self.conversions = Counter()
+
+
+class LandingCounters:
+    """
+    Acumuladores por slug, uno por hilo, que se vacían con ``flush()``.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._flusher = None
+
+    def start(self, interval):
+        if self._flusher is None:
+            self._flusher = PeriodicFlusher(self.flush, interval, "landing-counters")
+            self._flusher.start()
+
+    def record_view(self, slug, count=1):
+        shard = self._shard()
+        with shard.lock:
+            shard.views[slug] += count
+
+    def record_conversion(self, slug, count=1):
+        shard = self._shard()
+        with shard.lock:
+            shard.conversions[slug] += count
+
+    def pending(self):
+        """Deltas aún no escritos, como ``(vistas, conversiones)``."""
+        views, conversions = Counter(), Counter()
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            with shard.lock:
+                views.update(shard.views)
+                conversions.update(shard.conversions)
+        return views, conversions
+
+    def flush(self):
+        """Aplica los deltas acumulados. Devuelve cuántos slugs se actualizaron."""
+        views, conversions = Counter(), Counter()
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            with shard.lock:
+                views.update(shard.views)
+                conversions.update(shard.conversions)
+                shard.views.clear()
+                shard.conversions.clear()
+
+        slugs = sorted(views.keys() | conversions.keys())
+        try:
+            with transaction.atomic():
+                for slug in slugs:
+                    LandingPage.objects.filter(slug=slug).update(
+                        view_count=F("view_count") + views[slug],
+                        conversion_count=F("conversion_count") + conversions[slug],
+                    )
+        except Exception:
+            # Devolver los deltas al shard actual para reintentarlos luego
+            shard = self._shard()
+            with shard.lock:
+                shard.views.update(views)
+                shard.conversions.update(conversions)
+            raise
+        return len(slugs)
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+
+@cache
+def get_counters():
+    """Contadores compartidos por el proceso, con su hilo de flush iniciado."""
+    counters = LandingCounters()
+    interval = settings.LANDING_COUNTERS["FLUSH_INTERVAL"]
+    if interval:
+        counters.start(interval)
+    return counters
+
+
+@receiver(setting_changed)
+def _reset_counters(setting, **kwargs):
+    if setting == "LANDING_COUNTERS":
+        get_counters.cache_clear()
+
+
+def counts_views(slug=None):
+    """
+    Decorador que registra una vista por cada respuesta exitosa. El slug se
+    toma del argumento ``slug`` de la URL o, si no existe, del indicado aquí.
+    """
+
+    def decorator(view_func):
+        def record(response, kwargs):
+            if response.status_code in (200, 304):
+                get_counters().record_view(kwargs.get("slug", slug))
+            return response
+
+        if iscoroutinefunction(view_func):
+
+            async def _view_wrapper(request, *args, **kwargs):
+                response = await view_func(request, *args, **kwargs)
+                return record(response, kwargs)
+
+        else:
+
+            def _view_wrapper(request, *args, **kwargs):
+                return record(view_func(request, *args, **kwargs), kwargs)
+
+        return wraps(view_func)(_view_wrapper)
+
+    return decorator
@@ -0,0 +1,296 @@
+"""
+Experimentos A/B sin consultas en el camino caliente.
+
+Cada visitante recibe un ID de primera parte aleatorio y su variante en
+cada experimento se calcula con un hash de ``experimento:ID`` sobre los
+pesos de ``EXPERIMENTS["TESTS"]``: siempre da la misma variante, en
+cualquier worker, sin guardar ni leer nada.
+
+El ID solo se guarda en la cookie ``VISITOR_COOKIE`` si el visitante aceptó
+la analítica. Antes de eso cada petición usa un ID nuevo que no sale del
+servidor: el banner se sortea en cada página, la página envía la variante
+que mostró junto con la elección y los experimentos de landing sirven la
+plantilla de siempre. Una cookie de antes del consentimiento se borra.
+
+Experimentos que entiende el sitio:
+
+- ``cookie_banner``: variante del banner de cookies que ven los visitantes
+  sin consentimiento. Los fragmentos HTML se renderizan una vez por proceso
+  y la plantilla solo los inserta.
+- ``landing:<slug>``: plantilla de la landing ``<slug>`` (las variantes son
+  nombres de plantilla dentro de ``landings/``).
+
+Calcular la variante no cuenta nada: el context processor del banner corre
+en cualquier plantilla con ``RequestContext`` (también el admin y las
+páginas de error). Las vistas del banner se cuentan con ``counts_banner_view``
+en las vistas de landing, incluso cuando la respuesta sale de la caché.
+
+La variante forma parte de la clave de la caché de página y de las páginas
+pre-renderizadas, así que cada variante se sirve desde su propia copia.
+Las vistas y conversiones por variante se acumulan en memoria y un hilo de
+fondo las suma a ``ExperimentDailyStats`` cada ``FLUSH_INTERVAL`` segundos.
+"""
+import hashlib
+import re
+import secrets
+import threading
+from collections import Counter
+from functools import cache, wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .background import PeriodicFlusher
+from .middleware import PrivacyMiddleware
+from .models import ExperimentDailyStats
+
+BANNER_EXPERIMENT = "cookie_banner"
+VISITOR_ID_RE = re.compile(r"[A-Za-z0-9_-]{16}")
+
+
+def new_visitor_id():
+    return secrets.token_urlsafe(12)
+
+
+def bucket(experiment, visitor_id, weights):
+    """Variante de ``weights`` (``{variante: peso}``) que toca a ``visitor_id``."""
+    digest = hashlib.blake2b(f"{experiment}:{visitor_id}".encode(), digest_size=8).digest()
+    point = int.from_bytes(digest, "big") / 2**64 * sum(weights.values())
+    for variant, weight in weights.items():
+        point -= weight
+        if point < 0:
+            return variant
+    return variant
+
+
+class ExperimentStats:
+    """
+    Vistas y conversiones pendientes por ``(experimento, variante, día)``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = Counter()
+        self._conversions = Counter()
+        self._flusher = None
+
+    def start(self, interval):
+        if self._flusher is None:
+            self._flusher = PeriodicFlusher(self.flush, interval, "experiment-stats")
+            self._flusher.start()
+
+    def record(self, experiment, variant, views=0, conversions=0):
+        key = (experiment, variant, timezone.localdate())
+        with self._lock:
+            if views:
+                self._views[key] += views
+            if conversions:
+                self._conversions[key] += conversions
+
+    def flush(self):
+        """Suma los deltas a la base de datos. Devuelve cuántas filas tocó."""
+        with self._lock:
+            views, conversions = self._views, self._conversions
+            self._views, self._conversions = Counter(), Counter()
+        keys = sorted(views.keys() | conversions.keys())
+        if not keys:
+            return 0
+        try:
+            with transaction.atomic():
+                ExperimentDailyStats.objects.bulk_create(
+                    [
+                        ExperimentDailyStats(experiment=experiment, variant=variant, day=day)
+                        for experiment, variant, day in keys
+                    ],
+                    ignore_conflicts=True,
+                )
+                for experiment, variant, day in keys:
+                    ExperimentDailyStats.objects.filter(
+                        experiment=experiment, variant=variant, day=day
+                    ).update(
+                        views=F("views") + views[experiment, variant, day],
+                        conversions=F("conversions") + conversions[experiment, variant, day],
+                    )
+        except Exception:
+            with self._lock:
+                self._views.update(views)
+                self._conversions.update(conversions)
+            raise
+        return len(keys)
+
+
+@cache
+def get_experiment_stats():
+    """Acumulador compartido por el proceso, con su hilo de flush iniciado."""
+    stats = ExperimentStats()
+    interval = settings.EXPERIMENTS["FLUSH_INTERVAL"]
+    if interval:
+        stats.start(interval)
+    return stats
+
+
+@cache
+def banner_fragments():
+    """HTML de cada variante del banner, renderizado una vez por proceso."""
+    variants = settings.EXPERIMENTS["TESTS"].get(BANNER_EXPERIMENT, {})
+    return {
+        variant: mark_safe(render_to_string(f"landings/cookie_banner/variant_{variant}.html"))
+        for variant in variants
+    }
+
+
+@receiver(setting_changed)
+def _reset_experiments(setting, **kwargs):
+    if setting == "EXPERIMENTS":
+        get_experiment_stats.cache_clear()
+        banner_fragments.cache_clear()
+
+
+class VisitorExperiments:
+    """Variantes de un visitante, calculadas al pedirlas y una vez por petición."""
+
+    def __init__(self, visitor_id, forced=None, persistent=True):
+        self.visitor_id = visitor_id
+        # False si el ID es solo de esta petición (sin consentimiento)
+        self.persistent = persistent
+        self._variants = dict(forced or {})
+        self._viewed = set(self._variants)
+
+    def assign(self, experiment):
+        """Variante de ``experiment``, o ``None`` si no está configurado."""
+        if experiment not in self._variants:
+            weights = settings.EXPERIMENTS["TESTS"].get(experiment)
+            self._variants[experiment] = (
+                bucket(experiment, self.visitor_id, weights)
+                if weights and self.visitor_id
+                else None
+            )
+        return self._variants[experiment]
+
+    def variant(self, experiment):
+        """Como ``assign``, pero cuenta una vista la primera vez por petición."""
+        variant = self.assign(experiment)
+        if variant is not None and experiment not in self._viewed:
+            self._viewed.add(experiment)
+            get_experiment_stats().record(experiment, variant, views=1)
+        return variant
+
+    def convert(self, experiment, shown=None):
+        """
+        Cuenta una conversión para la variante de ``experiment``: ``shown``
+        si es una variante válida (la que mostró la página), o la del ID.
+        """
+        variant = shown
+        if variant not in settings.EXPERIMENTS["TESTS"].get(experiment, {}):
+            variant = self.assign(experiment) if self.persistent else None
+        if variant is not None:
+            get_experiment_stats().record(experiment, variant, conversions=1)
+
+
+def _experiments(request):
+    return getattr(request, "experiments", None) or VisitorExperiments(None)
+
+
+def banner_variant(request):
+    """Variante del banner para ``request``; ``None`` si ya dio su consentimiento."""
+    consent = getattr(request, "cookie_consent", None) or {}
+    if consent.get("has_consent"):
+        return None
+    return _experiments(request).assign(BANNER_EXPERIMENT)
+
+
+def counts_banner_view(view_func):
+    """
+    Decorador que cuenta una vista del banner por cada respuesta exitosa a
+    un visitante sin consentimiento.
+    """
+
+    def record(request, response):
+        if response.status_code in (200, 304) and banner_variant(request) is not None:
+            _experiments(request).variant(BANNER_EXPERIMENT)
+        return response
+
+    if iscoroutinefunction(view_func):
+
+        async def _view_wrapper(request, *args, **kwargs):
+            return record(request, await view_func(request, *args, **kwargs))
+
+    else:
+
+        def _view_wrapper(request, *args, **kwargs):
+            return record(request, view_func(request, *args, **kwargs))
+
+    return wraps(view_func)(_view_wrapper)
+
+
+def landing_variant(request, slug):
+    """Plantilla de la landing; ``None`` sin un ID que dure entre visitas."""
+    experiments = _experiments(request)
+    if not experiments.persistent:
+        return None
+    return experiments.variant(f"landing:{slug}")
+
+
+def convert(request, experiment, shown=None):
+    _experiments(request).convert(experiment, shown)
+
+
+def variant_key(request):
+    """Sufijo de la clave de caché con las variantes que cambian el HTML."""
+    parts = []
+    if (banner := banner_variant(request)) is not None:
+        parts.append(f"b{banner}")
+    match = getattr(request, "resolver_match", None)
+    if match is not None and "slug" in match.kwargs:
+        if (template := landing_variant(request, match.kwargs["slug"])) is not None:
+            parts.append(f"l{template}")
+    return "-".join(parts)
+
+
+def cookie_banner(request):
+    """Context processor: el fragmento del banner que toca, o vacío."""
+    variant = banner_variant(request)
+    return {"cookie_banner": banner_fragments().get(variant, "")}
+
+
+class ExperimentMiddleware(PrivacyMiddleware):
+    """
+    Asigna el ID de visitante y expone ``request.experiments``. Va después
+    de ``CookieConsentMiddleware``: sin consentimiento de analítica el ID es
+    de la petición y no se envía ninguna cookie.
+    """
+
+    def process_request(self, request):
+        consent = getattr(request, "cookie_consent", None) or {}
+        persistent = bool(consent.get("analytics"))
+        visitor_id = request.COOKIES.get(settings.EXPERIMENTS["VISITOR_COOKIE"], "")
+        valid = bool(VISITOR_ID_RE.fullmatch(visitor_id))
+        request.new_visitor = persistent and not valid
+        if not (persistent and valid):
+            visitor_id = new_visitor_id()
+        request.experiments = VisitorExperiments(visitor_id, persistent=persistent)
+
+    def process_response(self, request, response):
+        experiments = getattr(request, "experiments", None)
+        if experiments is None:
+            return response
+        config = settings.EXPERIMENTS
+        if request.new_visitor:
+            response.set_cookie(
+                config["VISITOR_COOKIE"],
+                experiments.visitor_id,
+                max_age=config["VISITOR_COOKIE_MAX_AGE"],
+                secure=settings.CONSENT_COOKIE["SECURE"],
+                httponly=True,
+                samesite="Lax",
+            )
+        elif not experiments.persistent and config["VISITOR_COOKIE"] in request.COOKIES:
+            response.delete_cookie(config["VISITOR_COOKIE"], samesite="Lax")
+        return response
@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from landings.consent import (
+    anonymize_ip,
+    anonymize_user_agent,
+    decode_consent,
+    sign_consent,
+)
+from landings.middleware import CookieConsentMiddleware
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide en microsegundos el costo por petición de CookieConsentMiddleware "
+        "con distintos estados de consentimiento"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20000)
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Vacía las cachés antes de cada petición (peor caso: firma y parseo de IP)",
+        )
+
+    def scenarios(self):
+        name = settings.CONSENT_COOKIE["NAME"]
+        accepted = sign_consent(has_consent=True, analytics=True, marketing=True)
+        return {
+            "sin cookie, ipv4": {"REMOTE_ADDR": "203.0.113.7"},
+            "sin cookie, ipv6": {"REMOTE_ADDR": "2001:db8:abcd:12::7"},
+            "cookie firmada": {"REMOTE_ADDR": "203.0.113.7", "HTTP_COOKIE": f"{name}={accepted}"},
+            "cookie inválida": {"REMOTE_ADDR": "203.0.113.7", "HTTP_COOKIE": f"{name}=111:x"},
+        }
+
+    def handle(self, *args, iterations, cold, **options):
+        middleware = CookieConsentMiddleware(lambda request: HttpResponse())
+        factory = RequestFactory()
+        caches = (decode_consent, anonymize_ip, anonymize_user_agent)
+        self.stdout.write(f"{'escenario':<20} {'media µs':>9} {'p50 µs':>8} {'p99 µs':>8}")
+        for label, meta in self.scenarios().items():
+            # Peticiones nuevas para cada vuelta: el middleware reescribe META
+            requests = [
+                factory.get("/webinar/", HTTP_USER_AGENT=USER_AGENT, **meta)
+                for _ in range(iterations)
+            ]
+            for request in requests:
+                request.COOKIES  # parseo de la cookie fuera de la medición
+            timings = []
+            for request in requests:
+                if cold:
+                    for cached in caches:
+                        cached.cache_clear()
+                start = time.perf_counter_ns()
+                middleware.process_request(request)
+                timings.append(time.perf_counter_ns() - start)
+            quantiles = statistics.quantiles(timings, n=100)
+            self.stdout.write(
+                f"{label:<20} {statistics.fmean(timings) / 1000:>9.2f} "
+                f"{quantiles[49] / 1000:>8.2f} {quantiles[98] / 1000:>8.2f}"
+            )
@@ -0,0 +1,136 @@
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.utils.crypto import get_random_string
+
+from analytics.synthetic import generate
+from landings.benchmark import (
+    MODES,
+    ClientUser,
+    HttpUser,
+    asgi_server,
+    benchmark_database,
+    load_baselines,
+    regressions,
+    run_async_clients,
+    run_threads,
+    save_baseline,
+    summarize,
+    wsgi_server,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide p50/p95/p99 y req/s del embudo webinar → registro → gracias con "
+        "usuarios concurrentes y falla si empeora respecto a la línea base"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mode", choices=MODES, default="client-wsgi")
+        parser.add_argument("--url", help="Servidor a medir con --mode url")
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--iterations", type=int, default=20, help="Embudos por usuario")
+        parser.add_argument("--campaigns", type=int, default=5)
+        parser.add_argument("--landings", type=int, default=4, help="Landings por campaña")
+        parser.add_argument("--leads", type=int, default=10000, help="Leads previos sembrados")
+        parser.add_argument("--seed", type=int, default=0, help="Semilla de los datos sintéticos")
+        parser.add_argument(
+            "--scenario", help="Nombre de la línea base (por defecto, a partir de los parámetros)"
+        )
+        parser.add_argument("--baseline", default=settings.BENCHMARKS["BASELINE_FILE"])
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=settings.BENCHMARKS["THRESHOLD"],
+            help="Empeoramiento tolerado, en fracción (0.2 = 20%%)",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Guarda el resultado como nueva línea base en lugar de comparar",
+        )
+
+    def handle(self, *args, mode, url, users, iterations, **options):
+        if mode == "url" and not url:
+            raise CommandError("--mode url necesita --url")
+        if mode == "asgi-server" and find_spec("uvicorn") is None:
+            raise CommandError("--mode asgi-server necesita uvicorn instalado")
+        scenario = options["scenario"] or (
+            f"{mode}-u{users}-i{iterations}-c{options['campaigns']}"
+            f"-l{options['landings']}-n{options['leads']}"
+        )
+        run = get_random_string(8).lower()
+
+        if mode == "url":
+            # El servidor externo usa su propia base y su propia configuración
+            samples, elapsed = run_threads(lambda: HttpUser(url), users, iterations, run)
+        else:
+            with self.isolated(), benchmark_database():
+                seeded = generate(
+                    options["campaigns"], options["landings"], options["leads"],
+                    seed=options["seed"],
+                )
+                self.stdout.write(
+                    f"Sembrado: {seeded['campaigns']} campañas, "
+                    f"{seeded['landings']} landings, {seeded['leads']} leads"
+                )
+                samples, elapsed = self.drive(mode, users, iterations, run)
+
+        result = summarize(samples, elapsed)
+        self.report(scenario, result)
+
+        if options["save_baseline"]:
+            save_baseline(options["baseline"], scenario, result)
+            self.stdout.write(self.style.SUCCESS(f"Línea base guardada en {options['baseline']}"))
+            return
+        baseline = load_baselines(options["baseline"]).get(scenario)
+        if baseline is None:
+            self.stdout.write(f"Sin línea base para {scenario}; usa --save-baseline")
+            return
+        found = regressions(result, baseline, options["threshold"])
+        if found:
+            raise CommandError(
+                f"Regresión de más del {options['threshold']:.0%} en {scenario}:\n  "
+                + "\n  ".join(found)
+            )
+        self.stdout.write(self.style.SUCCESS("Sin regresiones respecto a la línea base"))
+
+    def isolated(self):
+        # Sin límite por IP (todo llega desde 127.0.0.1), sin avisar al CRM y
+        # sin hilos de flush que sigan escribiendo cuando la base ya no existe
+        return override_settings(
+            REGISTRATION_GUARD={**settings.REGISTRATION_GUARD, "RATE_LIMIT": False},
+            LEAD_OUTBOX={**settings.LEAD_OUTBOX, "DESTINATIONS": {}},
+            LANDING_COUNTERS={**settings.LANDING_COUNTERS, "FLUSH_INTERVAL": None},
+            EXPERIMENTS={**settings.EXPERIMENTS, "FLUSH_INTERVAL": None},
+        )
+
+    def drive(self, mode, users, iterations, run):
+        if mode == "client-wsgi":
+            return run_threads(ClientUser, users, iterations, run)
+        if mode == "client-asgi":
+            return run_async_clients(users, iterations, run)
+        server = asgi_server() if mode == "asgi-server" else wsgi_server()
+        with server as url:
+            return run_threads(lambda: HttpUser(url), users, iterations, run)
+
+    def report(self, scenario, result):
+        self.stdout.write(
+            f"{scenario}: {result['requests']} peticiones en {result['seconds']:.2f}s, "
+            f"{result['rps']:.1f} req/s, {result['funnels_per_second']:.1f} embudos/s"
+        )
+        self.stdout.write(
+            f"{'paso':<10} {'peticiones':>10} {'errores':>8} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        )
+        for step, stats in result["steps"].items():
+            p50, p95, p99 = (
+                "—" if stats[q] is None else f"{stats[q]:.2f}" for q in ("p50", "p95", "p99")
+            )
+            self.stdout.write(
+                f"{step:<10} {stats['requests']:>10} {stats['errors']:>8} "
+                f"{p50:>9} {p95:>9} {p99:>9}"
+            )
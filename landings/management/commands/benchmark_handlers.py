@@ -0,0 +1,80 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+
+
+def summarize(latencies, elapsed):
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": quantiles[49] * 1000,
+        "p95": quantiles[94] * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara req/s de las vistas de landing a través del handler WSGI "
+        "(hilos) y del handler ASGI (event loop), dentro del mismo proceso"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Ruta a medir; se puede repetir (por defecto /webinar/ y /privacy-policy/)",
+        )
+
+    def handle(self, *args, requests, concurrency, paths, **options):
+        paths = paths or ["/webinar/", "/privacy-policy/"]
+        self.stdout.write(
+            f"{'handler':<8} {'ruta':<28} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9}"
+        )
+        for path in paths:
+            for handler, run in (("wsgi", self.run_wsgi), ("asgi", self.run_asgi)):
+                result = run(path, requests, concurrency)
+                self.stdout.write(
+                    f"{handler:<8} {path:<28} {result['rps']:>10.1f} "
+                    f"{result['p50']:>9.2f} {result['p95']:>9.2f}"
+                )
+
+    def run_wsgi(self, path, requests, concurrency):
+        local = threading.local()
+
+        def hit(_):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = Client()
+            start = time.perf_counter()
+            client.get(path)
+            return time.perf_counter() - start
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(hit, range(requests)))
+        return summarize(latencies, time.perf_counter() - started)
+
+    def run_asgi(self, path, requests, concurrency):
+        async def main():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def hit():
+                async with semaphore:
+                    start = time.perf_counter()
+                    await client.get(path)
+                    return time.perf_counter() - start
+
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*(hit() for _ in range(requests)))
+            return summarize(latencies, time.perf_counter() - started)
+
+        return asyncio.run(main())
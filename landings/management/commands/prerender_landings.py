@@ -0,0 +1,62 @@
+from importlib import import_module
+from inspect import unwrap
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from landings.cache import consent_variants, page_variant
+from landings.experiments import BANNER_EXPERIMENT, VisitorExperiments
+from landings.prerender import PRERENDERED_PAGES, brotli, write_manifest, write_variant
+
+
+def page_request(path, consent, banner=None):
+    """Petición de un visitante sin sesión ni mensajes, con la variante dada."""
+    request = RequestFactory().get(path)
+    request.resolver_match = resolve(path)
+    request.cookie_consent = consent
+    request.experiments = VisitorExperiments(None, forced={BANNER_EXPERIMENT: banner})
+    return request
+
+
+def render_page(request):
+    match = request.resolver_match
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+    # La vista original, sin caché de página ni contador de vistas
+    view = unwrap(match.func)
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    return view(request, *match.args, **match.kwargs).content
+
+
+class Command(BaseCommand):
+    help = "Pre-renderiza las landings en HTML, gzip y brotli para servirlas sin plantillas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--root",
+            default=settings.LANDING_PRERENDER["ROOT"],
+            help="Directorio de salida (por defecto LANDING_PRERENDER['ROOT'])",
+        )
+
+    def handle(self, *args, root, **options):
+        manifest = {}
+        banner_variants = list(settings.EXPERIMENTS["TESTS"].get(BANNER_EXPERIMENT, ()))
+        for name in PRERENDERED_PAGES:
+            path = reverse(name)
+            for consent in consent_variants():
+                # El banner solo aparece sin consentimiento: una página por variante
+                banners = [None] if consent["has_consent"] else banner_variants or [None]
+                for banner in banners:
+                    request = page_request(path, consent, banner)
+                    key = page_variant(request)
+                    html = render_page(request)
+                    manifest[f"{key}:{path}"] = write_variant(root, path, key, html)
+            self.stdout.write(f"{path}: {len(html)} bytes")
+
+        write_manifest(root, manifest)
+        if brotli is None:
+            self.stdout.write(self.style.WARNING("brotli no está instalado; solo se generó gzip"))
+        self.stdout.write(self.style.SUCCESS(f"{len(manifest)} variantes escritas en {root}"))
@@ -1,59 +1,84 @@
 """
 Middleware para manejar consentimiento de cookies y privacidad
 """
-from django.utils.deprecation import MiddlewareMixin
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
 
+from .consent import (
+    LEGACY_COOKIES,
+    allows_tracking,
+    anonymize_ip,
+    anonymize_user_agent,
+    client_key,
+    decode_consent,
+    legacy_consent,
+    set_consent_cookie,
+)
 
-class CookieConsentMiddleware(MiddlewareMixin):
+
+class PrivacyMiddleware:
+    """
+    Base síncrona y asíncrona al estilo de ``MiddlewareMixin``, pero sin
+    envolver ``process_request``/``process_response`` en ``sync_to_async``:
+    estos hooks no hacen I/O y pueden ejecutarse directamente en el event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        self.process_request(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        self.process_request(request)
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_request(self, request):
+        pass
+
+    def process_response(self, request, response):
+        return response
+
+
+class CookieConsentMiddleware(PrivacyMiddleware):
     """
     Middleware que maneja el consentimiento de cookies y anonimiza datos
-    cuando el usuario no ha dado consentimiento.
+    cuando el usuario no aceptó analítica ni marketing.
     """
 
     def process_request(self, request):
         """
-        Procesa la solicitud para verificar consentimiento de cookies
+        Lee el consentimiento de la cookie firmada, sin cargar la sesión
         """
-        # Verificar si el usuario ha dado consentimiento
-        cookie_consent = request.COOKIES.get('cookie-consent') or \
-                        getattr(request, 'session', {}).get('cookie-consent')
-
-        analytics_consent = request.COOKIES.get('analytics-consent') or \
-                           getattr(request, 'session', {}).get('analytics-consent')
-
-        marketing_consent = request.COOKIES.get('marketing-consent') or \
-                           getattr(request, 'session', {}).get('marketing-consent')
-
-        # Agregar información de consentimiento al request
-        request.cookie_consent = {
-            'has_consent': cookie_consent == 'accepted',
-            'analytics': analytics_consent == 'true',
-            'marketing': marketing_consent == 'true',
-        }
-
-        # Si no hay consentimiento, anonimizar datos sensibles
-        if not request.cookie_consent['has_consent']:
-            # Anonimizar IP
-            if hasattr(request, 'META'):
-                original_ip = request.META.get('REMOTE_ADDR', '')
-                if original_ip:
-                    # Técnica simple de anonimización: mantener solo primeros 2 octetos
-                    ip_parts = original_ip.split('.')
-                    if len(ip_parts) == 4:
-                        request.META['REMOTE_ADDR'] = f"{ip_parts[0]}.{ip_parts[1]}.0.0"
-
-            # Limpiar user agent para análisis
-            if hasattr(request, 'META') and 'HTTP_USER_AGENT' in request.META:
-                # Solo mantener información básica del navegador
-                ua = request.META['HTTP_USER_AGENT']
-                if 'Chrome' in ua:
-                    request.META['HTTP_USER_AGENT'] = 'Chrome (Anonimizado)'
-                elif 'Firefox' in ua:
-                    request.META['HTTP_USER_AGENT'] = 'Firefox (Anonimizado)'
-                elif 'Safari' in ua:
-                    request.META['HTTP_USER_AGENT'] = 'Safari (Anonimizado)'
-                else:
-                    request.META['HTTP_USER_AGENT'] = 'Browser (Anonimizado)'
+        value = request.COOKIES.get(settings.CONSENT_COOKIE["NAME"])
+        consent = decode_consent(value)
+        if value is None and (legacy := legacy_consent(request.COOKIES)) is not None:
+            # Elección hecha con el banner anterior: se migra en la respuesta
+            consent = request.legacy_consent = legacy
+        request.cookie_consent = consent
+
+        meta = request.META
+        address = meta.get('REMOTE_ADDR')
+        # Huella de la IP completa para el límite de frecuencia por cliente
+        request.client_key = client_key(address) if address else ''
+
+        # Sin analítica ni marketing, anonimizar datos sensibles
+        if not allows_tracking(consent):
+            if address:
+                meta['REMOTE_ADDR'] = anonymize_ip(address)
+            # Solo mantener información básica del navegador
+            if user_agent := meta.get('HTTP_USER_AGENT'):
+                meta['HTTP_USER_AGENT'] = anonymize_user_agent(user_agent)
 
     def process_response(self, request, response):
         """
@@ -65,21 +90,12 @@ class CookieConsentMiddleware(MiddlewareMixin):
         response['Referrer-Policy'] = 'strict-origin-when-cross-origin'
 
         # Si no hay consentimiento, agregar header de no-track
-        if hasattr(request, 'cookie_consent') and not request.cookie_consent['has_consent']:
+        if hasattr(request, 'cookie_consent') and not allows_tracking(request.cookie_consent):
             response['DNT'] = '1'  # Do Not Track
 
-        return response
+        if legacy := getattr(request, 'legacy_consent', None):
+            set_consent_cookie(response, **legacy)
+            for name in LEGACY_COOKIES:
+                response.delete_cookie(name)
 
-
-class DataRetentionMiddleware(MiddlewareMixin):
-    """
-    Middleware que marca datos para eliminación automática según políticas
-    """
-
-    def process_request(self, request):
-        """
-        Verifica si hay solicitudes de eliminación de datos
-        """
-        # Aquí podríamos agregar lógica para procesar solicitudes GDPR
-        # Por ejemplo, verificar tokens de eliminación en la URL
-        pass
+        return response
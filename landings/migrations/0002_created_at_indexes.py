@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='campaign',
+            index=models.Index(fields=['-created_at'], name='campaign_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landingpage',
+            index=models.Index(fields=['-created_at'], name='landing_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landings', '0002_created_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExperimentDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('experiment', models.CharField(max_length=100, verbose_name='Experimento')),
+                ('variant', models.CharField(max_length=100, verbose_name='Variante')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Vistas')),
+                ('conversions', models.PositiveIntegerField(default=0, verbose_name='Conversiones')),
+            ],
+            options={
+                'verbose_name': 'Resultado Diario de Experimento',
+                'verbose_name_plural': 'Resultados Diarios de Experimentos',
+                'ordering': ['-day', 'experiment', 'variant'],
+                'constraints': [models.UniqueConstraint(fields=('experiment', 'variant', 'day'), name='experiment_stats_unique')],
+            },
+        ),
+    ]
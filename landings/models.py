@@ -1,6 +1,32 @@
-from django.db import models
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.text import slugify
 
+CAMPAIGN_NAME_TIMEOUT = 300
+
+
+def _campaign_name_key(pk):
+    return f"landings:campaign-name:{pk}"
+
+
+def _campaign_name_cache():
+    # La misma caché que la versión del índice de slugs: compartida con
+    # REDIS_URL, así que renombrar una campaña llega a todos los workers
+    return caches[settings.LANDING_ROUTING["CACHE"]]
+
+
+def campaign_name(pk):
+    """Nombre de la campaña ``pk``, cacheado para no cargar la fila por cada landing."""
+    key = _campaign_name_key(pk)
+    name = _campaign_name_cache().get(key)
+    if name is None:
+        name = Campaign.objects.filter(pk=pk).values_list("name", flat=True).first()
+        _campaign_name_cache().set(key, name or "", CAMPAIGN_NAME_TIMEOUT)
+    return name or ""
+
 
 class Campaign(models.Model):
     name = models.CharField(max_length=100, verbose_name="Nombre de la Campaña")
@@ -17,6 +43,9 @@ class Campaign(models.Model):
         verbose_name = "Campaña"
         verbose_name_plural = "Campañas"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"], name="campaign_created_at_idx"),
+        ]
 
 
 class LandingPage(models.Model):
@@ -54,9 +83,44 @@ class LandingPage(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.title} ({self.campaign.name})"
+        if LandingPage.campaign.is_cached(self):
+            return f"{self.title} ({self.campaign.name})"
+        return f"{self.title} ({campaign_name(self.campaign_id)})"
 
     class Meta:
         verbose_name = "Página de Landing"
         verbose_name_plural = "Páginas de Landing"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"], name="landing_created_at_idx"),
+        ]
+
+
+class ExperimentDailyStats(models.Model):
+    """Vistas y conversiones por experimento × variante × día."""
+
+    experiment = models.CharField(max_length=100, verbose_name="Experimento")
+    variant = models.CharField(max_length=100, verbose_name="Variante")
+    day = models.DateField(verbose_name="Día")
+    views = models.PositiveIntegerField(default=0, verbose_name="Vistas")
+    conversions = models.PositiveIntegerField(default=0, verbose_name="Conversiones")
+
+    def __str__(self):
+        return f"{self.experiment}/{self.variant} {self.day}"
+
+    class Meta:
+        verbose_name = "Resultado Diario de Experimento"
+        verbose_name_plural = "Resultados Diarios de Experimentos"
+        ordering = ["-day", "experiment", "variant"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["experiment", "variant", "day"], name="experiment_stats_unique"
+            ),
+        ]
+
+
+@receiver([post_save, post_delete], sender=Campaign)
+def _forget_campaign_name(instance, **kwargs):
+    # Tras confirmar: antes, otro worker podría volver a cachear el nombre viejo
+    key = _campaign_name_key(instance.pk)
+    transaction.on_commit(lambda: _campaign_name_cache().delete(key))
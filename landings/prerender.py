@@ -0,0 +1,215 @@
+"""
+Páginas pre-renderizadas y pre-comprimidas.
+
+``manage.py prerender_landings`` renderiza cada página estática en todas
+sus variantes de consentimiento y de banner de cookies y guarda el HTML
+junto con sus versiones gzip y brotli. ``serve_prerendered`` entrega esos bytes directamente,
+negociando ``Content-Encoding`` con el navegador, y solo cae al render en
+vivo cuando la petición es dinámica (mensajes flash, POST) o la variante no
+existe en disco.
+
+Brotli es opcional: si el paquete ``brotli`` no está instalado solo se
+generan las versiones sin comprimir y gzip.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from monitoring.metrics import CACHE_REQUESTS
+
+from .cache import aload_session, is_dynamic, page_variant
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+PRERENDERED_PAGES = (
+    "landings:webinar_landing",
+    "landings:webinar_thank_you",
+    "landings:privacy_policy",
+    "landings:privacy_policy_technical",
+)
+MANIFEST = "manifest.json"
+
+# Sufijo en disco por Content-Encoding, en orden de preferencia
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+
+def _page_dir(path):
+    return path.strip("/").replace("/", "__") or "index"
+
+
+def _atomic_write(path, data):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def write_variant(root, path, consent, html):
+    """Guarda el HTML y sus versiones comprimidas. Devuelve la entrada del manifest."""
+    page_dir = Path(root) / _page_dir(path)
+    page_dir.mkdir(parents=True, exist_ok=True)
+    name = f"{consent}.html"
+    files = {"identity": name, "gzip": name + ENCODINGS["gzip"]}
+    _atomic_write(page_dir / name, html)
+    _atomic_write(page_dir / files["gzip"], gzip.compress(html, 9, mtime=0))
+    if brotli is not None:
+        files["br"] = name + ENCODINGS["br"]
+        _atomic_write(page_dir / files["br"], brotli.compress(html))
+    return {
+        "dir": _page_dir(path),
+        "files": files,
+        "etag": hashlib.md5(html, usedforsecurity=False).hexdigest(),
+        "last_modified": int(time.time()),
+    }
+
+
+def write_manifest(root, manifest):
+    _atomic_write(Path(root) / MANIFEST, json.dumps(manifest, indent=2).encode())
+
+
+def accepted_encodings(request):
+    """Codificaciones aceptadas (q > 0) según ``Accept-Encoding``."""
+    accepted = set()
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.lower())
+    return accepted
+
+
+class PrerenderedStore:
+    """
+    Bytes de las variantes pre-renderizadas, cargados en memoria la primera
+    vez que se piden. Si el manifest cambia en disco se recarga todo.
+    """
+
+    check_interval = 1.0
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._manifest = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._bodies = {}
+
+    def get(self, path, consent, encodings):
+        """Devuelve ``(entrada, encoding, bytes)`` o ``None`` si no hay variante."""
+        entry = self._current_manifest().get(f"{consent}:{path}")
+        if entry is None:
+            return None
+        for encoding in ENCODINGS:
+            if encoding in encodings and encoding in entry["files"]:
+                return entry, encoding, self._body(entry, encoding)
+        return entry, "identity", self._body(entry, "identity")
+
+    def _current_manifest(self):
+        now = time.monotonic()
+        if self._manifest is not None and now - self._checked_at < self.check_interval:
+            return self._manifest
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = (self.root / MANIFEST).stat().st_mtime_ns
+            except FileNotFoundError:
+                self._manifest, self._mtime, self._bodies = {}, None, {}
+                return self._manifest
+            if mtime != self._mtime:
+                self._manifest = json.loads((self.root / MANIFEST).read_text())
+                self._mtime = mtime
+                self._bodies = {}
+            return self._manifest
+
+    def _body(self, entry, encoding):
+        key = (entry["dir"], entry["files"][encoding])
+        body = self._bodies.get(key)
+        if body is None:
+            body = self._bodies[key] = (self.root / key[0] / key[1]).read_bytes()
+        return body
+
+
+_stores = {}
+
+
+def get_store():
+    root = settings.LANDING_PRERENDER["ROOT"]
+    store = _stores.get(root)
+    if store is None:
+        store = _stores[root] = PrerenderedStore(root)
+    return store
+
+
+def _prerendered_response(request):
+    """Variante pre-renderizada para ``request``, o ``None`` si no aplica."""
+    if not settings.LANDING_PRERENDER["ENABLED"] or is_dynamic(request):
+        return None
+
+    found = get_store().get(
+        request.path, page_variant(request), accepted_encodings(request)
+    )
+    if found is None:
+        CACHE_REQUESTS.inc("prerendered", "miss")
+        return None
+    CACHE_REQUESTS.inc("prerendered", "hit")
+
+    entry, encoding, body = found
+    # Cada representación necesita su propio ETag fuerte
+    etag = entry["etag"] if encoding == "identity" else f"{entry['etag']}-{encoding}"
+    etag = f'"{etag}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=entry["last_modified"]
+    )
+    if response is None:
+        response = HttpResponse(body, content_type="text/html; charset=utf-8")
+        if encoding != "identity":
+            response["Content-Encoding"] = encoding
+        response["Content-Length"] = str(len(body))
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    patch_vary_headers(response, ("Accept-Encoding", "Cookie"))
+    return response
+
+
+def serve_prerendered(view_func):
+    """
+    Decorador de vista que responde con la variante pre-renderizada cuando
+    existe y la petición no es dinámica.
+    """
+    if iscoroutinefunction(view_func):
+
+        async def _view_wrapper(request, *args, **kwargs):
+            await aload_session(request)
+            response = _prerendered_response(request)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+            return response
+
+    else:
+
+        def _view_wrapper(request, *args, **kwargs):
+            response = _prerendered_response(request)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            return response
+
+    return wraps(view_func)(_view_wrapper)
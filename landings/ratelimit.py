@@ -0,0 +1,81 @@
+"""
+Limitador token bucket en dos niveles.
+
+``LocalRateLimiter`` guarda un cubo por clave en memoria del proceso: no hace
+I/O y frena las ráfagas que llegan a un mismo worker. Solo si lo deja pasar
+se consulta ``SharedRateLimiter``, que cuenta en una caché de Django
+compartida (Redis con ``REDIS_URL``) para que el límite valga entre workers.
+
+En la caché compartida el cubo se rellena de golpe al empezar cada ventana
+de ``period`` segundos: ``add`` + ``incr`` son atómicos en cualquier backend
+y no hacen falta scripts de Redis. Si la caché falla se deja pasar la
+petición (el nivel local sigue frenando).
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class LocalRateLimiter:
+    """
+    Cubos de ``capacity`` fichas que se rellenan a ``capacity / period`` por
+    segundo. Guarda como mucho ``max_keys`` claves (descarta las más viejas).
+    """
+
+    def __init__(self, capacity, period, max_keys=10000):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed
+
+
+class SharedRateLimiter:
+    """Como mucho ``capacity`` peticiones por ventana de ``period`` segundos."""
+
+    def __init__(self, cache, prefix, capacity, period):
+        self.cache = cache
+        self.prefix = prefix
+        self.capacity = capacity
+        self.period = period
+
+    def allow(self, key, now=None):
+        now = time.time() if now is None else now
+        cache_key = f"{self.prefix}:{key}:{int(now // self.period)}"
+        try:
+            self.cache.add(cache_key, 0, timeout=self.period * 2)
+            try:
+                count = self.cache.incr(cache_key)
+            except ValueError:
+                # Expiró entre add e incr
+                self.cache.add(cache_key, 1, timeout=self.period * 2)
+                count = 1
+        except Exception:
+            logger.exception("Caché de rate limit no disponible; se deja pasar")
+            return True
+        return count <= self.capacity
+
+
+class RateLimiter:
+    def __init__(self, cache, prefix, capacity, period):
+        self.local = LocalRateLimiter(capacity, period)
+        self.shared = SharedRateLimiter(cache, prefix, capacity, period)
+
+    def allow(self, key):
+        return self.local.allow(key) and self.shared.allow(key)
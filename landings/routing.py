@@ -0,0 +1,305 @@
+"""
+Índice en memoria slug → landing para el despachador ``/<slug>/``.
+
+El índice se carga completo una vez por proceso y luego se mantiene al día
+con las señales de guardado/borrado de ``LandingPage`` y ``Campaign``, así
+que resolver una landing no hace ninguna consulta a la base de datos.
+
+Las señales solo llegan al proceso que hizo el cambio; por eso, al
+confirmarse la transacción, también incrementan un número de versión en la
+caché de ``LANDING_ROUTING["CACHE"]`` (compartida con ``REDIS_URL``) y
+guardan junto a cada versión qué landing o campaña cambió. Cada worker
+compara esa versión con la suya como mucho cada ``VERSION_CHECK_INTERVAL``
+segundos, y siempre antes de responder 404, y vuelve a leer solo las
+landings de los cambios que le faltan. Si alguno ya caducó de la caché, o
+le faltan más de ``CHANGELOG_SIZE``, recarga el índice entero. La recarga completa cada ``REFRESH_INTERVAL``
+segundos en segundo plano queda como respaldo (por ejemplo, con una caché
+``LocMemCache``, que no se comparte entre procesos).
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from functools import cache, partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .background import PeriodicFlusher
+from .models import Campaign, LandingPage
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "landings:slug-index:version"
+# Cambios por versión que un worker aplica uno a uno antes de recargar todo
+CHANGELOG_SIZE = 100
+CHANGELOG_TIMEOUT = 3600
+
+LandingRoute = namedtuple(
+    "LandingRoute",
+    [
+        "pk",
+        "slug",
+        "title",
+        "template",
+        "meta_description",
+        "cta_button_text",
+        "whatsapp_number",
+        "campaign_id",
+        "campaign_name",
+        "campaign_is_active",
+    ],
+)
+
+ROUTE_FIELDS = (
+    "pk",
+    "slug",
+    "title",
+    "template",
+    "meta_description",
+    "cta_button_text",
+    "whatsapp_number",
+    "campaign_id",
+    "campaign__name",
+    "campaign__is_active",
+)
+
+
+def _route_for(landing, campaign):
+    return LandingRoute(
+        pk=landing.pk,
+        slug=landing.slug,
+        title=landing.title,
+        template=landing.template,
+        meta_description=landing.meta_description,
+        cta_button_text=landing.cta_button_text,
+        whatsapp_number=landing.whatsapp_number,
+        campaign_id=campaign.pk,
+        campaign_name=campaign.name,
+        campaign_is_active=campaign.is_active,
+    )
+
+
+class SlugIndex:
+    """
+    Mapa ``slug → LandingRoute``. Las lecturas no toman locks: cada cambio
+    reemplaza entradas individuales y la recarga completa sustituye el
+    diccionario entero de una sola vez. Con ``cache`` sigue la versión
+    compartida que publica ``bump_version``.
+    """
+
+    def __init__(self, cache=None, check_interval=1.0):
+        self._routes = None
+        self._slug_by_pk = {}
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._cache = cache
+        self.check_interval = check_interval
+        self._version = None
+        self._checked_at = 0.0
+
+    def __len__(self):
+        return len(self._routes or ())
+
+    def start(self, interval):
+        if self._refresher is None:
+            self._refresher = PeriodicFlusher(self.load, interval, "landing-index")
+            self._refresher.start()
+
+    def load(self):
+        # La versión se lee antes que las filas: un cambio durante la carga
+        # provoca otra recarga
+        version = self._shared_version()
+        rows = LandingPage.objects.values_list(*ROUTE_FIELDS).iterator(chunk_size=2000)
+        routes = {row[1]: LandingRoute(*row) for row in rows}
+        with self._lock:
+            self._routes = routes
+            self._slug_by_pk = {route.pk: slug for slug, route in routes.items()}
+            self._version = version
+
+    def _shared_version(self):
+        if self._cache is None:
+            return None
+        try:
+            return self._cache.get(VERSION_KEY)
+        except Exception:
+            logger.exception("No se pudo leer la versión del índice de landings")
+            return self._version
+
+    def refresh_if_changed(self, force=False):
+        """
+        Recarga si la versión compartida cambió. Sin ``force`` consulta la
+        caché como mucho cada ``check_interval`` segundos.
+        """
+        if self._cache is None:
+            return False
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        version = self._shared_version()
+        if version == self._version:
+            return False
+        changes = self._changes_since(version)
+        if changes is None:
+            self.load()
+        else:
+            self._apply(changes, version)
+        return True
+
+    def _changes_since(self, version):
+        """Cambios entre nuestra versión y ``version``, o ``None`` si faltan."""
+        if self._version is None or version is None:
+            return None
+        missed = range(self._version + 1, version + 1)
+        if not 0 < len(missed) <= CHANGELOG_SIZE:
+            return None
+        keys = [_changelog_key(number) for number in missed]
+        try:
+            found = self._cache.get_many(keys)
+        except Exception:
+            logger.exception("No se pudieron leer los cambios del índice de landings")
+            return None
+        if len(found) != len(keys):
+            return None
+        return list(found.values())
+
+    def _apply(self, changes, version):
+        """Vuelve a leer solo las landings afectadas por ``changes``."""
+        landing_pks = {pk for kind, pk in changes if kind == "landing"}
+        campaign_pks = {pk for kind, pk in changes if kind == "campaign"}
+        rows = LandingPage.objects.filter(
+            Q(pk__in=landing_pks) | Q(campaign_id__in=campaign_pks)
+        ).values_list(*ROUTE_FIELDS)
+        routes = [LandingRoute(*row) for row in rows]
+        with self._lock:
+            found = {route.pk for route in routes}
+            gone = landing_pks - found
+            gone.update(
+                route.pk
+                for route in self._routes.values()
+                if route.campaign_id in campaign_pks and route.pk not in found
+            )
+            for pk in gone:
+                slug = self._slug_by_pk.pop(pk, None)
+                if slug is not None:
+                    self._routes.pop(slug, None)
+            for route in routes:
+                old_slug = self._slug_by_pk.get(route.pk)
+                if old_slug is not None and old_slug != route.slug:
+                    self._routes.pop(old_slug, None)
+                self._routes[route.slug] = route
+                self._slug_by_pk[route.pk] = route.slug
+            self._version = version
+
+    def warm(self):
+        """Carga el índice al arrancar el worker sin impedir el arranque."""
+        try:
+            self.load()
+        except DatabaseError:
+            logger.exception("No se pudo precargar el índice de landings")
+
+    def resolve(self, slug):
+        if self._routes is None:
+            self.load()
+        else:
+            self.refresh_if_changed()
+        route = self._routes.get(slug)
+        # Antes de un 404, por si la landing se acaba de crear en otro worker
+        if route is None and self.refresh_if_changed(force=True):
+            route = self._routes.get(slug)
+        return route
+
+    def update(self, landing):
+        if self._routes is None:
+            return
+        route = _route_for(landing, landing.campaign)
+        with self._lock:
+            old_slug = self._slug_by_pk.get(route.pk)
+            if old_slug is not None and old_slug != route.slug:
+                self._routes.pop(old_slug, None)
+            self._routes[route.slug] = route
+            self._slug_by_pk[route.pk] = route.slug
+
+    def remove(self, pk):
+        if self._routes is None:
+            return
+        with self._lock:
+            slug = self._slug_by_pk.pop(pk, None)
+            if slug is not None:
+                self._routes.pop(slug, None)
+
+    def update_campaign(self, campaign):
+        if self._routes is None:
+            return
+        with self._lock:
+            for slug, route in list(self._routes.items()):
+                if route.campaign_id == campaign.pk:
+                    self._routes[slug] = route._replace(
+                        campaign_name=campaign.name,
+                        campaign_is_active=campaign.is_active,
+                    )
+
+
+def _version_cache():
+    return caches[settings.LANDING_ROUTING["CACHE"]]
+
+
+def _changelog_key(version):
+    return f"{VERSION_KEY}:{version}"
+
+
+def bump_version(kind, pk):
+    """
+    Avisa a los demás workers de que cambió la landing o campaña ``pk``
+    (``kind`` es ``"landing"`` o ``"campaign"``).
+    """
+    try:
+        version_cache = _version_cache()
+        try:
+            version = version_cache.incr(VERSION_KEY)
+        except ValueError:
+            version_cache.set(VERSION_KEY, 1, timeout=None)
+            return
+        version_cache.set(_changelog_key(version), (kind, pk), CHANGELOG_TIMEOUT)
+    except Exception:
+        logger.exception("No se pudo publicar la versión del índice de landings")
+
+
+@cache
+def get_slug_index():
+    """Índice compartido por el proceso, con su recarga periódica iniciada."""
+    config = settings.LANDING_ROUTING
+    index = SlugIndex(_version_cache(), config["VERSION_CHECK_INTERVAL"])
+    if config["REFRESH_INTERVAL"]:
+        index.start(config["REFRESH_INTERVAL"])
+    return index
+
+
+@receiver(setting_changed)
+def _reset_slug_index(setting, **kwargs):
+    if setting == "LANDING_ROUTING":
+        get_slug_index.cache_clear()
+
+
+@receiver(post_save, sender=LandingPage)
+def _landing_saved(instance, **kwargs):
+    get_slug_index().update(instance)
+    transaction.on_commit(partial(bump_version, "landing", instance.pk))
+
+
+@receiver(post_delete, sender=LandingPage)
+def _landing_deleted(instance, **kwargs):
+    get_slug_index().remove(instance.pk)
+    transaction.on_commit(partial(bump_version, "landing", instance.pk))
+
+
+@receiver(post_save, sender=Campaign)
+def _campaign_saved(instance, **kwargs):
+    get_slug_index().update_campaign(instance)
+    transaction.on_commit(partial(bump_version, "campaign", instance.pk))
@@ -0,0 +1,145 @@
+"""
+Filtro de bots y límite de frecuencia para el registro de leads.
+
+``check_registration`` corre antes de cualquier acceso a la base de datos:
+
+1. Heurísticas gratuitas: el campo trampa (``HONEYPOT_FIELD``) debe llegar
+   vacío y el nombre no puede contener enlaces; estos envíos se descartan
+   respondiendo como si todo fuera bien. Además el formulario no puede
+   enviarse a menos de ``MIN_FILL_SECONDS`` de cargarse la página: el
+   navegador mide el tiempo (``fill_ms``, en ms) con su propio reloj, así que
+   no se compara con la hora del servidor. El tiempo por sí solo nunca
+   descarta en silencio: la vista pide volver a enviar el formulario.
+2. Token bucket por cliente (huella de la IP completa, ``IP_RATE``) en
+   memoria del proceso, un límite grueso por red /16 o /48 (``NETWORK_RATE``)
+   en la caché compartida, para que una NAT de operador no agote el cupo de
+   todos sus clientes, y otro por dominio del email (``landings.ratelimit``).
+
+Los resultados se cuentan en memoria del proceso (``guard_counters``) para
+monitorizarlos. ``acheck_registration`` es la versión para vistas async:
+los límites pueden hacer varias idas y vueltas a Redis, así que corren en
+un hilo para no bloquear el event loop.
+"""
+import threading
+from collections import Counter
+from functools import cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .consent import anonymize_ip
+from .ratelimit import LocalRateLimiter, RateLimiter, SharedRateLimiter
+
+ACCEPTED = "accepted"
+HONEYPOT = "honeypot"
+TOO_FAST = "too_fast"
+LINK_IN_NAME = "link_in_name"
+RATE_LIMITED_IP = "rate_limited_ip"
+RATE_LIMITED_NETWORK = "rate_limited_network"
+RATE_LIMITED_DOMAIN = "rate_limited_domain"
+
+# Se descartan respondiendo como a una persona; TOO_FAST no está aquí
+BOT_VERDICTS = (HONEYPOT, LINK_IN_NAME)
+FILL_FIELD = "fill_ms"
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def _count(verdict):
+    with _counters_lock:
+        _counters[verdict] += 1
+    return verdict
+
+
+def guard_counters():
+    """Copia de los contadores de resultados del proceso."""
+    with _counters_lock:
+        return dict(_counters)
+
+
+def reset_guard_counters():
+    with _counters_lock:
+        _counters.clear()
+
+
+@cache
+def get_rate_limiters():
+    """
+    ``(por cliente, por red, por dominio)`` del proceso, o ``None`` si está
+    desactivado.
+    """
+    config = settings.REGISTRATION_GUARD
+    if not config["RATE_LIMIT"]:
+        return None
+    store = caches[config["CACHE"]]
+    return (
+        LocalRateLimiter(*config["IP_RATE"]),
+        SharedRateLimiter(store, "rl:net", *config["NETWORK_RATE"]),
+        RateLimiter(store, "rl:domain", *config["DOMAIN_RATE"]),
+    )
+
+
+@receiver(setting_changed)
+def _reset_rate_limiters(setting, **kwargs):
+    if setting == "REGISTRATION_GUARD":
+        get_rate_limiters.cache_clear()
+
+
+def bot_verdict(data):
+    """Motivo por el que ``data`` parece un bot, o ``None``."""
+    config = settings.REGISTRATION_GUARD
+    if data.get(config["HONEYPOT_FIELD"]):
+        return HONEYPOT
+    name = data.get("name") or ""
+    if "http://" in name or "https://" in name or "www." in name:
+        return LINK_IN_NAME
+    # Sin JavaScript no llega el campo y no se mide
+    fill_ms = data.get(FILL_FIELD)
+    if fill_ms:
+        try:
+            elapsed = int(fill_ms) / 1000
+        except ValueError:
+            return TOO_FAST
+        if elapsed < config["MIN_FILL_SECONDS"]:
+            return TOO_FAST
+    return None
+
+
+def check_registration(request, email):
+    """
+    Resultado para un POST de registro: ``ACCEPTED``, uno de
+    ``BOT_VERDICTS``, ``TOO_FAST`` o ``RATE_LIMITED_*``.
+    """
+    if verdict := bot_verdict(request.POST):
+        return _count(verdict)
+    return _count(_rate_verdict(request, email))
+
+
+async def acheck_registration(request, email):
+    """Como ``check_registration``, con los límites fuera del event loop."""
+    if verdict := bot_verdict(request.POST):
+        return _count(verdict)
+    if get_rate_limiters() is None:
+        return _count(ACCEPTED)
+    verdict = await sync_to_async(_rate_verdict, thread_sensitive=False)(request, email)
+    return _count(verdict)
+
+
+def _rate_verdict(request, email):
+    limiters = get_rate_limiters()
+    if limiters is not None:
+        by_client, by_network, by_domain = limiters
+        # REMOTE_ADDR puede venir ya anonimizada: anonymize_ip no la cambia
+        address = request.META.get("REMOTE_ADDR", "")
+        if not by_client.allow(getattr(request, "client_key", "") or address):
+            return RATE_LIMITED_IP
+        if not by_network.allow(anonymize_ip(address)):
+            return RATE_LIMITED_NETWORK
+        domain = (email or "").rpartition("@")[2].strip().lower()
+        if domain and not by_domain.allow(domain):
+            return RATE_LIMITED_DOMAIN
+    return ACCEPTED
@@ -1,10 +1,67 @@
-from django.test import TestCase, RequestFactory
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from django.contrib.messages import get_messages
 from django.http import HttpResponse
+from analytics.ingestion import get_lead_buffer
 from analytics.models import Lead
-from .models import Campaign, LandingPage
-from .middleware import CookieConsentMiddleware, DataRetentionMiddleware
+from analytics.synthetic import generate
+from django.core.cache import cache
+from django.core.management import call_command
+from .admin import CampaignAdmin
+from .background import PeriodicFlusher
+from .benchmark import (
+    ClientUser,
+    HttpUser,
+    load_baselines,
+    regressions,
+    run_threads,
+    save_baseline,
+    summarize,
+    wsgi_server,
+)
+from .cache import GENERATION_KEY, consent_key
+from .counters import LandingCounters, get_counters
+from .prerender import accepted_encodings
+from .routing import VERSION_KEY, SlugIndex, get_slug_index
+from .models import Campaign, ExperimentDailyStats, LandingPage
+from .consent import (
+    NO_CONSENT,
+    anonymize_ip,
+    anonymize_user_agent,
+    decode_consent,
+    sign_consent,
+)
+from .experiments import (
+    BANNER_EXPERIMENT,
+    VISITOR_ID_RE,
+    banner_fragments,
+    bucket,
+    get_experiment_stats,
+)
+from .middleware import CookieConsentMiddleware
+from .ratelimit import LocalRateLimiter, SharedRateLimiter
+from .spam import (
+    ACCEPTED,
+    acheck_registration,
+    get_rate_limiters,
+    guard_counters,
+    reset_guard_counters,
+)
+from unittest import skipUnless
 from unittest.mock import patch
 
 
@@ -49,6 +106,42 @@ class LandingPageModelTest(TestCase):
         )
         self.assertEqual(str(landing), "Test Landing (Test Campaign)")
 
+    def test_landing_page_str_caches_campaign_name(self):
+        """Test that __str__ does not load the campaign for every landing"""
+        for i in range(3):
+            LandingPage.objects.create(
+                campaign=self.campaign, title=f"Landing {i}", slug=f"landing-{i}"
+            )
+        landings = list(LandingPage.objects.all())
+        with self.assertNumQueries(1):
+            names = [str(landing) for landing in landings]
+        self.assertEqual(names[0], f"{landings[0].title} (Test Campaign)")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.campaign.name = "Renamed"
+            self.campaign.save()
+        self.assertIn("(Renamed)", str(LandingPage.objects.first()))
+
+    def test_campaign_names_live_in_the_routing_cache(self):
+        """Test that cached campaign names are shared like the slug index version"""
+        LandingPage.objects.create(campaign=self.campaign, title="Shared", slug="shared")
+        landing = LandingPage.objects.get(slug="shared")
+        caches = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "shared": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "shared",
+            },
+        }
+        config = {**settings.LANDING_ROUTING, "CACHE": "shared"}
+        with self.settings(CACHES=caches, LANDING_ROUTING=config):
+            from django.core.cache import caches as handler
+
+            self.assertEqual(str(landing), "Shared (Test Campaign)")
+            key = f"landings:campaign-name:{self.campaign.pk}"
+            self.assertEqual(handler["shared"].get(key), "Test Campaign")
+            self.assertIsNone(handler["default"].get(key))
+
 
 class WebinarViewsTest(TestCase):
     def setUp(self):
@@ -83,6 +176,17 @@ class WebinarViewsTest(TestCase):
         # Check no lead was created
         self.assertEqual(Lead.objects.count(), 0)
 
+    def test_register_webinar_lead_invalid_fields(self):
+        """Test that oversized fields and bad emails are rejected before saving"""
+        for data in (
+            {"name": "x" * 101, "email": "long@example.com"},
+            {"name": "Test User", "email": "phone@example.com", "phone": "5" * 21},
+            {"name": "Test User", "email": "not-an-email"},
+        ):
+            response = self.client.post("/webinar/register/", data, follow=True)
+            self.assertContains(response, "Revisa tus datos")
+        self.assertEqual(Lead.objects.count(), 0)
+
     def test_register_webinar_lead_database_error(self):
         """Test lead registration with database error"""
         # Create a lead first to potentially cause a duplicate error
@@ -93,12 +197,513 @@ class WebinarViewsTest(TestCase):
         response = self.client.post("/webinar/register/", data)
         self.assertEqual(response.status_code, 302)  # Should redirect to thank you
 
+    def test_register_duplicate_email_is_case_insensitive(self):
+        """Test that a differently-cased email resolves as a duplicate in one query"""
+        Lead.objects.create(name="Existing User", email="test@example.com")
+        data = {"name": "Test User", "email": " TEST@Example.com "}
+        with self.assertNumQueries(1):
+            response = self.client.post("/webinar/register/", data)
+
+        self.assertRedirects(response, "/webinar/thank-you/", fetch_redirect_response=False)
+        message = list(get_messages(response.wsgi_request))[-1]
+        self.assertEqual(message.level_tag, "warning")
+        self.assertEqual(Lead.objects.count(), 1)
+
     def test_webinar_thank_you_view(self):
         """Test thank you page loads"""
         response = self.client.get("/webinar/thank-you/")
         self.assertEqual(response.status_code, 200)
 
 
+class BufferedRegistrationTest(TestCase):
+    """Tests for the buffered lead ingestion mode"""
+
+    def setUp(self):
+        spool_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(LEAD_INGESTION={
+            "MODE": "buffered",
+            "BATCH_SIZE": 10,
+            "FLUSH_INTERVAL": None,
+            "MAX_PENDING": 1,
+            "ENQUEUE_TIMEOUT": 0.01,
+            "SPOOL_DIR": spool_dir,
+            "FSYNC": False,
+        }))
+        get_lead_buffer.cache_clear()
+
+    def tearDown(self):
+        get_lead_buffer().flush()
+
+    def test_registration_is_queued_and_flushed(self):
+        """Test that buffered registration redirects before the lead is written"""
+        data = {"name": "Test User", "email": "test@example.com", "phone": "123"}
+        response = self.client.post("/webinar/register/", data)
+        self.assertRedirects(response, "/webinar/thank-you/")
+        self.assertEqual(Lead.objects.count(), 0)
+
+        get_lead_buffer().flush()
+        lead = Lead.objects.get(email="test@example.com")
+        self.assertEqual(lead.source, "webinar")
+
+    def test_duplicate_email_while_pending(self):
+        """Test that a pending email is reported as already registered"""
+        data = {"name": "Test User", "email": "test@example.com"}
+        self.client.post("/webinar/register/", data)
+        response = self.client.post("/webinar/register/", data, follow=True)
+
+        self.assertRedirects(response, "/webinar/thank-you/")
+        message = list(get_messages(response.wsgi_request))[-1]
+        self.assertEqual(message.level_tag, "warning")
+
+    def test_duplicate_email_already_stored(self):
+        """Test that an existing lead is detected without queueing it again"""
+        Lead.objects.create(name="Existing", email="test@example.com")
+        response = self.client.post("/webinar/register/", {"name": "Test User", "email": "test@example.com"})
+        self.assertRedirects(response, "/webinar/thank-you/")
+        self.assertEqual(len(get_lead_buffer()), 0)
+
+    def test_full_queue_redirects_back_to_landing(self):
+        """Test that backpressure sends the visitor back to the landing"""
+        self.client.post("/webinar/register/", {"name": "First", "email": "first@example.com"})
+        response = self.client.post("/webinar/register/", {"name": "Second", "email": "second@example.com"})
+        self.assertRedirects(response, "/webinar/")
+        self.assertFalse(Lead.objects.filter(email="second@example.com").exists())
+
+
+class LandingCountersTest(TestCase):
+    """Tests for the in-memory view and conversion counters"""
+
+    def setUp(self):
+        campaign = Campaign.objects.create(name="Webinar Campaign")
+        self.landing = LandingPage.objects.create(
+            campaign=campaign, title="Webinar", slug="webinar"
+        )
+        get_counters.cache_clear()
+
+    def test_flush_applies_aggregated_deltas(self):
+        """Test that accumulated hits are written in a single flush"""
+        counters = LandingCounters()
+        for _ in range(5):
+            counters.record_view("webinar")
+        counters.record_conversion("webinar", 2)
+        self.landing.refresh_from_db()
+        self.assertEqual(self.landing.view_count, 0)
+
+        self.assertEqual(counters.flush(), 1)
+        self.landing.refresh_from_db()
+        self.assertEqual(self.landing.view_count, 5)
+        self.assertEqual(self.landing.conversion_count, 2)
+        self.assertEqual(counters.pending(), ({}, {}))
+
+    def test_flushes_from_several_processes_add_up(self):
+        """Test that independent accumulators never overwrite each other"""
+        first, second = LandingCounters(), LandingCounters()
+        first.record_view("webinar", 3)
+        second.record_view("webinar", 4)
+        first.flush()
+        second.flush()
+        self.landing.refresh_from_db()
+        self.assertEqual(self.landing.view_count, 7)
+
+    def test_threads_accumulate_in_separate_shards(self):
+        """Test that concurrent increments are not lost"""
+        import threading
+
+        counters = LandingCounters()
+
+        def hit():
+            for _ in range(1000):
+                counters.record_view("webinar")
+
+        threads = [threading.Thread(target=hit) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counters.pending()[0]["webinar"], 4000)
+
+    def test_failed_flush_keeps_deltas(self):
+        """Test that deltas survive a database error"""
+        counters = LandingCounters()
+        counters.record_view("webinar", 2)
+        with patch("landings.counters.LandingPage.objects.filter", side_effect=Exception("boom")):
+            with self.assertRaises(Exception):
+                counters.flush()
+        self.assertEqual(counters.pending()[0]["webinar"], 2)
+
+    def test_webinar_views_and_conversions_are_counted(self):
+        """Test that the webinar funnel feeds the counters"""
+        self.client.get("/webinar/")
+        self.client.get("/webinar/")
+        self.client.post("/webinar/register/", {"name": "Test User", "email": "test@example.com"})
+        get_counters().flush()
+
+        self.landing.refresh_from_db()
+        self.assertEqual(self.landing.view_count, 2)
+        self.assertEqual(self.landing.conversion_count, 1)
+
+
+@override_settings(LANDING_PAGE_CACHE={
+    "ENABLED": True, "CACHE": "default", "GENERATION_CACHE": "default", "TIMEOUT": 60,
+})
+class LandingPageCacheTest(TestCase):
+    """Tests for the consent-aware full-page cache"""
+
+    def setUp(self):
+        cache.clear()
+        # Sin consentimiento el banner se sortea en cada petición: se fija
+        # para que las visitas repetidas pidan la misma copia
+        drawn = patch("landings.experiments.new_visitor_id", return_value="0" * 16)
+        drawn.start()
+        self.addCleanup(drawn.stop)
+
+    def test_second_request_is_served_from_cache(self):
+        """Test that the template is only rendered on the first request"""
+        first = self.client.get("/privacy-policy/")
+        self.assertIsNotNone(first.context)
+        self.assertIn("ETag", first)
+
+        second = self.client.get("/privacy-policy/")
+        self.assertIsNone(second.context)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertIn("Cookie", second["Vary"])
+
+    def test_etag_revalidation_returns_not_modified(self):
+        """Test that a matching If-None-Match gets a 304"""
+        etag = self.client.get("/webinar/")["ETag"]
+        response = self.client.get("/webinar/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_consent_states_are_cached_separately(self):
+        """Test that each consent combination gets its own entry"""
+        self.client.get("/webinar/")
+        self.client.cookies["consent"] = sign_consent(has_consent=True)
+        response = self.client.get("/webinar/")
+        self.assertIsNotNone(response.context)
+
+        request = RequestFactory().get("/webinar/")
+        request.cookie_consent = {"has_consent": True, "analytics": False, "marketing": True}
+        self.assertEqual(consent_key(request), "101")
+
+    def test_saving_landing_page_invalidates_cache(self):
+        """Test that admin saves of campaigns and landings drop cached pages"""
+        self.client.get("/webinar/")
+        campaign = Campaign.objects.create(name="New Campaign")
+        self.assertIsNotNone(self.client.get("/webinar/").context)
+
+        LandingPage.objects.create(campaign=campaign, title="New Landing")
+        self.assertIsNotNone(self.client.get("/webinar/").context)
+        self.assertIsNone(self.client.get("/webinar/").context)
+
+    def test_generation_lives_in_the_shared_cache(self):
+        """Test that invalidation bumps the generation in GENERATION_CACHE"""
+        caches = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "shared": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "shared",
+            },
+        }
+        config = {**settings.LANDING_PAGE_CACHE, "GENERATION_CACHE": "shared"}
+        with self.settings(CACHES=caches, LANDING_PAGE_CACHE=config):
+            from django.core.cache import caches as handler
+
+            self.client.get("/webinar/")
+            Campaign.objects.create(name="Shared")
+            self.assertEqual(handler["shared"].get(GENERATION_KEY), 2)
+            self.assertIsNone(handler["default"].get(GENERATION_KEY))
+            self.assertIsNotNone(self.client.get("/webinar/").context)
+
+    def test_flash_messages_bypass_cache(self):
+        """Test that pages with pending messages are rendered live"""
+        self.client.get("/webinar/thank-you/")
+        response = self.client.post(
+            "/webinar/register/", {"name": "Test User", "email": "test@example.com"}, follow=True
+        )
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, "Registro exitoso")
+
+
+class PrerenderedPagesTest(TestCase):
+    """Tests for pre-rendered, pre-compressed landing pages"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        root = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(LANDING_PRERENDER={"ENABLED": True, "ROOT": root}))
+        call_command("prerender_landings", root=root, stdout=StringIO())
+
+    def setUp(self):
+        drawn = patch("landings.experiments.new_visitor_id", return_value="0" * 16)
+        drawn.start()
+        self.addCleanup(drawn.stop)
+
+    def test_gzip_variant_is_served_without_rendering(self):
+        """Test that gzip-capable clients get the pre-compressed bytes"""
+        response = self.client.get("/privacy-policy/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertIsNone(response.context)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        html = gzip.decompress(response.content).decode()
+        self.assertIn("Política de Privacidad", html)
+
+    def test_identity_variant_without_accept_encoding(self):
+        """Test that clients without compression support get plain HTML"""
+        response = self.client.get("/webinar/")
+        self.assertIsNone(response.context)
+        self.assertNotIn("Content-Encoding", response)
+        self.assertContains(response, "Master Class")
+
+    def test_etag_revalidation(self):
+        """Test that pre-rendered pages answer conditional requests"""
+        etag = self.client.get("/webinar/", HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+        self.assertTrue(etag.endswith('-gzip"'))
+        response = self.client.get(
+            "/webinar/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_dynamic_requests_fall_back_to_live_render(self):
+        """Test that pages with flash messages are rendered live"""
+        response = self.client.post(
+            "/webinar/register/", {"name": "Test User", "email": "test@example.com"}, follow=True
+        )
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, "Registro exitoso")
+
+    def test_accept_encoding_negotiation(self):
+        """Test parsing of Accept-Encoding q-values"""
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="br;q=0, gzip;q=0.8, identity")
+        self.assertEqual(accepted_encodings(request), {"gzip", "identity"})
+
+
+class LandingPageRoutingTest(TestCase):
+    """Tests for the /<slug>/ dispatcher and its in-process index"""
+
+    def setUp(self):
+        get_slug_index.cache_clear()
+        self.campaign = Campaign.objects.create(name="Spring Campaign")
+        self.landing = LandingPage.objects.create(
+            campaign=self.campaign,
+            title="Spring Webinar",
+            slug="spring-webinar",
+            meta_description="Spring edition",
+        )
+
+    def test_landing_is_served_by_slug(self):
+        """Test that a LandingPage slug renders its template"""
+        response = self.client.get("/spring-webinar/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["page_title"], "Spring Webinar")
+        self.assertEqual(response.context["landing"].campaign_name, "Spring Campaign")
+
+    def test_resolving_a_loaded_index_costs_no_queries(self):
+        """Test that resolution never hits the database once loaded"""
+        get_slug_index().load()
+        with self.assertNumQueries(0):
+            response = self.client.get("/spring-webinar/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_slug_returns_404(self):
+        """Test that slugs without a LandingPage are not found"""
+        response = self.client.get("/missing-landing/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_index_follows_model_signals(self):
+        """Test incremental updates on save, slug change and delete"""
+        index = get_slug_index()
+        index.load()
+
+        self.landing.slug = "summer-webinar"
+        self.landing.save()
+        self.assertIsNone(index.resolve("spring-webinar"))
+        self.assertEqual(index.resolve("summer-webinar").pk, self.landing.pk)
+
+        self.campaign.name = "Summer Campaign"
+        self.campaign.save()
+        self.assertEqual(index.resolve("summer-webinar").campaign_name, "Summer Campaign")
+
+        self.landing.delete()
+        self.assertIsNone(index.resolve("summer-webinar"))
+
+    def test_other_workers_follow_the_shared_version(self):
+        """Test that a change saved elsewhere reaches an already loaded index"""
+        # El índice de "otro worker": no recibe las señales de este proceso
+        other = SlugIndex(cache, check_interval=3600)
+        other.load()
+        with self.captureOnCommitCallbacks(execute=True):
+            LandingPage.objects.create(
+                campaign=self.campaign, title="Autumn Webinar", slug="autumn-webinar"
+            )
+        # Un slug desconocido consulta la versión aunque no toque comprobarla
+        self.assertEqual(other.resolve("autumn-webinar").title, "Autumn Webinar")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.campaign.name = "Autumn Campaign"
+            self.campaign.save()
+        self.assertEqual(other.resolve("spring-webinar").campaign_name, "Spring Campaign")
+        other.check_interval = 0
+        self.assertEqual(other.resolve("spring-webinar").campaign_name, "Autumn Campaign")
+        with self.assertNumQueries(0):
+            other.resolve("spring-webinar")
+
+    def test_other_workers_patch_only_the_changed_landings(self):
+        """Test that workers apply the changelog and reload all only when it has gaps"""
+        cache.set(VERSION_KEY, 1, timeout=None)
+        other = SlugIndex(cache, check_interval=0)
+        other.load()
+        autumn = LandingPage.objects.create(
+            campaign=self.campaign, title="Autumn Webinar", slug="autumn-webinar"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            autumn.slug = "fall-webinar"
+            autumn.save()
+            self.landing.delete()
+        with patch.object(other, "load") as load:
+            self.assertEqual(other.resolve("fall-webinar").title, "Autumn Webinar")
+        load.assert_not_called()
+        self.assertIsNone(other.resolve("autumn-webinar"))
+        self.assertIsNone(other.resolve("spring-webinar"))
+
+        # Un cambio que ya caducó de la caché obliga a recargar todo
+        with self.captureOnCommitCallbacks(execute=True):
+            autumn.title = "Otoño"
+            autumn.save()
+        cache.delete(f"{VERSION_KEY}:{cache.get(VERSION_KEY)}")
+        with patch.object(other, "load", wraps=other.load) as load:
+            self.assertEqual(other.resolve("fall-webinar").title, "Otoño")
+        load.assert_called_once()
+
+    def test_inactive_campaign_returns_404(self):
+        """Test that landings of inactive campaigns are not served"""
+        get_slug_index().load()
+        self.campaign.is_active = False
+        self.campaign.save()
+        response = self.client.get("/spring-webinar/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_fixed_routes_take_precedence(self):
+        """Test that hardcoded routes are not shadowed by the dispatcher"""
+        response = self.client.get("/privacy-policy/")
+        self.assertEqual(response.context["page_title"], "Política de Privacidad")
+
+
+class AsyncRequestPathTest(TestCase):
+    """Tests for the native async views under the ASGI handler"""
+
+    async def test_async_landing_and_privacy_views(self):
+        """Test that async views render through AsyncClient"""
+        for url in ["/webinar/", "/privacy-policy/", "/privacy-policy-technical/", "/webinar/thank-you/"]:
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["X-Frame-Options"], "DENY")
+
+    async def test_async_registration_creates_lead(self):
+        """Test that registration uses the async ORM end to end"""
+        response = await self.async_client.post(
+            "/webinar/register/", {"name": "Async User", "email": "async@example.com"}
+        )
+        self.assertRedirects(response, "/webinar/thank-you/", fetch_redirect_response=False)
+        lead = await Lead.objects.aget(email="async@example.com")
+        self.assertEqual(lead.source, "webinar")
+
+    async def test_async_path_with_stored_session(self):
+        """Test that a database-backed session is loaded without sync ORM calls"""
+        from django.contrib.sessions.backends.db import SessionStore
+
+        session = SessionStore()
+        await session.aset("visited", True)
+        await session.asave()
+        self.async_client.cookies["sessionid"] = session.session_key
+        self.async_client.cookies["consent"] = sign_consent(has_consent=True, analytics=True)
+
+        response = await self.async_client.get("/webinar/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("DNT", response)
+
+    def test_privacy_middlewares_are_async_capable(self):
+        """Test that the privacy middlewares run natively in async mode"""
+        from asgiref.sync import iscoroutinefunction
+
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(CookieConsentMiddleware.async_capable)
+        self.assertTrue(iscoroutinefunction(CookieConsentMiddleware(get_response)))
+        self.assertFalse(
+            iscoroutinefunction(CookieConsentMiddleware(lambda request: HttpResponse()))
+        )
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        now = timezone.now()
+        # Two campaigns share a timestamp to exercise the pk tie-breaker
+        for i, minutes in enumerate([1, 2, 3, 3, 4, 5, 6]):
+            campaign = Campaign.objects.create(name=f"Campaign {i}")
+            Campaign.objects.filter(pk=campaign.pk).update(
+                created_at=now - timedelta(minutes=minutes)
+            )
+        self.url = reverse("admin:landings_campaign_changelist")
+        self.expected = list(
+            Campaign.objects.order_by("-created_at", "-pk").values_list("name", flat=True)
+        )
+
+    def page(self, query_string=""):
+        response = self.client.get(self.url + query_string)
+        self.assertEqual(response.status_code, 200)
+        cl = response.context["cl"]
+        return cl, [campaign.name for campaign in cl.result_list]
+
+    @patch.object(CampaignAdmin, "list_per_page", 3)
+    def test_walks_forward_and_back(self):
+        """Test that next/previous cursors cover every row exactly once"""
+        cl, names = self.page()
+        self.assertEqual(names, self.expected[:3])
+        self.assertIsNone(cl.previous_page_url)
+
+        cl, names = self.page(cl.next_page_url)
+        self.assertEqual(names, self.expected[3:6])
+        cl, names = self.page(cl.next_page_url)
+        self.assertEqual(names, self.expected[6:])
+        self.assertIsNone(cl.next_page_url)
+
+        cl, names = self.page(cl.previous_page_url)
+        self.assertEqual(names, self.expected[3:6])
+        cl, names = self.page(cl.previous_page_url)
+        self.assertEqual(names, self.expected[:3])
+        self.assertIsNone(cl.previous_page_url)
+        self.assertEqual(cl.result_count, 7)
+
+    @patch.object(CampaignAdmin, "list_per_page", 3)
+    def test_deep_pages_run_the_same_queries(self):
+        """Test that a later page costs the same number of queries as the first"""
+        cl, _ = self.page()
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+        with self.assertNumQueries(4) as deep:
+            self.client.get(self.url + cl.next_page_url)
+        for query in deep.captured_queries:
+            self.assertNotIn("OFFSET", query["sql"])
+
+    def test_cursor_keeps_filters(self):
+        """Test that page links preserve the active filters"""
+        with patch.object(CampaignAdmin, "list_per_page", 1):
+            cl, _ = self.page("?is_active__exact=1")
+        self.assertIn("is_active__exact=1", cl.next_page_url)
+        self.assertIn("cursor=", cl.next_page_url)
+
+    def test_invalid_cursor(self):
+        """Test that a tampered cursor is handled like any bad lookup"""
+        response = self.client.get(self.url + "?cursor=garbage")
+        self.assertRedirects(response, self.url + "?e=1", fetch_redirect_response=False)
+
+
 class CookieConsentMiddlewareTest(TestCase):
     """Tests for CookieConsentMiddleware functionality through requests"""
 
@@ -165,10 +770,10 @@ class CookieConsentMiddlewareDetailedTest(TestCase):
 
     def test_middleware_with_consent_cookies(self):
         """Test middleware behavior with consent cookies set"""
-        # Set consent cookies
-        self.client.cookies['cookie-consent'] = 'accepted'
-        self.client.cookies['analytics-consent'] = 'true'
-        self.client.cookies['marketing-consent'] = 'true'
+        # Set the signed consent cookie
+        self.client.cookies['consent'] = sign_consent(
+            has_consent=True, analytics=True, marketing=True
+        )
 
         response = self.client.get('/webinar/')
         self.assertEqual(response.status_code, 200)
@@ -179,15 +784,451 @@ class CookieConsentMiddlewareDetailedTest(TestCase):
         self.client.cookies.clear()
 
 
-class DataRetentionMiddlewareTest(TestCase):
-    """Tests for DataRetentionMiddleware"""
+class DataRetentionTest(TestCase):
+    """Retention runs in the background engine, not per request"""
 
-    def test_middleware_does_not_break_requests(self):
-        """Test that data retention middleware doesn't break normal requests"""
+    def test_retention_is_not_on_the_request_path(self):
+        """Test that no retention middleware runs on every request"""
+        self.assertFalse(any("Retention" in path for path in settings.MIDDLEWARE))
         response = self.client.get('/webinar/')
         self.assertEqual(response.status_code, 200)
 
 
+class ConsentCookieTest(TestCase):
+    """Tests for the signed consent cookie fast path"""
+
+    def process(self, **extra):
+        request = RequestFactory().get('/webinar/', **extra)
+
+        class Untouchable:
+            def __getattr__(self, name):
+                raise AssertionError("the session must not be read")
+
+        request.session = Untouchable()
+        CookieConsentMiddleware(lambda request: HttpResponse()).process_request(request)
+        return request
+
+    def test_signed_cookie_is_decoded_without_the_session(self):
+        """Test that consent comes only from the signed cookie"""
+        value = sign_consent(has_consent=True, marketing=True)
+        request = self.process(HTTP_COOKIE=f'consent={value}')
+        self.assertEqual(
+            dict(request.cookie_consent),
+            {'has_consent': True, 'analytics': False, 'marketing': True},
+        )
+        self.assertIs(request.cookie_consent, decode_consent(value))
+
+    def test_tampered_cookies_mean_no_consent(self):
+        """Test that unsigned values are ignored"""
+        self.assertIs(decode_consent('111'), NO_CONSENT)
+        self.assertIs(decode_consent(sign_consent(has_consent=True)[:-1] + 'x'), NO_CONSENT)
+        request = self.process(HTTP_COOKIE='consent=111')
+        self.assertIs(request.cookie_consent, NO_CONSENT)
+
+    def test_legacy_cookies_are_migrated_once(self):
+        """Test that the old unsigned cookies become the signed cookie"""
+        self.client.cookies.load({
+            'cookie-consent': 'accepted',
+            'analytics-consent': 'true',
+            'marketing-consent': 'false',
+        })
+        response = self.client.get('/webinar/')
+        self.assertNotIn('DNT', response)
+        self.assertEqual(
+            dict(decode_consent(response.cookies['consent'].value)),
+            {'has_consent': True, 'analytics': True, 'marketing': False},
+        )
+        for name in ('cookie-consent', 'analytics-consent', 'marketing-consent'):
+            self.assertEqual(response.cookies[name]['max-age'], 0)
+
+        # Con la cookie firmada ya no se vuelve a migrar
+        response = self.client.get('/webinar/')
+        self.assertNotIn('consent', response.cookies)
+
+        request = self.process(HTTP_COOKIE='cookie-consent=rejected')
+        self.assertIs(request.cookie_consent, NO_CONSENT)
+
+    def test_ipv4_and_ipv6_are_truncated(self):
+        """Test that IPs keep only their network prefix without consent"""
+        self.assertEqual(anonymize_ip('192.168.1.100'), '192.168.0.0')
+        self.assertEqual(anonymize_ip('2001:db8:abcd:12:1:2:3:4'), '2001:db8:abcd::')
+        self.assertEqual(anonymize_ip('::ffff:10.1.2.3'), '10.1.0.0')
+        self.assertEqual(anonymize_ip('not-an-ip'), '')
+        request = self.process(REMOTE_ADDR='2a00:1450:4003:80a::200e')
+        self.assertEqual(request.META['REMOTE_ADDR'], '2a00:1450:4003::')
+        self.assertEqual(
+            anonymize_user_agent('Mozilla/5.0 AppleWebKit Chrome/91.0 Safari/537.36'),
+            'Chrome (Anonimizado)',
+        )
+
+    def test_consent_is_kept_with_consent(self):
+        """Test that the address is untouched once analytics is accepted"""
+        value = sign_consent(has_consent=True, analytics=True)
+        request = self.process(HTTP_COOKIE=f'consent={value}', REMOTE_ADDR='2001:db8::1')
+        self.assertEqual(request.META['REMOTE_ADDR'], '2001:db8::1')
+
+        # Solo las esenciales: el banner se cierra pero se sigue anonimizando
+        value = sign_consent(has_consent=True)
+        request = self.process(HTTP_COOKIE=f'consent={value}', REMOTE_ADDR='2001:db8::1')
+        self.assertEqual(request.META['REMOTE_ADDR'], '2001:db8::')
+
+    def test_update_consent_sets_signed_cookie(self):
+        """Test the consent endpoint and its cross-site guard"""
+        url = reverse('landings:update_consent')
+        response = self.client.post(url, {'choice': 'all'})
+        self.assertEqual(response.status_code, 204)
+        cookie = response.cookies['consent']
+        self.assertTrue(cookie['httponly'])
+        self.assertEqual(dict(decode_consent(cookie.value)), dict.fromkeys(
+            ('has_consent', 'analytics', 'marketing'), True
+        ))
+        self.assertNotIn('DNT', self.client.get('/webinar/'))
+
+        response = self.client.post(url, {'choice': 'essential'})
+        self.assertEqual(
+            dict(decode_consent(response.cookies['consent'].value)),
+            {'has_consent': True, 'analytics': False, 'marketing': False},
+        )
+        response = self.client.get('/webinar/')
+        self.assertEqual(response['DNT'], '1')
+        self.assertNotContains(response, 'id="cookie-banner"')
+
+        response = self.client.post(url, {'choice': 'all'}, HTTP_SEC_FETCH_SITE='cross-site')
+        self.assertEqual(response.status_code, 403)
+
+    def test_benchmark_consent_command(self):
+        """Test that the micro-benchmark reports microseconds per request"""
+        out = StringIO()
+        call_command('benchmark_consent', iterations=200, stdout=out)
+        self.assertIn('µs', out.getvalue())
+        self.assertIn('ipv6', out.getvalue())
+
+
+class ExperimentTest(TestCase):
+    """Tests for hash-based A/B assignment and pre-rendered banner fragments"""
+
+    def setUp(self):
+        get_experiment_stats.cache_clear()
+        banner_fragments.cache_clear()
+
+    def tearDown(self):
+        get_experiment_stats.cache_clear()
+
+    def visitor_for(self, variant, experiment=BANNER_EXPERIMENT):
+        weights = settings.EXPERIMENTS["TESTS"][experiment]
+        return next(
+            vid for vid in (f"{n:016d}" for n in range(1000))
+            if bucket(experiment, vid, weights) == variant
+        )
+
+    def test_bucketing_is_deterministic_and_weighted(self):
+        """Test that the same ID always lands in the same weighted variant"""
+        weights = {"a": 3, "b": 1}
+        counts = Counter(bucket("test", f"visitor-{n}", weights) for n in range(8000))
+        self.assertAlmostEqual(counts["a"] / 8000, 0.75, delta=0.03)
+        self.assertEqual(bucket("test", "visitor-1", weights), bucket("test", "visitor-1", weights))
+
+    def draw(self, variant):
+        """Hace que el ID de la próxima petición sin consentimiento caiga en ``variant``"""
+        return patch("landings.experiments.new_visitor_id", return_value=self.visitor_for(variant))
+
+    def test_no_visitor_cookie_before_consent(self):
+        """Test that visitors without consent get a banner but no ID cookie"""
+        with self.draw("2"):
+            response = self.client.get("/webinar/")
+        self.assertNotIn("vid", response.cookies)
+        self.assertContains(response, 'data-variant="2"')
+        self.assertContains(response, 'id="cookie-banner"', count=1)
+
+        # Una cookie de antes del consentimiento no se usa y se borra
+        self.client.cookies["vid"] = self.visitor_for("3")
+        with self.draw("1"):
+            response = self.client.get("/webinar/")
+        self.assertContains(response, 'data-variant="1"')
+        self.assertEqual(response.cookies["vid"].value, "")
+
+    def test_analytics_consent_sets_visitor_cookie(self):
+        """Test that the ID cookie is set once the visitor accepts analytics"""
+        self.client.cookies["consent"] = sign_consent(has_consent=True, analytics=True)
+        response = self.client.get("/webinar/")
+        self.assertTrue(VISITOR_ID_RE.fullmatch(response.cookies["vid"].value))
+        self.assertTrue(response.cookies["vid"]["httponly"])
+
+        # Visitas siguientes conservan el ID y no vuelven a enviar la cookie
+        response = self.client.get("/webinar/")
+        self.assertNotIn("vid", response.cookies)
+
+        self.client.cookies["consent"] = sign_consent(has_consent=True)
+        self.assertEqual(self.client.get("/webinar/").cookies["vid"].value, "")
+
+    def test_consent_hides_banner(self):
+        """Test that visitors who already chose see no banner"""
+        self.client.cookies["consent"] = sign_consent(has_consent=True)
+        self.assertNotContains(self.client.get("/webinar/"), "cookie-banner")
+
+    def test_each_variant_has_its_own_cached_page(self):
+        """Test that the page cache key includes the banner variant"""
+        for variant in ("1", "2"):
+            for _ in range(2):
+                with self.draw(variant):
+                    response = self.client.get("/webinar/")
+                self.assertContains(response, f'data-variant="{variant}"')
+
+    def test_views_and_conversions_are_flushed_in_batches(self):
+        """Test that stats stay in memory until the flush"""
+        for variant in ("3", "3", "1"):
+            with self.draw(variant):
+                self.client.get("/webinar/")
+        # La conversión va a la variante que mostró la página, no a un ID
+        self.client.post(reverse("landings:update_consent"), {"choice": "all", "variant": "9"})
+        self.client.cookies.pop("consent")
+        self.client.post(reverse("landings:update_consent"), {"choice": "all", "variant": "3"})
+        self.assertFalse(ExperimentDailyStats.objects.exists())
+
+        self.assertEqual(get_experiment_stats().flush(), 2)
+        stats = ExperimentDailyStats.objects.get(variant="3")
+        self.assertEqual(
+            (stats.experiment, stats.views, stats.conversions), (BANNER_EXPERIMENT, 2, 1)
+        )
+        self.assertEqual(ExperimentDailyStats.objects.get(variant="1").conversions, 0)
+
+    def test_only_landing_views_count_banner_views(self):
+        """Test that other pages rendering with the context processor record nothing"""
+        with self.draw("2"):
+            self.client.get("/privacy-policy/")
+            self.client.get("/no-existe/")
+            self.client.get(reverse("admin:login"))
+        get_experiment_stats().flush()
+        self.assertFalse(ExperimentDailyStats.objects.exists())
+
+        with self.draw("2"):
+            self.client.get("/webinar/")
+        get_experiment_stats().flush()
+        self.assertEqual(ExperimentDailyStats.objects.get(variant="2").views, 1)
+
+    def test_landing_template_experiment(self):
+        """Test that landing:<slug> experiments swap the template for consenting visitors"""
+        get_slug_index.cache_clear()
+        campaign = Campaign.objects.create(name="AB Campaign")
+        LandingPage.objects.create(campaign=campaign, title="AB Landing", slug="ab-landing")
+        tests = {
+            **settings.EXPERIMENTS["TESTS"],
+            "landing:ab-landing": {"webinar.html": 1, "webinar_thank_you.html": 1},
+        }
+        with self.settings(EXPERIMENTS={**settings.EXPERIMENTS, "TESTS": tests}):
+            visitor_id = self.visitor_for("webinar_thank_you.html", "landing:ab-landing")
+            self.client.cookies["vid"] = visitor_id
+            response = self.client.get("/ab-landing/")
+            self.assertTemplateUsed(response, "landings/webinar.html")
+            self.assertTemplateNotUsed(response, "landings/webinar_thank_you.html")
+
+            self.client.cookies["consent"] = sign_consent(has_consent=True, analytics=True)
+            self.client.cookies["vid"] = visitor_id
+            response = self.client.get("/ab-landing/")
+        self.assertTemplateUsed(response, "landings/webinar_thank_you.html")
+        get_slug_index.cache_clear()
+
+    def test_prerendered_pages_include_banner_variants(self):
+        """Test that every banner variant is pre-rendered for visitors without consent"""
+        root = self.enterContext(tempfile.TemporaryDirectory())
+        call_command("prerender_landings", root=root, stdout=StringIO())
+        manifest = json.loads((Path(root) / "manifest.json").read_text())
+        for variant in ("1", "2", "3", "4"):
+            self.assertIn(f"000.b{variant}:/webinar/", manifest)
+        self.assertIn("111:/webinar/", manifest)
+        self.assertNotIn("111.b1:/webinar/", manifest)
+
+
+class RegistrationGuardTest(TestCase):
+    """Tests for the registration bot filter and rate limiter"""
+
+    def setUp(self):
+        cache.clear()
+        reset_guard_counters()
+        get_rate_limiters.cache_clear()
+        self.url = reverse("landings:register_webinar_lead")
+
+    def tearDown(self):
+        get_rate_limiters.cache_clear()
+
+    def post(self, email="lead@example.com", follow=False, **extra):
+        data = {"name": "Test User", "email": email, **extra}
+        return self.client.post(self.url, data, REMOTE_ADDR="203.0.113.7", follow=follow)
+
+    def test_honeypot_is_rejected_before_any_query(self):
+        """Test that a filled honeypot looks like success but writes nothing"""
+        with self.assertNumQueries(0):
+            response = self.post(website="http://spam.example")
+        self.assertRedirects(response, "/webinar/thank-you/", fetch_redirect_response=False)
+        self.assertFalse(Lead.objects.exists())
+        self.assertEqual(guard_counters(), {"honeypot": 1})
+
+    def test_timing_and_link_heuristics(self):
+        """Test that links in the name are dropped and fast forms are sent back"""
+        self.client.post(self.url, {"name": "Buy https://spam.example", "email": "b@example.com"})
+        response = self.post(fill_ms="800", follow=True)
+        self.assertContains(response, "envía el formulario de nuevo")
+        self.assertFalse(Lead.objects.exists())
+
+        self.post(fill_ms="10000")
+        self.assertTrue(Lead.objects.filter(email="lead@example.com").exists())
+        self.assertEqual(guard_counters(), {"too_fast": 1, "link_in_name": 1, "accepted": 1})
+
+    async def test_async_check_keeps_shared_limits_off_the_event_loop(self):
+        """Test that the cache round-trips of the limiters run in a worker thread"""
+        threads = []
+
+        def allow(limiter, key):
+            threads.append(threading.current_thread())
+            return True
+
+        config = {**settings.REGISTRATION_GUARD, "RATE_LIMIT": True}
+        request = RequestFactory().post(
+            self.url, {"name": "Test User", "email": "a@example.com"}, REMOTE_ADDR="203.0.113.7"
+        )
+        with self.settings(REGISTRATION_GUARD=config):
+            with patch.object(SharedRateLimiter, "allow", allow):
+                verdict = await acheck_registration(request, "a@example.com")
+        self.assertEqual(verdict, ACCEPTED)
+        self.assertTrue(threads)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_rate_limit_by_client_network_and_domain(self):
+        """Test per-client buckets, the shared /16 limit and the domain limit"""
+        config = {
+            **settings.REGISTRATION_GUARD,
+            "RATE_LIMIT": True,
+            "IP_RATE": (2, 60),
+            "NETWORK_RATE": (3, 60),
+            "DOMAIN_RATE": (4, 60),
+        }
+
+        def post(email, ip):
+            return self.client.post(
+                self.url, {"name": "Test User", "email": email}, REMOTE_ADDR=ip, follow=True
+            )
+
+        with self.settings(REGISTRATION_GUARD=config):
+            post("a@example.com", "203.0.113.7")
+            post("b@example.com", "203.0.113.7")
+            self.assertContains(post("c@example.com", "203.0.113.7"), "Demasiados intentos")
+            # Otro cliente detrás de la misma /16 tiene su propio cubo...
+            post("d@example.com", "203.0.113.8")
+            # ...hasta agotar el límite grueso de la red
+            self.assertContains(post("e@example.com", "203.0.9.9"), "Demasiados intentos")
+            # Otra red pasa, hasta agotar el cubo del dominio
+            post("f@example.com", "198.51.100.1")
+            post("g@example.com", "192.0.2.1")
+        self.assertEqual(Lead.objects.count(), 4)
+        self.assertEqual(guard_counters(), {
+            "accepted": 4,
+            "rate_limited_ip": 1,
+            "rate_limited_network": 1,
+            "rate_limited_domain": 1,
+        })
+
+    def test_token_bucket_refills(self):
+        """Test local refill and the shared per-window counter"""
+        limiter = LocalRateLimiter(capacity=2, period=10)
+        self.assertTrue(limiter.allow("k", now=0))
+        self.assertTrue(limiter.allow("k", now=0))
+        self.assertFalse(limiter.allow("k", now=1))
+        self.assertTrue(limiter.allow("k", now=5))
+
+        shared = SharedRateLimiter(cache, "rl:test", capacity=1, period=60)
+        self.assertTrue(shared.allow("k", now=0))
+        self.assertFalse(shared.allow("k", now=30))
+        self.assertTrue(shared.allow("k", now=61))
+
+    def test_counters_are_exposed_to_staff(self):
+        """Test the monitoring endpoint"""
+        stats_url = reverse("landings:registration_guard_stats")
+        self.assertEqual(self.client.get(stats_url).status_code, 302)
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        self.post(website="x")
+        self.assertEqual(self.client.get(stats_url).json(), {"honeypot": 1})
+
+
+@skipUnless(hasattr(os, "fork"), "Needs os.fork")
+class BackgroundForkTest(SimpleTestCase):
+    """Tests for background threads under a preloading (forking) server"""
+
+    # The slug index refresher reads the landings from its own thread
+    databases = {"default"}
+
+    def test_flushers_restart_in_forked_child(self):
+        """Test that a forked worker gets its own live refresher threads"""
+        flushed = threading.Event()
+        flusher = PeriodicFlusher(flushed.set, 0.01, "test-flusher", flush_on_exit=False)
+        index = SlugIndex()
+        index.start(3600)
+        flusher.start()
+        self.addCleanup(flusher.stop)
+        self.addCleanup(index._refresher.stop)
+
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # Child: report through the pipe and leave without running unittest
+            flushed.clear()
+            ok = index._refresher.is_alive() and flushed.wait(5)
+            os.write(write_end, b"1" if ok else b"0")
+            os._exit(0)
+        os.close(write_end)
+        self.assertEqual(os.read(read_end, 1), b"1")
+        os.close(read_end)
+        os.waitpid(pid, 0)
+        self.assertTrue(flusher.is_alive())
+
+
+class FunnelBenchmarkTest(TransactionTestCase):
+    """Tests for the funnel benchmark drivers and the baseline comparison"""
+
+    def test_seed_and_drive_the_funnel(self):
+        """Test that both a client and a real WSGI server complete the funnel"""
+        self.assertEqual(generate(2, 3, 25)["landings"], 6)
+        self.assertEqual(LandingPage.objects.count(), 6)
+        self.assertEqual(Lead.objects.count(), 25)
+
+        samples, elapsed = run_threads(ClientUser, 1, 2, "client")
+        with wsgi_server() as url:
+            http_samples, _ = run_threads(lambda: HttpUser(url), 1, 2, "http")
+        result = summarize(samples + http_samples, elapsed)
+        self.assertEqual((result["requests"], result["errors"]), (12, 0))
+        self.assertEqual(Lead.objects.filter(email__startswith="bench-").count(), 4)
+        self.assertLessEqual(
+            result["steps"]["register"]["p50"], result["steps"]["register"]["p99"]
+        )
+
+    def test_regressions_against_baseline(self):
+        """Test the threshold on req/s, p50/p95 and errors"""
+        step = {"requests": 10, "errors": 0, "p50": 10.0, "p95": 20.0, "p99": 30.0}
+        baseline = {"rps": 100.0, "errors": 0, "steps": {"landing": step}}
+        same = {**baseline, "steps": {"landing": {**step, "p99": 90.0}}}
+        self.assertEqual(regressions(same, baseline, 0.2), [])
+
+        slower = {
+            "rps": 70.0,
+            "errors": 1,
+            "steps": {"landing": {**step, "p95": 25.0}},
+        }
+        self.assertEqual(
+            regressions(slower, baseline, 0.2),
+            ["req/s: 70.0 < 100.0", "landing p95: 25.00 ms > 20.00 ms", "errores: 1 > 0"],
+        )
+
+    def test_baseline_file_roundtrip(self):
+        """Test that saved baselines are loaded back per scenario"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "funnel.json"
+            self.assertEqual(load_baselines(path), {})
+            save_baseline(path, "a", {"rps": 1.0, "steps": {}})
+            save_baseline(path, "b", {"rps": 2.0, "steps": {}})
+            self.assertEqual(load_baselines(path)["a"]["rps"], 1.0)
+            self.assertEqual(set(load_baselines(path)), {"a", "b"})
+
+
 class IntegrationTest(TestCase):
     """Integration tests for complete user flows"""
 
@@ -249,10 +1290,10 @@ class IntegrationTest(TestCase):
         leads = Lead.objects.filter(email='existente@example.com')
         self.assertEqual(leads.count(), 1)
 
-    @patch('landings.views.Lead.objects.create')
+    @patch('landings.views.asave_leads')
     def test_registration_with_unexpected_error(self, mock_create):
-        """Test registration with unexpected error (covers exception else block)"""
-        # Mock Lead.objects.create to raise a non-IntegrityError exception
+        """Test registration with unexpected error (covers exception block)"""
+        # Mock asave_leads to raise an unexpected exception
         mock_create.side_effect = Exception("Unexpected database error")
 
         lead_data = {
@@ -267,11 +1308,11 @@ class IntegrationTest(TestCase):
         self.assertRedirects(response, '/webinar/')
 
         # Verify the mock was called
-        mock_create.assert_called_once_with(
-            name='Test User',
-            email='test@example.com',
-            phone='+56912345678',
-            source='webinar'
+        mock_create.assert_called_once()
+        [lead] = mock_create.call_args.args[0]
+        self.assertEqual(
+            (lead.name, lead.email, lead.phone, lead.source),
+            ('Test User', 'test@example.com', '+56912345678', 'webinar'),
         )
 
     def test_register_webinar_lead_get_request(self):
@@ -427,10 +1468,10 @@ class PrivacyViewsTest(TestCase):
         # No lead should be created
         self.assertEqual(Lead.objects.count(), 0)
 
-    @patch('landings.views.Lead.objects.create')
+    @patch('landings.views.asave_leads')
     def test_registration_with_unexpected_error(self, mock_create):
-        """Test registration with unexpected error (covers exception else block)"""
-        # Mock Lead.objects.create to raise a non-IntegrityError exception
+        """Test registration with unexpected error (covers exception block)"""
+        # Mock asave_leads to raise an unexpected exception
         mock_create.side_effect = Exception("Unexpected database error")
 
         lead_data = {
@@ -445,11 +1486,11 @@ class PrivacyViewsTest(TestCase):
         self.assertRedirects(response, '/webinar/')
 
         # Verify the mock was called
-        mock_create.assert_called_once_with(
-            name='Test User',
-            email='test@example.com',
-            phone='+56912345678',
-            source='webinar'
+        mock_create.assert_called_once()
+        [lead] = mock_create.call_args.args[0]
+        self.assertEqual(
+            (lead.name, lead.email, lead.phone, lead.source),
+            ('Test User', 'test@example.com', '+56912345678', 'webinar'),
         )
 
     def test_privacy_policy_integration(self):
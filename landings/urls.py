@@ -3,7 +3,8 @@ from . import views
 
 app_name = "landings"
 
-urlpatterns = [
+# Lo que sirve también el perfil "public" (mysite.urls_public)
+public_urlpatterns = [
     path("", views.home, name="home"),
     path("webinar/", views.webinar_landing, name="webinar_landing"),
     path(
@@ -12,4 +13,16 @@ urlpatterns = [
     path("webinar/thank-you/", views.webinar_thank_you, name="webinar_thank_you"),
     path("privacy-policy/", views.privacy_policy, name="privacy_policy"),
     path("privacy-policy-technical/", views.privacy_policy_technical, name="privacy_policy_technical"),
+    path("consent/", views.update_consent, name="update_consent"),
+    # Debe ir al final: cualquier otro slug se resuelve como LandingPage
+    path("<slug:slug>/", views.landing_page, name="landing_page"),
+]
+
+urlpatterns = [
+    path(
+        "webinar/register/stats/",
+        views.registration_guard_stats,
+        name="registration_guard_stats",
+    ),
+    *public_urlpatterns,
 ]
@@ -1,23 +1,67 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import user_passes_test
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from analytics.ingestion import QueueFull, get_lead_buffer, invalid_lead_fields
 from analytics.models import Lead  # pragma: no cover
+from analytics.outbox import asave_leads
 
+from .cache import aload_session, cache_landing_page
+from .consent import set_consent_cookie
+from .experiments import BANNER_EXPERIMENT, convert, counts_banner_view, landing_variant
+from .counters import counts_views, get_counters
+from .prerender import serve_prerendered
+from .routing import get_slug_index
+from .spam import ACCEPTED, BOT_VERDICTS, TOO_FAST, acheck_registration, guard_counters
 
-def home(request):
+
+async def home(request):
     """Home page - redirects to main webinar landing"""
     return redirect("landings:webinar_landing")
 
 
-def webinar_landing(request):
+async def _arender(request, template_name, context=None):
+    """Render after loading the session asynchronously (templates read it)"""
+    await aload_session(request)
+    return render(request, template_name, context)
+
+
+@counts_views(slug=settings.WEBINAR_LANDING_SLUG)
+@counts_banner_view
+@serve_prerendered
+@cache_landing_page
+async def webinar_landing(request):
     """Main webinar landing page"""
     context = {
         "page_title": "Webinar Exclusivo",
         "meta_description": "Descubre cómo transformar tu negocio en solo 60 minutos",
     }
-    return render(request, "landings/webinar.html", context)
+    return await _arender(request, "landings/webinar.html", context)
+
+
+@counts_views()
+@counts_banner_view
+@cache_landing_page
+def landing_page(request, slug):
+    """Data-driven landing page resolved through the in-process slug index"""
+    route = get_slug_index().resolve(slug)
+    if route is None or not route.campaign_is_active:
+        raise Http404("Landing no encontrada")
+
+    context = {
+        "page_title": route.title,
+        "meta_description": route.meta_description,
+        "landing": route,
+    }
+    template = landing_variant(request, slug) or route.template
+    return render(request, f"landings/{template}", context)
 
 
-def register_webinar_lead(request):
+async def register_webinar_lead(request):
     """Handle webinar lead registration"""
     if request.method == "POST":
         name = request.POST.get("name")
@@ -28,50 +72,145 @@ def register_webinar_lead(request):
         if not name or not email:
             messages.error(request, "Por favor completa todos los campos requeridos.")
             return redirect("landings:webinar_landing")
+        # Longitudes y email antes de encolar: un registro que no cabe en la
+        # tabla haría fallar el lote entero
+        if invalid_lead_fields({"name": name, "email": email, "phone": phone}):
+            messages.error(
+                request, "Revisa tus datos: el nombre, el email o el teléfono no son válidos."
+            )
+            return redirect("landings:webinar_landing")
 
-        # Guardar el lead
-        try:
-            Lead.objects.create(name=name, email=email, phone=phone, source="webinar")
-
+        # Bots y ráfagas se descartan antes de tocar la base de datos
+        verdict = await acheck_registration(request, email)
+        if verdict in BOT_VERDICTS:
+            # Al bot se le responde igual que a una persona
             messages.success(request, "¡Registro exitoso! Te contactaremos pronto.")
             return redirect("landings:webinar_thank_you")
+        if verdict == TOO_FAST:
+            # Puede ser una persona con autocompletado: se le pide repetir
+            messages.error(
+                request,
+                "No pudimos confirmar tu registro. Revisa tus datos y envía el formulario de nuevo.",
+            )
+            return redirect("landings:webinar_landing")
+        if verdict != ACCEPTED:
+            messages.error(
+                request,
+                "Demasiados intentos de registro. Por favor intenta nuevamente en un minuto.",
+            )
+            return redirect("landings:webinar_landing")
+
+        buffered = settings.LEAD_INGESTION["MODE"] == "buffered"
+
+        # Lectura sobre el índice único de email normalizado: un duplicado se
+        # resuelve en una consulta, sin intentar el INSERT
+        if (
+            buffered and get_lead_buffer().is_pending(email)
+        ) or await Lead.objects.registered(email).aexists():
+            messages.warning(
+                request,
+                "Este email ya está registrado. Te contactaremos pronto si aún no lo hemos hecho.",
+            )
+            return redirect("landings:webinar_thank_you")
+
+        if buffered:
+            return await _enqueue_webinar_lead(request, name, email, phone)
+
+        # Guardar el lead y sus notificaciones; si otro registro gana la
+        # carrera, ON CONFLICT lo absorbe
+        try:
+            await asave_leads(
+                [Lead(name=name, email=email, phone=phone, source="webinar")]
+            )
+        except Exception:
+            messages.error(
+                request,
+                "Hubo un error en el registro. Por favor intenta nuevamente.",
+            )
+            return redirect("landings:webinar_landing")
 
-        except Exception as e:
-            # Manejar específicamente el error de email duplicado
-            if "UNIQUE constraint failed" in str(e) or "duplicate key value" in str(e):
-                messages.warning(
-                    request,
-                    "Este email ya está registrado. Te contactaremos pronto si aún no lo hemos hecho.",
-                )
-                return redirect("landings:webinar_thank_you")
-            else:
-                messages.error(
-                    request,
-                    "Hubo un error en el registro. Por favor intenta nuevamente.",
-                )
-                return redirect("landings:webinar_landing")
+        get_counters().record_conversion(settings.WEBINAR_LANDING_SLUG)
+        messages.success(request, "¡Registro exitoso! Te contactaremos pronto.")
+        return redirect("landings:webinar_thank_you")
 
     return redirect("landings:webinar_landing")
 
 
-def webinar_thank_you(request):
+async def _enqueue_webinar_lead(request, name, email, phone):
+    """Buffered registration: queue the lead and let the flusher write it"""
+    try:
+        # submit() escribe en disco y puede esperar por espacio: fuera del event loop
+        await sync_to_async(get_lead_buffer().submit, thread_sensitive=False)(
+            {"name": name, "email": email, "phone": phone, "source": "webinar"}
+        )
+    except QueueFull:
+        messages.error(
+            request,
+            "Estamos recibiendo muchos registros. Por favor intenta nuevamente en unos segundos.",
+        )
+        return redirect("landings:webinar_landing")
+
+    get_counters().record_conversion(settings.WEBINAR_LANDING_SLUG)
+    messages.success(request, "¡Registro exitoso! Te contactaremos pronto.")
+    return redirect("landings:webinar_thank_you")
+
+
+@csrf_exempt
+@require_POST
+async def update_consent(request):
+    """Store the visitor's cookie choice in the signed consent cookie"""
+    # Las páginas cacheadas no llevan token CSRF: se rechazan los POST de otros sitios
+    if request.headers.get("Sec-Fetch-Site", "same-origin") not in ("same-origin", "none"):
+        return HttpResponseForbidden()
+    choice = request.POST.get("choice")
+    if choice in ("all", "essential"):
+        analytics = marketing = choice == "all"
+    else:
+        analytics = request.POST.get("analytics") == "true"
+        marketing = request.POST.get("marketing") == "true"
+    if analytics or marketing:
+        # Sin cookie de visitante: la página envía la variante que mostró
+        convert(request, BANNER_EXPERIMENT, request.POST.get("variant"))
+    return set_consent_cookie(
+        HttpResponse(status=204),
+        # Cualquier elección explícita cierra el banner, también "essential"
+        has_consent=True,
+        analytics=analytics,
+        marketing=marketing,
+    )
+
+
+# Como staff_member_required, sin importar el admin en los workers públicos
+@user_passes_test(lambda user: user.is_active and user.is_staff, login_url="admin:login")
+def registration_guard_stats(request):
+    """Per-process counters of the registration bot filter and rate limiter"""
+    return JsonResponse(guard_counters())
+
+
+@serve_prerendered
+@cache_landing_page
+async def webinar_thank_you(request):
     """Thank you page after registration"""
-    return render(request, "landings/webinar_thank_you.html")
+    return await _arender(request, "landings/webinar_thank_you.html")
 
 
-def privacy_policy(request):
+@serve_prerendered
+@cache_landing_page
+async def privacy_policy(request):
     """Simple privacy policy page"""
     context = {
         "page_title": "Política de Privacidad",
         "meta_description": "Política de privacidad simple y clara para la Master Class SIG",
     }
-    return render(request, "landings/privacy_policy_simple.html", context)
+    return await _arender(request, "landings/privacy_policy_simple.html", context)
 
 
-def privacy_policy_technical(request):
+@serve_prerendered
+@cache_landing_page
+async def privacy_policy_technical(request):
     """Technical privacy policy page"""
     context = {
         "page_title": "Política de Privacidad (Técnica)",
         "meta_description": "Versión técnica de nuestra política de privacidad - datos recopilados y uso",
     }
-    return render(request, "landings/privacy_policy_technical.html", context)
+    return await _arender(request, "landings/privacy_policy_technical.html", context)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class MonitoringConfig(AppConfig):
+    name = 'monitoring'
+
+    def ready(self):
+        # Registra el receiver que instrumenta cada conexión a la base de datos
+        from . import db  # noqa: F401
@@ -0,0 +1,40 @@
+"""
+Métricas de otros módulos que se calculan al exportar.
+"""
+from django.db.models import Count
+
+from analytics.models import OutboxMessage
+from landings.spam import guard_counters
+
+
+def registration_guard():
+    samples = [({"verdict": verdict}, count) for verdict, count in sorted(guard_counters().items())]
+    return (
+        "registration_guard_total",
+        "counter",
+        "Resultados del filtro de bots y límites del registro",
+        samples,
+    )
+
+
+def outbox_pending():
+    rows = (
+        OutboxMessage.objects.filter(status="pending")
+        .values("destination")
+        .annotate(pending=Count("pk"))
+        .order_by("destination")
+    )
+    samples = [({"destination": row["destination"]}, row["pending"]) for row in rows]
+    return (
+        "lead_outbox_pending",
+        "gauge",
+        "Notificaciones de leads pendientes de entregar",
+        samples,
+    )
+
+
+COLLECTORS = (registration_guard, outbox_pending)
+
+
+def collect():
+    return [collector() for collector in COLLECTORS]
@@ -0,0 +1,33 @@
+"""
+Tiempo y número de consultas SQL.
+
+Cada conexión nueva recibe un ``execute_wrapper`` que observa la duración de
+cada consulta en ``db_query_duration_seconds`` y la suma a la petición en
+curso, si la hay.
+"""
+import time
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import DB_QUERY_DURATION
+from .middleware import current_stats
+
+
+def time_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        DB_QUERY_DURATION.observe(elapsed, context["connection"].alias)
+        if (stats := current_stats()) is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+
+
+@receiver(connection_created)
+def _instrument_connection(connection, **kwargs):
+    # El wrapper de la conexión sobrevive a las reconexiones
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring.startup import measure_startup, over_budget
+
+
+class Command(BaseCommand):
+    help = (
+        "Arranca un worker nuevo por cada perfil de settings y falla si su "
+        "tiempo de arranque o su memoria superan WORKER_STARTUP['BUDGETS']"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "modules",
+            nargs="*",
+            metavar="SETTINGS_MODULE",
+            help="Perfiles a medir (por defecto, todos los que tienen presupuesto)",
+        )
+        parser.add_argument("--runs", type=int, default=3, help="Arranques por perfil")
+
+    def handle(self, *args, modules, runs, **options):
+        budgets = settings.WORKER_STARTUP["BUDGETS"]
+        failures = []
+        for module in modules or budgets:
+            result = measure_startup(module, runs=runs)
+            self.stdout.write(
+                f"{module}: {result['seconds']:.2f} s, {result['rss_mb']:.1f} MB, "
+                f"{result['modules']} módulos, {len(result['templates'])} plantillas "
+                f"precargadas{', con admin' if result['admin'] else ''}"
+            )
+            if module in budgets:
+                failures += [f"{module}: {problem}" for problem in over_budget(result, budgets[module])]
+        if failures:
+            raise CommandError("Fuera de presupuesto:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("Dentro del presupuesto"))
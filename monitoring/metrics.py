@@ -0,0 +1,223 @@
+"""
+Contadores e histogramas en memoria del proceso, sin locks al registrar.
+
+Cada hilo escribe en su propio shard (un ``dict`` por métrica guardado en
+``threading.local``), así que ``inc``/``observe`` son un par de operaciones
+sobre estructuras que ningún otro hilo modifica. Solo al leer (``/metrics``
+o el panel del admin) se suman los shards de todos los hilos; la lectura
+puede ir una muestra por detrás, nunca corrompe nada.
+
+Los histogramas usan cubetas fijas (``le`` acumulativo al exportarlos, como
+Prometheus) y los percentiles del panel se interpolan dentro de la cubeta.
+Los valores son de este proceso: con varios workers, cada uno expone los
+suyos.
+"""
+import threading
+from bisect import bisect_left
+
+# Segundos: de 0,5 ms a 10 s
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REGISTRY = []
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            # Solo la primera vez por hilo
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict.copy() es atómico con el GIL
+        return [shard.copy() for shard in shards]
+
+    def reset(self):
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self):
+        """``{etiquetas: total}`` sumando todos los hilos."""
+        totals = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            # Una posición por cubeta, una para +Inf y la suma al final
+            row = shard[labels] = [0] * (len(self.buckets) + 2)
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def values(self):
+        """``{etiquetas: HistogramData}`` sumando todos los hilos."""
+        totals = {}
+        for shard in self._snapshots():
+            for labels, row in shard.items():
+                total = totals.get(labels)
+                if total is None:
+                    totals[labels] = list(row)
+                else:
+                    for i, value in enumerate(row):
+                        total[i] += value
+        return {
+            labels: HistogramData(self.buckets, row[:-1], row[-1])
+            for labels, row in totals.items()
+        }
+
+
+class HistogramData:
+    """Conteos por cubeta (no acumulados) y suma de un histograma."""
+
+    def __init__(self, buckets, counts, total):
+        self.buckets = buckets
+        self.counts = counts
+        self.sum = total
+        self.count = sum(counts)
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def cumulative(self):
+        """``[(le, conteo acumulado)]`` incluyendo ``+Inf``."""
+        running, result = 0, []
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+    def quantile(self, q):
+        """Percentil ``q`` (0–1) interpolado dentro de su cubeta."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower, running = 0, 0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and running + count >= rank:
+                return lower + (bound - lower) * (rank - running) / count
+            running += count
+            lower = bound
+        return self.buckets[-1]
+
+
+def _label_value(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition(metrics=None, extra=()):
+    """
+    Texto en formato de exposición de Prometheus. ``extra`` son tuplas
+    ``(nombre, tipo, ayuda, [(etiquetas, valor)])`` de colectores externos.
+    """
+    lines = []
+    for metric in REGISTRY if metrics is None else metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for labels, value in sorted(metric.values().items()):
+            if metric.type == "counter":
+                lines.append(f"{metric.name}{_labels(metric.labelnames, labels)} {_number(value)}")
+                continue
+            for bound, count in value.cumulative():
+                label_text = _labels(metric.labelnames, labels, [("le", _number(bound))])
+                lines.append(f"{metric.name}_bucket{label_text} {count}")
+            label_text = _labels(metric.labelnames, labels)
+            lines.append(f"{metric.name}_sum{label_text} {_number(float(value.sum))}")
+            lines.append(f"{metric.name}_count{label_text} {value.count}")
+    for name, metric_type, documentation, samples in extra:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Tiempo total de la petición por vista",
+    ("view", "method", "status"),
+)
+MIDDLEWARE_DURATION = Histogram(
+    "middleware_duration_seconds",
+    "Tiempo propio de cada middleware (ida y vuelta, sin las capas internas)",
+    ("middleware",),
+)
+DB_QUERIES = Histogram(
+    "db_queries_per_request",
+    "Consultas SQL por petición",
+    ("view",),
+    buckets=COUNT_BUCKETS,
+)
+DB_TIME = Histogram(
+    "db_time_per_request_seconds",
+    "Tiempo en la base de datos por petición",
+    ("view",),
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duración de cada consulta SQL",
+    ("alias",),
+)
+TEMPLATE_RENDER = Histogram(
+    "template_render_duration_seconds",
+    "Tiempo de render de cada plantilla",
+    ("template",),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Consultas a las cachés de páginas",
+    ("cache", "result"),
+)
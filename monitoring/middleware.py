@@ -0,0 +1,206 @@
+"""
+Medición de la cadena de middleware y de cada vista.
+
+``instrument_middleware`` intercala una ``MiddlewareProbe`` antes de cada
+middleware de ``MIDDLEWARE`` y pone ``MetricsMiddleware`` por fuera de
+todo. Cada sonda anota un ``perf_counter`` al entrar y otro al salir; al
+terminar la petición ``MetricsMiddleware`` resta las marcas de sondas
+vecinas y obtiene el tiempo propio de cada middleware (ida más vuelta, sin
+las capas internas). La última sonda (``ViewProbe``) mide la vista,
+resolución de URL incluida, y arranca el perfilador cuando se pide.
+
+Las consultas SQL de la petición se suman en el ``RequestStats`` activo
+(``current_stats``), que sigue a la petición también dentro de
+``sync_to_async``.
+
+Este módulo se importa desde ``settings``: no puede importar modelos.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import DB_QUERIES, DB_TIME, MIDDLEWARE_DURATION, REQUEST_DURATION
+from .profiler import profile
+
+METRICS_MIDDLEWARE = "monitoring.middleware.MetricsMiddleware"
+PROBE = "monitoring.middleware.MiddlewareProbe"
+VIEW_PROBE = "monitoring.middleware.ViewProbe"
+
+_current_stats = ContextVar("monitoring_request_stats", default=None)
+
+
+def instrument_middleware(middleware):
+    """``MIDDLEWARE`` con las sondas de medición intercaladas."""
+    instrumented = [METRICS_MIDDLEWARE]
+    for path in middleware:
+        instrumented += [PROBE, path]
+    return [*instrumented, VIEW_PROBE]
+
+
+def timed_layers(middleware):
+    """Nombre de lo que mide cada sonda de ``middleware``, de fuera hacia dentro."""
+    layers = []
+    for i, path in enumerate(middleware):
+        if path == PROBE:
+            layers.append(middleware[i + 1].rpartition(".")[2])
+        elif path == VIEW_PROBE:
+            layers.append("view")
+    return layers
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "marks_in", "marks_out")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.marks_in = []
+        self.marks_out = []
+
+
+def current_stats():
+    return _current_stats.get()
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else "<sin ruta>"
+
+
+class _SyncAndAsync:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+
+class MetricsMiddleware(_SyncAndAsync):
+    """Mide la petición completa y reparte el tiempo entre las sondas."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.layers = timed_layers(settings.MIDDLEWARE)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        self.record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        self.record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    def record(self, request, response, elapsed, stats):
+        view = view_label(request)
+        REQUEST_DURATION.observe(
+            elapsed, view, request.method, f"{response.status_code // 100}xx"
+        )
+        DB_QUERIES.observe(stats.queries, view)
+        DB_TIME.observe(stats.db_time, view)
+
+        # Marcas de fuera hacia dentro; las de salida se anotaron al revés
+        ins, outs = stats.marks_in, stats.marks_out[::-1]
+        reached = min(len(ins), len(outs))
+        for i in range(reached):
+            own = outs[i] - ins[i]
+            if i + 1 < reached:
+                own -= outs[i + 1] - ins[i + 1]
+            MIDDLEWARE_DURATION.observe(own, self.layers[i])
+
+
+class MiddlewareProbe(_SyncAndAsync):
+    """Marca la entrada y la salida del middleware que viene detrás."""
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = _current_stats.get()
+        if stats is None:
+            return self.get_response(request)
+        stats.marks_in.append(time.perf_counter())
+        try:
+            return self.get_response(request)
+        finally:
+            stats.marks_out.append(time.perf_counter())
+
+    async def __acall__(self, request):
+        stats = _current_stats.get()
+        if stats is None:
+            return await self.get_response(request)
+        stats.marks_in.append(time.perf_counter())
+        try:
+            return await self.get_response(request)
+        finally:
+            stats.marks_out.append(time.perf_counter())
+
+
+def _profile_requested(request):
+    param = settings.MONITORING["PROFILE_PARAM"]
+    # El QUERY_STRING crudo evita construir request.GET en cada petición
+    return param in request.META.get("QUERY_STRING", "") and param in request.GET
+
+
+def _sampled():
+    rate = settings.MONITORING["PROFILE_SAMPLE_RATE"]
+    return bool(rate) and random.random() < rate
+
+
+def wants_profile(request):
+    """Perfila si un usuario staff lo pide con ``?<PROFILE_PARAM>`` o al azar."""
+    if _profile_requested(request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_staff:
+            return True
+    return _sampled()
+
+
+async def awants_profile(request):
+    """``wants_profile`` para el event loop: carga el usuario con ``auser()``."""
+    if _profile_requested(request):
+        # request.user cargaría la sesión con el ORM síncrono dentro del loop
+        auser = getattr(request, "auser", None)
+        if auser is not None and (await auser()).is_staff:
+            return True
+    return _sampled()
+
+
+class ViewProbe(MiddlewareProbe):
+    """Sonda más interna: mide la vista y la perfila cuando se pide."""
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not wants_profile(request):
+            return super().__call__(request)
+        config = settings.MONITORING
+        with profile(request, config["PROFILE_INTERVAL"], config["PROFILE_KEEP"]):
+            return super().__call__(request)
+
+    async def __acall__(self, request):
+        if not await awants_profile(request):
+            return await super().__acall__(request)
+        config = settings.MONITORING
+        with profile(request, config["PROFILE_INTERVAL"], config["PROFILE_KEEP"]):
+            return await super().__acall__(request)
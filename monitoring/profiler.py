@@ -0,0 +1,81 @@
+"""
+Perfilador por muestreo para peticiones sueltas.
+
+Mientras dura la petición, un hilo lee la pila del hilo que la atiende
+(``sys._current_frames``) cada ``PROFILE_INTERVAL`` segundos y cuenta las
+pilas en formato "collapsed" (``a;b;c N``), el que leen ``flamegraph.pl`` o
+speedscope. No instrumenta cada llamada como ``cProfile``, así que el coste
+no depende de cuánto código corra la vista.
+
+En vistas asíncronas se muestrea el hilo del event loop: la muestra incluye
+lo que hagan a la vez otras peticiones del mismo loop.
+
+Los últimos ``PROFILE_KEEP`` perfiles quedan en memoria para el panel.
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from django.utils import timezone
+
+recent_profiles = deque()
+_ids = itertools.count(1)
+
+
+class SamplingProfiler(threading.Thread):
+    def __init__(self, thread_id, interval=0.005, max_depth=64):
+        super().__init__(name="sampling-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_qualname}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self, limit=None):
+        return [f"{stack} {count}" for stack, count in self.stacks.most_common(limit)]
+
+
+@contextmanager
+def profile(request, interval, keep, top=50):
+    """Muestrea el hilo actual durante el bloque y guarda el perfil."""
+    profiler = SamplingProfiler(threading.get_ident(), interval)
+    started = time.perf_counter()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        match = getattr(request, "resolver_match", None)
+        recent_profiles.appendleft(
+            {
+                "id": next(_ids),
+                "path": request.path,
+                "view": match.view_name if match else "",
+                "at": timezone.now(),
+                "duration": time.perf_counter() - started,
+                "samples": sum(profiler.stacks.values()),
+                "stacks": profiler.collapsed(top),
+            }
+        )
+        while len(recent_profiles) > keep:
+            recent_profiles.pop()
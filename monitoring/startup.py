@@ -0,0 +1,130 @@
+"""
+Arranque de los workers: precarga de plantillas y presupuesto de arranque.
+
+``preload_templates`` compila al arrancar las plantillas de
+``WORKER_STARTUP["PRELOAD_TEMPLATES"]`` para que no lo haga la primera
+petición; el loader con caché las guarda en el proceso y, con
+``gunicorn --preload``, se compilan una sola vez en el master.
+
+``measure_startup`` arranca un worker en un intérprete nuevo con el módulo
+de settings indicado (aplicación WSGI, URLconf y plantillas, sin tocar la
+base de datos) y devuelve cuánto tardó y el pico de memoria residente.
+``check_worker_budget`` lo compara con ``WORKER_STARTUP["BUDGETS"]``.
+
+``close_connections`` cierra al final del arranque las conexiones (y el
+pool de PostgreSQL) que abrió la precarga: con ``--preload`` los workers
+no deben heredar los sockets del master.
+
+``start_worker`` es el arranque completo que llaman ``mysite.wsgi`` y
+``mysite.asgi`` tras crear la aplicación: un trabajo de fondo nuevo se
+añade ahí y llega a los dos puntos de entrada.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+from monitoring.startup import preload_templates
+templates = preload_templates()
+seconds = time.perf_counter() - started
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "seconds": seconds,
+    # ru_maxrss va en KiB en Linux y en bytes en macOS
+    "rss_mb": rss / (2**20 if sys.platform == "darwin" else 2**10),
+    "modules": len(sys.modules),
+    "admin": "django.contrib.admin" in sys.modules,
+    "templates": templates,
+}))
+"""
+
+
+def preload_templates(patterns=None):
+    """Compila las plantillas que casan con ``patterns``; devuelve sus nombres."""
+    from django.template import engines
+
+    if patterns is None:
+        patterns = settings.WORKER_STARTUP["PRELOAD_TEMPLATES"]
+    loaded = set()
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            for pattern in patterns:
+                for path in Path(directory).glob(pattern):
+                    name = path.relative_to(directory).as_posix()
+                    if name not in loaded:
+                        engine.get_template(name)
+                        loaded.add(name)
+    return sorted(loaded)
+
+
+def start_worker():
+    """Precargas e hilos de fondo del worker, en un solo sitio para WSGI y ASGI."""
+    from analytics.outbox import get_outbox_worker
+    from analytics.retention import get_retention_worker
+    from landings.routing import get_slug_index
+
+    # Índice de landings y plantillas listos antes de la primera petición
+    get_slug_index().warm()
+    preload_templates()
+    # Retención de datos (DATA_RETENTION) y notificaciones de leads (LEAD_OUTBOX)
+    get_retention_worker()
+    get_outbox_worker()
+    # Con gunicorn --preload esto corre en el master: los workers no heredan
+    # sus conexiones y los hilos de fondo se vuelven a arrancar en cada
+    # worker (ver landings.background)
+    close_connections()
+
+
+def close_connections():
+    """Cierra las conexiones de este hilo y los pools, si los hay."""
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        close_pool = getattr(connection, "close_pool", None)
+        if close_pool is not None:
+            close_pool()
+
+
+def measure_startup(settings_module, runs=3):
+    """
+    Arranque de ``runs`` workers nuevos con ``settings_module``: mediana de
+    segundos y de MB residentes, más los datos de la última corrida.
+    """
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module}
+    results = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results.append(json.loads(completed.stdout.splitlines()[-1]))
+    return {
+        **results[-1],
+        "seconds": statistics.median(result["seconds"] for result in results),
+        "rss_mb": statistics.median(result["rss_mb"] for result in results),
+    }
+
+
+def over_budget(result, budget):
+    """Mensajes con lo que supera ``budget`` (``IMPORT_SECONDS``/``RSS_MB``)."""
+    found = []
+    if result["seconds"] > budget["IMPORT_SECONDS"]:
+        found.append(f"arranque {result['seconds']:.2f} s > {budget['IMPORT_SECONDS']:.2f} s")
+    if result["rss_mb"] > budget["RSS_MB"]:
+        found.append(f"memoria {result['rss_mb']:.1f} MB > {budget['RSS_MB']} MB")
+    return found
@@ -0,0 +1,36 @@
+"""
+Backend de plantillas de Django que mide el render de cada plantilla.
+
+Se usa en ``TEMPLATES`` en lugar de ``DjangoTemplates``; el resto de la
+configuración no cambia.
+"""
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates
+from django.template.backends.django import Template as DjangoTemplate
+from django.template.backends.django import reraise
+
+from .metrics import TEMPLATE_RENDER
+
+
+class Template(DjangoTemplate):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            TEMPLATE_RENDER.observe(
+                time.perf_counter() - start, self.origin.template_name or "<string>"
+            )
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,177 @@
+import threading
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from landings.spam import reset_guard_counters
+
+from .metrics import (
+    CACHE_REQUESTS,
+    DB_QUERIES,
+    MIDDLEWARE_DURATION,
+    REGISTRY,
+    REQUEST_DURATION,
+    TEMPLATE_RENDER,
+    Counter,
+    Histogram,
+    exposition,
+)
+from .middleware import timed_layers
+from .profiler import SamplingProfiler, recent_profiles
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class MetricsTest(TestCase):
+    def test_histogram_merges_thread_shards(self):
+        """Test that observations from many threads add up without locks"""
+        histogram = Histogram("test_seconds", "Test", ("view",), buckets=(0.1, 1))
+        REGISTRY.remove(histogram)
+
+        def work():
+            for value in (0.05, 0.5, 5):
+                histogram.observe(value, "home")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        data = histogram.values()[("home",)]
+        self.assertEqual(data.count, 12)
+        self.assertEqual(data.cumulative(), [(0.1, 4), (1, 8), (float("inf"), 12)])
+        self.assertAlmostEqual(data.sum, 22.2)
+        self.assertAlmostEqual(data.quantile(0.5), 0.55)
+
+    def test_exposition_format(self):
+        """Test the Prometheus text format, label escaping included"""
+        histogram = Histogram("test_seconds", "Test", ("view",), buckets=(0.1,))
+        counter = Counter("test_total", "Hits", ("name",))
+        REGISTRY.remove(histogram)
+        REGISTRY.remove(counter)
+        histogram.observe(0.05, "a")
+        counter.inc('say "hi"', amount=2)
+
+        text = exposition([histogram, counter], extra=[("x", "gauge", "X", [({"k": "v"}, 3)])])
+        self.assertIn("# TYPE test_seconds histogram", text)
+        self.assertIn('test_seconds_bucket{view="a",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{view="a",le="+Inf"} 1', text)
+        self.assertIn('test_seconds_count{view="a"} 1', text)
+        self.assertIn('test_total{name="say \\"hi\\""} 2', text)
+        self.assertIn('x{k="v"} 3', text)
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        for metric in REGISTRY:
+            metric.reset()
+        recent_profiles.clear()
+        reset_guard_counters()
+
+    def test_middleware_chain_is_instrumented(self):
+        """Test that every middleware and the view get their own timing"""
+        layers = timed_layers(settings.MIDDLEWARE)
+        self.assertEqual(layers[0], "SecurityMiddleware")
+        self.assertEqual(layers[-1], "view")
+
+        self.client.get(reverse("landings:webinar_landing"))
+        self.assertEqual(
+            list(REQUEST_DURATION.values()), [("landings:webinar_landing", "GET", "2xx")]
+        )
+        self.assertEqual(
+            {name for (name,) in MIDDLEWARE_DURATION.values()}, set(layers)
+        )
+        self.assertIn(("landings/webinar.html",), TEMPLATE_RENDER.values())
+        self.assertEqual(CACHE_REQUESTS.values(), {})
+
+    def test_queries_are_counted_per_request(self):
+        """Test the connection wrapper that attributes queries to the view"""
+        with self.assertNumQueries(4) as captured:
+            self.client.post(
+                reverse("landings:register_webinar_lead"),
+                {"name": "Ana", "email": "ana@example.com"},
+            )
+        data = DB_QUERIES.values()[("landings:register_webinar_lead",)]
+        self.assertEqual((data.count, data.sum), (1, len(captured)))
+
+    @override_settings(
+        LANDING_PAGE_CACHE={**settings.LANDING_PAGE_CACHE, "ENABLED": True}
+    )
+    # Sin consentimiento el banner se sortea por petición: se fija la variante
+    @patch("landings.experiments.new_visitor_id", return_value="0" * 16)
+    def test_cache_hits_are_counted(self, new_visitor_id):
+        """Test the hit/miss counter of the page cache"""
+        for _ in range(3):
+            self.client.get(reverse("landings:privacy_policy"))
+        self.assertEqual(
+            CACHE_REQUESTS.values(),
+            {("landing_page", "miss"): 1, ("landing_page", "hit"): 2},
+        )
+
+    @override_settings(MONITORING={**settings.MONITORING, "METRICS_TOKEN": "s3cret"})
+    def test_metrics_endpoint(self):
+        """Test access control and the exported series"""
+        url = reverse("monitoring:metrics")
+        self.client.post(
+            reverse("landings:register_webinar_lead"),
+            {"name": "Bot", "email": "b@example.com", "website": "x"},
+        )
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{view="landings:register_webinar_lead",method="POST",status="3xx"} 1',
+            text,
+        )
+        self.assertIn('registration_guard_total{verdict="honeypot"} 1', text)
+        self.assertIn("# TYPE lead_outbox_pending gauge", text)
+
+    def test_admin_dashboard_and_profiling(self):
+        """Test the admin page and the per-request profiler"""
+        User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.login(username="admin", password="password")
+        self.client.get(reverse("landings:webinar_landing"), {"_profile": "1"})
+        [profile] = recent_profiles
+        self.assertEqual(profile["view"], "landings:webinar_landing")
+
+        response = self.client.get(reverse("monitoring_dashboard"))
+        self.assertContains(response, "landings:webinar_landing")
+        self.assertContains(response, "SecurityMiddleware")
+        self.assertContains(response, f"#{profile['id']} /webinar/")
+
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("monitoring_dashboard")).status_code, 302)
+
+    async def test_profile_param_under_asgi(self):
+        """Test that ?_profile resolves the user without sync ORM in the event loop"""
+        url = reverse("landings:privacy_policy") + "?_profile=1"
+        self.async_client.cookies[settings.SESSION_COOKIE_NAME] = "not-a-session"
+        self.assertEqual((await self.async_client.get(url)).status_code, 200)
+        self.assertEqual(len(recent_profiles), 0)
+
+        user = await User.objects.acreate_superuser("admin", "admin@example.com", "password")
+        await self.async_client.aforce_login(user)
+        self.assertEqual((await self.async_client.get(url)).status_code, 200)
+        [profile] = recent_profiles
+        self.assertEqual(profile["view"], "landings:privacy_policy")
+
+    def test_sampling_profiler(self):
+        """Test that the sampler sees the stack of the profiled thread"""
+        profiler = SamplingProfiler(threading.get_ident(), interval=0.001)
+        profiler.start()
+        busy(0.05)
+        profiler.stop()
+        self.assertGreater(sum(profiler.stacks.values()), 5)
+        self.assertIn("tests.py:busy", profiler.collapsed(1)[0])
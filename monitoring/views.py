@@ -0,0 +1,86 @@
+import secrets
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import render
+
+from . import collectors
+from .metrics import (
+    CACHE_REQUESTS,
+    DB_QUERIES,
+    DB_QUERY_DURATION,
+    DB_TIME,
+    MIDDLEWARE_DURATION,
+    REQUEST_DURATION,
+    TEMPLATE_RENDER,
+    exposition,
+)
+from .profiler import recent_profiles
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _authorized(request):
+    token = settings.MONITORING["METRICS_TOKEN"]
+    header = request.headers.get("Authorization", "")
+    if token and secrets.compare_digest(header, f"Bearer {token}"):
+        return True
+    # El perfil "public" no tiene usuarios
+    user = getattr(request, "user", None)
+    return user is not None and user.is_active and user.is_staff
+
+
+def metrics(request):
+    """Prometheus exposition of this process' metrics"""
+    if not _authorized(request):
+        return HttpResponse(status=403)
+    return HttpResponse(exposition(extra=collectors.collect()), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000
+
+
+def _latency_rows(histogram):
+    rows = []
+    for labels, data in histogram.values().items():
+        rows.append({
+            "name": labels[0],
+            "labels": labels,
+            "count": data.count,
+            "mean": _ms(data.mean),
+            "p50": _ms(data.quantile(0.5)),
+            "p95": _ms(data.quantile(0.95)),
+            "p99": _ms(data.quantile(0.99)),
+        })
+    return sorted(rows, key=lambda row: -row["count"] * (row["mean"] or 0))
+
+
+def dashboard(request):
+    """Admin page with the latency histograms and recent profiles"""
+    queries, db_time = DB_QUERIES.values(), DB_TIME.values()
+    view_rows = []
+    for row in _latency_rows(REQUEST_DURATION):
+        key = (row["name"],)
+        row["queries"] = queries[key].mean if key in queries else None
+        row["db_time"] = _ms(db_time[key].mean) if key in db_time else None
+        view_rows.append(row)
+
+    caches = {}
+    for (name, result), count in CACHE_REQUESTS.values().items():
+        caches.setdefault(name, {"name": name, "hit": 0, "miss": 0})[result] = count
+    for cache in caches.values():
+        total = cache["hit"] + cache["miss"]
+        cache["ratio"] = 100 * cache["hit"] / total if total else None
+
+    context = {
+        "title": "Rendimiento",
+        "views": view_rows,
+        "middleware": _latency_rows(MIDDLEWARE_DURATION),
+        "templates": _latency_rows(TEMPLATE_RENDER),
+        "databases": _latency_rows(DB_QUERY_DURATION),
+        "caches": sorted(caches.values(), key=lambda cache: cache["name"]),
+        "profiles": list(recent_profiles),
+        "profile_param": settings.MONITORING["PROFILE_PARAM"],
+    }
+    return render(request, "admin/monitoring/dashboard.html", context)
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
 application = get_asgi_application()
+
+# Precargas e hilos de fondo del worker (ver monitoring.startup)
+from monitoring.startup import start_worker  # noqa: E402
+
+start_worker()
@@ -0,0 +1,93 @@
+"""
+Perfil de base de datos a partir de variables de entorno.
+
+``DB_ENGINE=postgresql`` activa PostgreSQL con el pool nativo de psycopg 3
+(Django 5.1+): cada worker de Gunicorn mantiene entre ``DB_POOL_MIN_SIZE`` y
+``DB_POOL_MAX_SIZE`` conexiones abiertas y las reparte entre sus hilos. Con
+``DB_POOL=0`` se usan en cambio conexiones persistentes por hilo
+(``CONN_MAX_AGE``) con verificación de salud antes de reutilizarlas.
+
+Sin ``DB_ENGINE`` (o con ``DB_ENGINE=sqlite``) se usa SQLite en modo WAL,
+pensado para instalaciones de un solo nodo: los lectores no bloquean al
+escritor, ``synchronous=NORMAL`` evita un fsync por commit y las
+transacciones empiezan con ``BEGIN IMMEDIATE`` para que la espera de
+``busy_timeout`` cubra también el paso de lectura a escritura.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+}
+
+
+def _flag(environ, name, default):
+    value = environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _conn_max_age(environ, default):
+    value = environ.get("DB_CONN_MAX_AGE")
+    if value is None:
+        return default
+    # Vacío o "none" significa conexiones persistentes sin límite
+    return None if value.strip().lower() in ("", "none") else int(value)
+
+
+def sqlite_database(environ, base_dir):
+    pragmas = {
+        **SQLITE_PRAGMAS,
+        "busy_timeout": int(
+            environ.get("SQLITE_BUSY_TIMEOUT", SQLITE_PRAGMAS["busy_timeout"])
+        ),
+    }
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": environ.get("SQLITE_PATH", base_dir / "db.sqlite3"),
+        "CONN_MAX_AGE": _conn_max_age(environ, 0),
+        "OPTIONS": {
+            "init_command": ";".join(
+                f"PRAGMA {name}={value}" for name, value in pragmas.items()
+            ),
+            "transaction_mode": "IMMEDIATE",
+        },
+    }
+
+
+def postgresql_database(environ):
+    database = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": environ.get("POSTGRES_DB", "ambsite"),
+        "USER": environ.get("POSTGRES_USER", "ambsite"),
+        "PASSWORD": environ.get("POSTGRES_PASSWORD", ""),
+        "HOST": environ.get("POSTGRES_HOST", "localhost"),
+        "PORT": environ.get("POSTGRES_PORT", "5432"),
+        "OPTIONS": {},
+    }
+    if _flag(environ, "DB_POOL", True):
+        # El pool ya reutiliza las conexiones: Django exige CONN_MAX_AGE = 0
+        database["CONN_MAX_AGE"] = 0
+        database["OPTIONS"]["pool"] = {
+            "min_size": int(environ.get("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(environ.get("DB_POOL_MAX_SIZE", 10)),
+            "timeout": float(environ.get("DB_POOL_TIMEOUT", 10)),
+        }
+    else:
+        database["CONN_MAX_AGE"] = _conn_max_age(environ, 60)
+        database["CONN_HEALTH_CHECKS"] = _flag(environ, "DB_CONN_HEALTH_CHECKS", True)
+    return database
+
+
+def database_from_env(environ, base_dir):
+    """Configuración de ``DATABASES["default"]`` según ``DB_ENGINE``."""
+    engine = environ.get("DB_ENGINE", "sqlite").strip().lower()
+    if engine in ("sqlite", "sqlite3"):
+        return sqlite_database(environ, base_dir)
+    if engine in ("postgres", "postgresql"):
+        return postgresql_database(environ)
+    raise ImproperlyConfigured(
+        f"DB_ENGINE={engine!r} no es válido. Usa 'sqlite' o 'postgresql'."
+    )
@@ -16,6 +16,10 @@ import sys
 from django.conf.global_settings import INTERNAL_IPS
 from pathlib import Path
 
+from monitoring.middleware import instrument_middleware
+
+from .database import database_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +47,7 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "landings",
     "analytics",
+    "monitoring",
 ]
 
 MIDDLEWARE = [
@@ -54,9 +59,12 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "landings.middleware.CookieConsentMiddleware",
-    "landings.middleware.DataRetentionMiddleware",
+    "landings.experiments.ExperimentMiddleware",
 ]
 
+# Latency probes around every middleware above (see monitoring.middleware)
+MIDDLEWARE = instrument_middleware(MIDDLEWARE)
+
 INTERNAL_IPS = [
     "127.0.0.1",
     "localhost",
@@ -71,7 +79,8 @@ ROOT_URLCONF = "mysite.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates that also records render times (see monitoring)
+        "BACKEND": "monitoring.template_backend.InstrumentedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -80,6 +89,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "landings.experiments.cookie_banner",
             ],
         },
     },
@@ -90,13 +100,27 @@ WSGI_APPLICATION = "mysite.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# SQLite (WAL) by default; set DB_ENGINE=postgresql and the POSTGRES_* / DB_POOL*
+# variables for production (see mysite.database).
 
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_from_env(os.environ, BASE_DIR),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Per-process memory by default. With REDIS_URL a "shared" Redis cache is added
+# for state that must be the same in every worker (needs the "redis" extra).
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
 }
+if os.environ.get("REDIS_URL"):
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["REDIS_URL"],
+    }
 
 
 # Password validation
@@ -143,3 +167,265 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Lead ingestion
+# "sync" writes every registration straight to the database; "buffered" spools
+# them to disk and inserts them in batches (see analytics.ingestion).
+
+LEAD_INGESTION = {
+    "MODE": os.environ.get("LEAD_INGESTION_MODE", "sync"),
+    "BATCH_SIZE": 200,
+    "FLUSH_INTERVAL": 2.0,
+    "MAX_PENDING": 5000,
+    "ENQUEUE_TIMEOUT": 0.5,
+    "SPOOL_DIR": BASE_DIR / "var" / "lead_spool",
+    "FSYNC": True,
+}
+
+
+# Landing counters
+# View and conversion deltas are accumulated in memory and flushed with F()
+# updates every FLUSH_INTERVAL seconds (see landings.counters).
+
+LANDING_COUNTERS = {
+    "FLUSH_INTERVAL": None if TESTING else 5.0,
+}
+
+# LandingPage.slug that counts hits on the fixed /webinar/ route
+WEBINAR_LANDING_SLUG = "webinar"
+
+
+# Full-page cache for landings and privacy pages (see landings.cache)
+# Pages live in CACHE; the generation number that invalidates them lives in
+# GENERATION_CACHE. With a per-process LocMem cache an admin save only
+# invalidates its own worker (the others serve stale pages up to TIMEOUT),
+# so set REDIS_URL in production.
+
+LANDING_PAGE_CACHE = {
+    "ENABLED": not TESTING,
+    "CACHE": "default",
+    "GENERATION_CACHE": "shared" if os.environ.get("REDIS_URL") else "default",
+    "TIMEOUT": 600,
+}
+
+
+# Pre-rendered, pre-compressed landing pages
+# Generate them with `python manage.py prerender_landings` on every deploy.
+
+LANDING_PRERENDER = {
+    "ENABLED": not TESTING,
+    "ROOT": BASE_DIR / "var" / "prerendered",
+}
+
+
+# In-process slug index for the /<slug>/ landing dispatcher (see landings.routing)
+# Model signals keep it current in the process that saved the change and bump
+# a version in CACHE, with the changed landing or campaign stored under each
+# version; other workers compare it at most every VERSION_CHECK_INTERVAL
+# seconds (and before a 404) and re-read only the changed landings, or
+# reload everything when part of the changelog has expired.
+# Every worker also reloads it in the background every REFRESH_INTERVAL seconds.
+# The campaign names cached for LandingPage.__str__ live in the same CACHE.
+
+LANDING_ROUTING = {
+    "REFRESH_INTERVAL": None if TESTING else 300,
+    "CACHE": "shared" if os.environ.get("REDIS_URL") else "default",
+    "VERSION_CHECK_INTERVAL": 1.0,
+}
+
+
+# Lead rollup tables (see analytics.rollups)
+# Refresh them from cron with `python manage.py update_lead_rollups`. The
+# high-water mark trails the clock by SAFETY_LAG seconds so rows from
+# transactions still in flight are picked up by the next run.
+
+LEAD_ROLLUPS = {
+    "SAFETY_LAG": 60,
+}
+
+
+# Campaign performance panel on the admin index (see analytics.dashboard)
+# The summary is refreshed every REFRESH_INTERVAL seconds in the background and
+# on demand when the panel finds it older than MAX_AGE. Each refresh only
+# recomputes the campaigns touched since the last one, and a row lock lets a
+# single process refresh at a time across the deployment.
+
+CAMPAIGN_DASHBOARD = {
+    "REFRESH_INTERVAL": None if TESTING else 300,
+    "MAX_AGE": 600,
+}
+
+
+# First-party event collection endpoint (see analytics.collection)
+# Events are buffered in memory and bulk-inserted in the background; once
+# MAX_PENDING events are waiting, new ones are dropped instead of queued.
+
+EVENT_COLLECTION = {
+    "FLUSH_INTERVAL": None if TESTING else 1.0,
+    "BATCH_SIZE": 1000,
+    "MAX_PENDING": 50000,
+    "MAX_EVENTS_PER_REQUEST": 50,
+    "MAX_BODY": 64 * 1024,
+}
+
+
+# Columnar archive of old leads and events (see analytics.archive)
+# `python manage.py archive_analytics` moves rows older than *_MAX_AGE_DAYS
+# into compressed .npz files under ROOT and deletes them from the database.
+# Needs the optional "archive" extra (NumPy). The archive is anonymous, and
+# run_retention prunes it with the DATA_RETENTION delete ages; each max age
+# must stay below its delete age (system check analytics.W001).
+
+ANALYTICS_ARCHIVE = {
+    "ROOT": Path(os.environ.get("ANALYTICS_ARCHIVE_ROOT", BASE_DIR / "archive")),
+    "LEAD_MAX_AGE_DAYS": 365,
+    "EVENT_MAX_AGE_DAYS": 90,
+    "BATCH_SIZE": 5000,
+}
+
+
+# Data retention engine (see analytics.retention)
+# Runs every INTERVAL seconds in a background thread of each worker, or from
+# cron with `python manage.py run_retention`. Leads are anonymized after 26
+# months as the privacy policy promises; None disables a step. The delete
+# ages also apply to rows already moved to the ANALYTICS_ARCHIVE. One process
+# at a time runs a pass: it holds a turn for LEASE seconds, renewed between
+# steps, and the other workers skip theirs.
+
+DATA_RETENTION = {
+    "INTERVAL": None if TESTING else 3600,
+    "LEAD_ANONYMIZE_AFTER_DAYS": 790,
+    "LEAD_DELETE_AFTER_DAYS": None,
+    "EVENT_DELETE_AFTER_DAYS": 425,
+    "BATCH_SIZE": 500,
+    "LEASE": 1800,
+}
+
+
+# Signed cookie holding the visitor's consent choice (see landings.consent)
+# CookieConsentMiddleware reads only this cookie and never the session.
+
+CONSENT_COOKIE = {
+    "NAME": "consent",
+    "MAX_AGE": 60 * 60 * 24 * 180,
+    "SECURE": not DEBUG,
+}
+
+
+# A/B experiments (see landings.experiments)
+# Variants are picked by hashing a first-party visitor ID, so assignment needs
+# no storage. TESTS maps each experiment to {variant: weight}; besides
+# "cookie_banner", "landing:<slug>" experiments swap a landing's template,
+# e.g. {"webinar.html": 1, "webinar_b.html": 1}. Views and conversions per
+# variant are buffered and written every FLUSH_INTERVAL seconds. The ID is
+# stored in VISITOR_COOKIE only after analytics consent; before that every
+# request draws its own banner variant and landings keep their template.
+
+EXPERIMENTS = {
+    "FLUSH_INTERVAL": None if TESTING else 5.0,
+    "VISITOR_COOKIE": "vid",
+    "VISITOR_COOKIE_MAX_AGE": 60 * 60 * 24 * 365,
+    "TESTS": {
+        "cookie_banner": {"1": 1, "2": 1, "3": 1, "4": 1},
+    },
+}
+
+
+# Bot filter and rate limits for lead registration (see landings.spam)
+# Rates are (requests, seconds). IP_RATE is a per-client bucket (keyed on a
+# hash of the full IP) kept in this process; NETWORK_RATE is a coarse limit
+# per anonymized /16 (or /48) network shared in CACHE, high enough for a
+# carrier-grade NAT; DOMAIN_RATE is per email domain, local and in CACHE.
+# Point CACHE at Redis (REDIS_URL) so the shared limits hold across workers.
+
+REGISTRATION_GUARD = {
+    "RATE_LIMIT": not TESTING,
+    "CACHE": "shared" if os.environ.get("REDIS_URL") else "default",
+    "IP_RATE": (10, 60),
+    "NETWORK_RATE": (300, 60),
+    "DOMAIN_RATE": (60, 60),
+    "HONEYPOT_FIELD": "website",
+    "MIN_FILL_SECONDS": 3,
+}
+
+
+# Lead notifications (see analytics.outbox)
+# Each registration writes one OutboxMessage per destination in the same
+# transaction as the Lead; a background worker delivers them every
+# POLL_INTERVAL seconds (or run `python manage.py process_outbox`). A
+# destination is active once its URL (webhook) or TO (email) is set.
+# CONCURRENCY caps simultaneous deliveries per destination for the whole
+# deployment: only one process drains at a time (a turn kept in JobCheckpoint).
+
+LEAD_OUTBOX = {
+    "POLL_INTERVAL": None if TESTING else 5.0,
+    "BATCH_SIZE": 50,
+    "MAX_ATTEMPTS": 8,
+    "BACKOFF_BASE": 30,
+    "BACKOFF_MAX": 6 * 3600,
+    "LEASE": 600,
+    "DESTINATIONS": {
+        "email": {
+            "KIND": "email",
+            "TO": [a for a in os.environ.get("LEAD_NOTIFY_EMAILS", "").split(",") if a],
+            "CONCURRENCY": 2,
+        },
+        "whatsapp": {
+            "KIND": "webhook",
+            "URL": os.environ.get("LEAD_WHATSAPP_WEBHOOK_URL"),
+            "CONCURRENCY": 1,
+            "TIMEOUT": 10,
+        },
+        "crm": {
+            "KIND": "webhook",
+            "URL": os.environ.get("LEAD_CRM_WEBHOOK_URL"),
+            "CONCURRENCY": 4,
+            "TIMEOUT": 10,
+        },
+    },
+}
+
+
+# Hot-path instrumentation (see the monitoring app)
+# Latency histograms per view, middleware, template and SQL query are kept in
+# memory per process and exported at /metrics (Prometheus format) for staff
+# or for requests with "Authorization: Bearer <METRICS_TOKEN>"; the admin
+# shows them at /admin/monitoring/. Staff can profile a single request by
+# adding ?<PROFILE_PARAM>=1, and PROFILE_SAMPLE_RATE profiles that fraction
+# of all requests.
+
+MONITORING = {
+    "METRICS_TOKEN": os.environ.get("METRICS_TOKEN"),
+    "PROFILE_PARAM": "_profile",
+    "PROFILE_SAMPLE_RATE": 0.0,
+    "PROFILE_INTERVAL": 0.005,
+    "PROFILE_KEEP": 20,
+}
+
+
+# Funnel benchmark (see landings.benchmark)
+# `python manage.py benchmark_funnel --save-baseline` records a baseline per
+# scenario in BASELINE_FILE; later runs fail when req/s or the p50/p95 of a
+# step get worse than THRESHOLD (a fraction). Baselines are per machine.
+
+BENCHMARKS = {
+    "BASELINE_FILE": BASE_DIR / "benchmarks" / "funnel.json",
+    "THRESHOLD": 0.2,
+}
+
+
+# Worker startup (see monitoring.startup)
+# wsgi.py/asgi.py compile PRELOAD_TEMPLATES when a worker boots, so the first
+# request doesn't pay for it. `python manage.py check_worker_budget` boots a
+# fresh worker per settings module in BUDGETS and fails when its startup time
+# or peak RSS go over budget. Public landing workers run the slimmer
+# mysite.settings_public profile.
+
+WORKER_STARTUP = {
+    "PRELOAD_TEMPLATES": ["landings/*.html", "base.html"],
+    "BUDGETS": {
+        "mysite.settings": {"IMPORT_SECONDS": 1.0, "RSS_MB": 60},
+        "mysite.settings_public": {"IMPORT_SECONDS": 0.8, "RSS_MB": 50},
+    },
+}
@@ -0,0 +1,60 @@
+"""
+Perfil "public" para los workers que atienden el tráfico de las landings.
+
+Solo sirve las vistas de ``landings``, el registro de leads, ``/collect`` y
+``/metrics`` (con ``METRICS_TOKEN``), sin admin, auth, sesiones ni la app de
+mensajes: cada worker importa y ocupa menos y arranca antes. Úsalo con::
+
+    DJANGO_SETTINGS_MODULE=mysite.settings_public gunicorn --preload mysite.wsgi
+
+El admin, las migraciones y los comandos de mantenimiento siguen corriendo
+con ``mysite.settings``; los dos perfiles comparten base de datos y caché.
+Con ``--preload`` las plantillas precompiladas al arrancar (ver
+``WORKER_STARTUP``) se comparten entre los workers tras el fork; el master
+cierra sus conexiones y cada worker vuelve a arrancar sus hilos de fondo.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import TEMPLATES as _FULL_TEMPLATES
+
+INSTALLED_APPS = [
+    "landings",
+    "analytics",
+    "monitoring",
+]
+
+# Sin sesiones ni usuarios: CSRF va en su cookie y los mensajes del registro
+# en una cookie firmada
+_PUBLIC_MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "landings.middleware.CookieConsentMiddleware",
+    "landings.experiments.ExperimentMiddleware",
+]
+MIDDLEWARE = instrument_middleware(_PUBLIC_MIDDLEWARE)  # noqa: F405
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
+ROOT_URLCONF = "mysite.urls_public"
+
+# Sin los context processors de auth y debug. El loader por defecto ya
+# guarda las plantillas compiladas en memoria del proceso
+TEMPLATES = [
+    {
+        **_FULL_TEMPLATES[0],
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.request",
+                "django.contrib.messages.context_processors.messages",
+                "landings.experiments.cookie_banner",
+            ],
+        },
+    },
+]
+
+# Los trabajos de fondo corren en los workers del perfil completo o con
+# sus comandos (process_outbox --loop, run_retention)
+LEAD_OUTBOX = {**LEAD_OUTBOX, "POLL_INTERVAL": None}  # noqa: F405
+DATA_RETENTION = {**DATA_RETENTION, "INTERVAL": None}  # noqa: F405
+CAMPAIGN_DASHBOARD = {**CAMPAIGN_DASHBOARD, "REFRESH_INTERVAL": None}  # noqa: F405
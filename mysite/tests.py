@@ -0,0 +1,135 @@
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from analytics.models import Lead
+from monitoring.startup import measure_startup, over_budget, preload_templates
+
+from . import settings_public
+from .database import database_from_env
+
+BASE_DIR = Path("/srv/ambsite")
+
+
+class DatabaseProfileTest(SimpleTestCase):
+    def test_sqlite_is_the_default(self):
+        """Test that SQLite runs in WAL mode with immediate transactions"""
+        database = database_from_env({}, BASE_DIR)
+        self.assertEqual(database["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(database["NAME"], BASE_DIR / "db.sqlite3")
+        self.assertEqual(database["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertEqual(
+            database["OPTIONS"]["init_command"],
+            "PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL;PRAGMA busy_timeout=5000",
+        )
+
+    def test_sqlite_busy_timeout_from_env(self):
+        """Test that the busy timeout can be tuned"""
+        database = database_from_env({"SQLITE_BUSY_TIMEOUT": "250"}, BASE_DIR)
+        self.assertIn("PRAGMA busy_timeout=250", database["OPTIONS"]["init_command"])
+
+    def test_postgresql_uses_native_pool(self):
+        """Test that the pooled profile disables persistent connections"""
+        database = database_from_env(
+            {
+                "DB_ENGINE": "postgresql",
+                "POSTGRES_DB": "leads",
+                "POSTGRES_HOST": "db",
+                "DB_POOL_MAX_SIZE": "20",
+            },
+            BASE_DIR,
+        )
+        self.assertEqual(database["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(database["NAME"], "leads")
+        self.assertEqual(database["HOST"], "db")
+        self.assertEqual(database["CONN_MAX_AGE"], 0)
+        self.assertEqual(
+            database["OPTIONS"]["pool"], {"min_size": 2, "max_size": 20, "timeout": 10.0}
+        )
+
+    def test_postgresql_persistent_connections_without_pool(self):
+        """Test that disabling the pool falls back to CONN_MAX_AGE and health checks"""
+        database = database_from_env(
+            {"DB_ENGINE": "postgresql", "DB_POOL": "0", "DB_CONN_MAX_AGE": "none"},
+            BASE_DIR,
+        )
+        self.assertNotIn("pool", database["OPTIONS"])
+        self.assertIsNone(database["CONN_MAX_AGE"])
+        self.assertTrue(database["CONN_HEALTH_CHECKS"])
+
+    def test_unknown_engine(self):
+        """Test that an unsupported engine fails loudly"""
+        with self.assertRaises(ImproperlyConfigured):
+            database_from_env({"DB_ENGINE": "mysql"}, BASE_DIR)
+
+
+class LeadWriteLoadTestCommandTest(TransactionTestCase):
+    def test_reports_throughput_and_cleans_up(self):
+        """Test that the load test writes, reports and deletes its leads"""
+        out = StringIO()
+        call_command(
+            "loadtest_lead_writes", writes=20, concurrency=1, batch_size=5, stdout=out
+        )
+        self.assertIn(f"{connection.vendor}: 20 leads", out.getvalue())
+        self.assertIn("escrituras/s", out.getvalue())
+        self.assertFalse(Lead.objects.exists())
+
+
+@override_settings(
+    ROOT_URLCONF=settings_public.ROOT_URLCONF,
+    MIDDLEWARE=settings_public.MIDDLEWARE,
+    MESSAGE_STORAGE=settings_public.MESSAGE_STORAGE,
+    TEMPLATES=settings_public.TEMPLATES,
+)
+class PublicProfileTest(TestCase):
+    def test_registration_without_sessions(self):
+        """Test the landing funnel with cookie messages and no session"""
+        self.assertEqual(self.client.get(reverse("landings:webinar_landing")).status_code, 200)
+        response = self.client.post(
+            reverse("landings:register_webinar_lead"),
+            {"name": "Ana", "email": "ana@example.com"},
+            follow=True,
+        )
+        self.assertContains(response, "Registro exitoso")
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+        self.assertTrue(Lead.objects.registered("ana@example.com").exists())
+
+    def test_staff_urls_are_not_served(self):
+        """Test that the public URLconf has no admin or staff views"""
+        self.assertEqual(self.client.get("/admin/").status_code, 404)
+        self.assertEqual(self.client.get("/webinar/register/stats/").status_code, 404)
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+
+class WorkerStartupTest(SimpleTestCase):
+    def test_public_profile_boots_lighter(self):
+        """Test that a public worker boots without the admin and with templates preloaded"""
+        full = measure_startup("mysite.settings", runs=1)
+        public = measure_startup("mysite.settings_public", runs=1)
+        self.assertTrue(full["admin"])
+        self.assertFalse(public["admin"])
+        self.assertLess(public["modules"], full["modules"])
+        self.assertIn("landings/webinar.html", public["templates"])
+        self.assertEqual(preload_templates(["landings/webinar*.html"]), [
+            "landings/webinar.html", "landings/webinar_thank_you.html",
+        ])
+
+    def test_budget_check(self):
+        """Test the startup budget comparison and the command that enforces it"""
+        result = {"seconds": 0.5, "rss_mb": 40.0}
+        self.assertEqual(over_budget(result, {"IMPORT_SECONDS": 1, "RSS_MB": 50}), [])
+        self.assertEqual(
+            over_budget(result, {"IMPORT_SECONDS": 0.25, "RSS_MB": 30}),
+            ["arranque 0.50 s > 0.25 s", "memoria 40.0 MB > 30 MB"],
+        )
+        budgets = {"mysite.settings_public": {"IMPORT_SECONDS": 0.001, "RSS_MB": 1}}
+        with override_settings(WORKER_STARTUP={**settings.WORKER_STARTUP, "BUDGETS": budgets}):
+            with self.assertRaisesMessage(CommandError, "mysite.settings_public: arranque"):
+                call_command("check_worker_budget", runs=1, stdout=StringIO())
@@ -19,9 +19,17 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 from landings.views import webinar_landing
+from monitoring.views import dashboard as monitoring_dashboard
 
 urlpatterns = [
+    path(
+        "admin/monitoring/",
+        admin.site.admin_view(monitoring_dashboard),
+        name="monitoring_dashboard",
+    ),
     path("admin/", admin.site.urls),
+    path("", include("monitoring.urls")),
+    path("", include("analytics.urls")),
     path("", include("landings.urls")),
 ]
 
@@ -0,0 +1,14 @@
+"""
+URLconf del perfil "public" (``mysite.settings_public``): las landings, el
+registro de leads, ``/collect`` y ``/metrics``. Sin admin ni vistas de staff.
+"""
+
+from django.urls import include, path
+
+from landings.urls import public_urlpatterns
+
+urlpatterns = [
+    path("", include("monitoring.urls")),
+    path("", include("analytics.urls")),
+    path("", include((public_urlpatterns, "landings"))),
+]